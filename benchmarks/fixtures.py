@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""合成的频道页面（离线基准测试与解析后端一致性检查用）
+
+页面结构仿照 t.me/s/<频道> 的网页版：头像、频道名、图片、正文、按钮、
+浏览量、日期、脚本等元素都会出现，并混入实体、引号、注释等边界情况。
+Telegraph 文章同时生成页面 HTML 与 getPage 接口的 JSON。
+"""
+
+import json
+import random
+import re
+
+# 每种解析模式对应的频道 ID（src/channels/config.py）
+MODE_CHANNELS = {
+  "telegraph": "lsp115",
+  "inline": "vip115hot",
+  "button": "qukanmovie",
+}
+
+MESSAGES_PER_PAGE = 20
+
+EMOJI = '<i class="emoji" style="background-image:url(\'//telegram.org/img/emoji/40/F09F8EAC.png\')"><b>🎬</b></i>'
+NAMES = ["凡人修仙传", "庆余年 第二季", "仙逆", "The Last of Us", "流浪地球2", "三体", "Tom & Jerry", "\"怪奇物语\" S4"]
+
+
+def _pan(rng: random.Random, i: int) -> str:
+  return f"https://115cdn.com/s/sw{i:05d}{rng.randint(100, 999)}?password=a{i % 97}"
+
+
+def _tags(names: list[str]) -> str:
+  return " ".join(f'<a href="?q=%23{n}">#{n}</a>' for n in names)
+
+
+def _telegraph_body(rng: random.Random, i: int) -> tuple[str, str]:
+  name = rng.choice(NAMES)
+  if i % 11 == 0:
+    # 没有资源链接，解析后应被跳过
+    return f"{_tags(['剧集'])}<br/>{name} 预告", ""
+  link = f'<a href="https://telegra.ph/{name.replace(" ", "-")}-{i % 12 + 1:02d}-{i % 28 + 1:02d}" target="_blank" rel="noopener">📎 查看资源</a>'
+  body = f"{_tags(['剧集', '国产'])}<br/><b>{name}</b> &amp; 更多<br/>{link}"
+  return body, ""
+
+
+def _inline_body(rng: random.Random, i: int) -> tuple[str, str]:
+  name = rng.choice(NAMES)
+  url = _pan(rng, i)
+  if i % 13 == 0:
+    # 链接只出现在纯文本中
+    link = url
+  else:
+    link = f'<a href="{url}" target="_blank" rel="noopener" onclick="return confirm(\'Open this link?\\n\\n\'+this.href);">{url}</a>'
+  body = (
+    f"{EMOJI}名称：{name}<br/>大小：{rng.randint(1, 80)}GB&nbsp;&nbsp;<br/>"
+    f"描述：<i>{name}</i> &lt;4K&gt; <tg-spoiler>剧透</tg-spoiler><br/>"
+    f"链接：{link}<br/><!-- ad -->{_tags(['动漫', '4K'])}"
+  )
+  if i % 17 == 0:
+    body = "纯文字公告，没有链接"
+  return body, ""
+
+
+def _button_body(rng: random.Random, i: int) -> tuple[str, str]:
+  name = rng.choice(NAMES)
+  body = f"{EMOJI}<br/>电视剧｜{name}<br/>简介 <b>加粗</b> &lt;tag&gt; <code>1080p</code><br/>{_tags(['电视剧'])}"
+  if i % 9 == 0:
+    return body, ""
+  button = (
+    '<div class="tgme_widget_message_inline_keyboard"><table class="table"><tr><td>'
+    f'<a class="tgme_widget_message_inline_button url_button" href="{_pan(rng, i)}" target="_blank">'
+    '<div class="tgme_widget_message_inline_button_text">点击跳转</div></a></td></tr></table></div>'
+  )
+  return body, button
+
+
+BODIES = {
+  "telegraph": _telegraph_body,
+  "inline": _inline_body,
+  "button": _button_body,
+}
+
+
+def message_html(mode: str, username: str, i: int, rng: random.Random) -> str:
+  body, extra = BODIES[mode](rng, i)
+  photo = ""
+  if i % 3 == 0:
+    photo = (
+      f'<a class="tgme_widget_message_photo_wrap  blured" href="https://t.me/{username}/{i}" '
+      f'style="width:800px;background-image:url(\'https://cdn4.telesco.pe/file/{i}.jpg\')">'
+      f'<div class="tgme_widget_message_photo" style="padding-top:56%"></div></a>'
+    )
+  elif i % 5 == 0:
+    photo = (
+      f'<div class="tgme_widget_message_photo js-message_photo" '
+      f'style="width:100%;background-image:url(&quot;https://cdn.telesco.pe/p/{i}.jpg?a=1&amp;b=2&quot;)"></div>'
+    )
+  preview = ""
+  if i % 7 == 0:
+    preview = (
+      f'<a class="tgme_widget_message_link_preview" href="https://example.com/{i}">'
+      f'<div class="link_preview_site_name accent_color" dir="auto">Example</div>'
+      f'<div class="link_preview_title" dir="auto">It\'s a "preview"</div></a>'
+    )
+  return f'''<div class="tgme_widget_message_wrap js-widget_message_wrap"><div class="tgme_widget_message text_not_supported_wrap js-widget_message" data-post="{username}/{i}" data-view="eyJjIjo{i}">
+  <div class="tgme_widget_message_user"><a href="https://t.me/{username}"><i class="tgme_widget_message_user_photo bgcolor2" style="background-color:#fff" data-content="L"><img src="https://cdn4.telesco.pe/file/avatar.jpg"></i></a></div>
+  <div class="tgme_widget_message_bubble">
+    <i class="tgme_widget_message_bubble_tail"><svg class="bubble_icon" width="9px" height="20px" viewBox="0 0 9 20"><g fill="none" fill-rule="evenodd"><path d="M6,17 C5,18 0,20 0,20 L9,20 Z" fill="#fff"></path></g></svg></i>
+    <div class="tgme_widget_message_author accent_color"><a class="tgme_widget_message_owner_name" href="https://t.me/{username}"><span dir="auto">频道</span></a></div>
+    {photo}<div class="tgme_widget_message_text js-message_text" dir="auto">{body}</div>{extra}{preview}
+    <div class="tgme_widget_message_footer compact js-message_footer">
+      <div class="tgme_widget_message_info short js-message_info">
+        <span class="tgme_widget_message_views">{i * 37 % 1000 / 10}K</span><span class="copyonly"> views</span><span class="tgme_widget_message_meta"><a class="tgme_widget_message_date" href="https://t.me/{username}/{i}"><time datetime="2025-01-01T00:00:00+00:00" class="time">12:{i % 60:02d}</time></a></span>
+      </div>
+    </div>
+  </div>
+  <script>TWidgetPost.init("<b>{i}</b>" && 1);</script><style>.x > b {{color: red}}</style>
+</div></div>'''
+
+
+def channel_page(mode: str, newest_id: int, count: int = MESSAGES_PER_PAGE, seed: int = 0) -> str:
+  """生成一页频道 HTML：消息 ID 为 newest_id - count + 1 .. newest_id（页面内从旧到新）"""
+  rng = random.Random(f"{mode}-{newest_id}-{seed}")
+  username = MODE_CHANNELS[mode]
+  ids = range(max(1, newest_id - count + 1), newest_id + 1)
+  messages = "".join(message_html(mode, username, i, rng) for i in ids)
+  return (
+    '<!DOCTYPE html><html><head><meta charset="utf-8"><title>频道</title>'
+    '<script>var a = 1 < 2;</script></head><body class="widget_frame_base tgme_webpage">'
+    '<main class="tgme_main"><section class="tgme_channel_history js-message_history">'
+    f'{messages}</section></main></body></html>'
+  )
+
+
+def channel_pages(mode: str, pages: int = 10, seed: int = 0) -> list[str]:
+  """从最新一页开始往前生成若干页"""
+  newest = pages * MESSAGES_PER_PAGE
+  return [channel_page(mode, newest - p * MESSAGES_PER_PAGE, seed=seed) for p in range(pages)]
+
+
+def edge_case_page(mode: str) -> str:
+  """集中放置各种边界情况的一页（空白、注释、引号、实体、嵌套图片等）"""
+  username = MODE_CHANNELS[mode]
+  odd = (
+    f'<div class="tgme_widget_message_wrap"><div class="tgme_widget_message" data-post="{username}/9001">'
+    '<div class="tgme_widget_message_text"><pre>  \n <b> </b></pre><!----><!--  --> \t '
+    '<textarea>   </textarea><p title=\'a"b\' data-x="it\'s &quot;x&quot;" class="  a   b ">'
+    '<rt>注音<b>x</b></rt>&amp;&lt;&nbsp;</p>'
+    '<div class="tgme_widget_message_photo" style="background-image:url(https://x.org/y?a=1&amp;amp;b=2)">'
+    '<div class="tgme_widget_message_photo" style="background-image:url(\'https://x.org/inner.jpg\')"></div></div>'
+    '<span class="tgme_widget_message_views x">1</span>尾部文字<br><img src="a.png"><hr></div>'
+    '<a href="">空链接</a><a>没有 href</a></div></div>'
+    '<div class="tgme_widget_message_wrap"><div class="tgme_widget_message" data-post="no-slash"></div></div>'
+    f'<div class="tgme_widget_message_wrap"><div class="tgme_widget_message" data-post="{username}/9002"></div></div>'
+  )
+  return channel_page(mode, 8000, count=3).replace("</section>", odd + "</section>")
+
+
+def telegraph_urls(pages: list[str]) -> list[str]:
+  """频道页面中出现的 Telegraph 地址（去重，保持页面顺序）"""
+  return list(dict.fromkeys(re.findall(r'href="(https://telegra\.ph/[^"]+)"', "".join(pages))))
+
+
+def telegraph_article(url: str, seed: int = 0) -> tuple[str, str]:
+  """生成 Telegraph 文章：返回 (页面 HTML, getPage 接口返回的 JSON)，两者内容相同"""
+  rng = random.Random(f"{url}-{seed}")
+  path = url.rsplit("/", 1)[-1]
+  title = path.rsplit("-", 2)[0].replace("-", " ")
+  i = rng.randint(1, 99999)
+  # 节点树：[(标签, [子节点...])]，字符串为文本节点
+  content = [
+    ("figure", [("img", [])]),
+    ("p", [f"简介：{title} 第 {i % 40 + 1} 集 ", ("b", ["更新中"])]),
+    ("p", ["主演：", ("i", ["某某"]), " / 某某某"]),
+  ]
+  if i % 7:
+    content.append(("p", [("a", ["🔗 查看链接"], _pan(rng, i))]))
+  else:
+    content.append(("p", ["链接已失效"]))
+  content += [("p", ["大小：12GB"]), ("blockquote", ["转载请注明出处 & 来源"]), ("p", ["备注"])]
+
+  def to_json(node):
+    if isinstance(node, str):
+      return node
+    tag, children, *href = node
+    result = {"tag": tag}
+    if href:
+      result["attrs"] = {"href": href[0], "target": "_blank"}
+    elif tag == "img":
+      result["attrs"] = {"src": f"/file/{i}.jpg"}
+    if children:
+      result["children"] = [to_json(c) for c in children]
+    return result
+
+  def to_html(node):
+    if isinstance(node, str):
+      return node.replace("&", "&amp;")
+    tag, children, *href = node
+    if tag == "img":
+      return f'<img src="/file/{i}.jpg">'
+    attrs = f' href="{href[0]}" target="_blank"' if href else ""
+    return f"<{tag}{attrs}>{''.join(to_html(c) for c in children)}</{tag}>"
+
+  api = {"ok": True, "result": {
+    "path": path, "url": url, "title": title, "description": "", "author_name": "资源分享",
+    "views": i, "content": [to_json(node) for node in content],
+  }}
+  html = (
+    f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{title} – Telegraph</title>'
+    '<script src="/js/jquery.min.js"></script></head><body><div class="tl_page_wrap"><div class="tl_page">'
+    '<main class="tl_article"><header class="tl_article_header" dir="auto">'
+    f'<h1>{title}</h1><address><a rel="author">资源分享</a><time datetime="2025-01-01">January 1, 2025</time>'
+    '</address></header><article id="_tl_editor" class="tl_article_content">'
+    f'<h1>{title}<br></h1><address>资源分享<br></address>{"".join(to_html(node) for node in content)}'
+    '</article></main></div></div></body></html>'
+  )
+  return html, json.dumps(api, ensure_ascii=False)
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""旧版实现（回归检查的参照）
+
+这里保留 ChannelCrawler._get_clean_html 改为一次遍历之前的原始实现，
+新实现的输出必须与它逐字节相同。
+"""
+
+import re
+from copy import deepcopy
+
+from bs4 import BeautifulSoup
+
+
+def clean_html_deepcopy(div) -> str:
+  """获取清理后的消息卡片HTML（只保留消息内容）"""
+  # 查找消息内容区域
+  message_elem = div.find("div", class_="tgme_widget_message")
+  if not message_elem:
+    return ""
+
+  # 深拷贝以避免修改原始数据
+  msg_copy = deepcopy(message_elem)
+
+  # 移除不需要的元素：头像、用户信息、时间、浏览量等
+  for selector in [
+    'a.tgme_widget_message_owner_name',  # 频道名
+    'div.tgme_widget_message_user',       # 用户头像
+    'a.tgme_widget_message_photo_wrap',   # 用户头像链接
+    'span.tgme_widget_message_views',     # 浏览量
+    'span.tgme_widget_message_date',      # 日期
+    'script', 'style'
+  ]:
+    for elem in msg_copy.select(selector):
+      elem.decompose()
+
+  # 处理背景图片：将 style="background-image:url(...)" 转换为 img 标签
+  for photo in msg_copy.find_all(class_="tgme_widget_message_photo"):
+    style = photo.get("style", "")
+    if "background-image" in style:
+      match = re.search(r"url\(['\"]?([^'\"]+)['\"]?\)", style)
+      if match:
+        img_url = match.group(1)
+        # 创建 img 标签替换
+        img_tag = BeautifulSoup(f'<img src="{img_url}" style="max-width:100%;border-radius:8px;margin:8px 0;">', 'html.parser')
+        photo.replace_with(img_tag)
+
+  return str(msg_copy)
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""频道页面解析后端与卡片清理的速度对比
+
+用法（在项目根目录）：
+  python -m benchmarks.parser_backends              # 合成页面
+  python -m benchmarks.parser_backends --cache      # 另外使用 data/http_cache 中缓存的真实页面
+
+结果的一致性由 tests/test_backends.py（两个后端）与 tests/test_clean_html.py
+（卡片清理与旧版 deepcopy 实现，benchmarks/legacy.py）检查。
+"""
+
+import argparse
+import time
+
+from src.channels.config import CHANNELS
+from bs4 import BeautifulSoup
+
+from src.core.backends import BACKENDS, SoupBackend, get_backend
+from src.core.cache import PageCache
+from src.core.crawler import ChannelCrawler
+from benchmarks.fixtures import MODE_CHANNELS, channel_pages, edge_case_page
+from benchmarks.legacy import clean_html_deepcopy
+
+
+def cached_pages() -> dict[str, list[str]]:
+  """页面缓存中各频道的页面 {频道ID: [HTML, ...]}"""
+  urls = {config["url"]: ch_id for ch_id, config in CHANNELS.items()}
+  pages = {}
+  for entry in PageCache().entries():
+    ch_id = urls.get(entry["url"].split("?")[0])
+    if ch_id:
+      pages.setdefault(ch_id, []).append(entry["body"])
+  return pages
+
+
+def measure_clean_html(pages: list[str]) -> dict[str, float]:
+  """旧版与一次遍历的卡片清理每秒处理的条数"""
+  backend = SoupBackend()
+  elapsed = {"deepcopy": 0.0, "single-pass": 0.0}
+  count = 0
+  for html in pages:
+    for div in BeautifulSoup(html, "lxml").find_all("div", class_="tgme_widget_message_wrap"):
+      message_elem = div.find("div", class_="tgme_widget_message")
+      if not message_elem:
+        continue
+      count += 1
+      start = time.perf_counter()
+      clean_html_deepcopy(div)
+      elapsed["deepcopy"] += time.perf_counter() - start
+      start = time.perf_counter()
+      backend._clean_html(message_elem)
+      elapsed["single-pass"] += time.perf_counter() - start
+  return {name: count / seconds for name, seconds in elapsed.items() if seconds}
+
+
+def measure(ch_id: str, pages: list[str], rounds: int) -> dict[str, float]:
+  """各后端每秒解析的页数"""
+  speeds = {}
+  for name in BACKENDS:
+    crawler = ChannelCrawler(ch_id, backend=get_backend(name))
+    start = time.perf_counter()
+    for _ in range(rounds):
+      for html in pages:
+        crawler._parse_page(html)
+    speeds[name] = rounds * len(pages) / (time.perf_counter() - start)
+  return speeds
+
+
+def main():
+  parser = argparse.ArgumentParser(description="解析后端与卡片清理速度对比")
+  parser.add_argument("--pages", type=int, default=10, help="每种模式合成的页数")
+  parser.add_argument("--rounds", type=int, default=3, help="测速轮数")
+  parser.add_argument("--cache", action="store_true", help="同时使用页面缓存中的真实页面")
+  args = parser.parse_args()
+
+  samples = {ch_id: channel_pages(mode, args.pages) + [edge_case_page(mode)] for mode, ch_id in MODE_CHANNELS.items()}
+  if args.cache:
+    for ch_id, pages in cached_pages().items():
+      samples[ch_id] = samples.get(ch_id, []) + pages
+
+  for ch_id, pages in samples.items():
+    mode = CHANNELS[ch_id]["parse_mode"]
+    clean_speeds = measure_clean_html(pages)
+    speeds = measure(ch_id, pages, args.rounds)
+    line = "  ".join(f"{name}: {speed:7.1f} 页/秒" for name, speed in speeds.items())
+    print(f"{ch_id:<12} {mode:<10} {len(pages):>3} 页  {line}  (x{speeds['lxml'] / speeds['soup']:.1f})")
+    line = "  ".join(f"{name}: {speed:7.0f} 条/秒" for name, speed in clean_speeds.items())
+    print(f"{'':<12} 卡片清理      {line}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""解析器基准测试（完全离线，使用 benchmarks/pages 中录制的页面）
+
+用法（在项目根目录）：
+  python -m benchmarks.parsers                       # 各阶段耗时、每秒消息数、峰值内存
+  python -m benchmarks.parsers --json result.json    # 同时保存 JSON 结果（"-" 输出到标准输出）
+  python -m benchmarks.parsers --compare base.json   # 与之前保存的结果对比
+
+频道页面按阶段计时：
+  tree        构建 HTML 树、找出消息（backend._message_wraps）
+  extract     取出消息的链接、正文（backend._parse_message，不含卡片清理）
+  clean_html  清理消息卡片 HTML（backend._clean_html）
+  resources   按解析模式生成 Resource（ChannelCrawler._parse_single_message / _parse_*_mode）
+Telegraph 文章分别测试 getPage 接口返回的解析（api）与页面 HTML 的解析（html）。
+
+峰值内存是解析一遍所有页面时 tracemalloc 记录的峰值，单独一遍测量，不影响计时。
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Optional
+
+from src.core.backends import BACKENDS, get_backend
+from src.core.crawler import ChannelCrawler
+from src.core.parser import TelegraphParser
+from src.core.pipeline import StageStats
+from benchmarks.fixtures import MODE_CHANNELS
+from benchmarks.record import ARTICLES_FILE, read
+
+CHANNEL_STAGES = [
+  ("tree", "建树"),
+  ("extract", "提取"),
+  ("clean_html", "卡片清理"),
+  ("resources", "资源解析"),
+]
+ARTICLE_STAGES = [
+  ("api", "接口解析"),
+  ("html", "页面解析"),
+]
+
+
+class RecordedTelegraphParser(TelegraphParser):
+  """从录制的文章读取响应，不发出请求"""
+
+  def __init__(self, articles: list[dict]):
+    super().__init__()
+    self.responses = {}
+    for article in articles:
+      path = article["url"].rsplit("/", 1)[-1]
+      self.responses[article["url"]] = article["html"]
+      self.responses[f"getPage/{path}"] = article["api"]
+
+  def _get(self, url: str) -> str:
+    key = "getPage/" + url.split("/getPage/", 1)[1].split("?")[0] if "/getPage/" in url else url
+    return self.responses[key]
+
+
+def peak_memory(func: Callable[[], None]) -> int:
+  """执行 func 时分配内存的峰值（字节）"""
+  tracemalloc.start()
+  try:
+    func()
+    return tracemalloc.get_traced_memory()[1]
+  finally:
+    tracemalloc.stop()
+
+
+def _result(name: str, items: int, unit: str, rounds: int, stages: dict[str, StageStats], peak: int) -> dict:
+  seconds = sum(s.seconds for s in stages.values())
+  return {
+    "name": name,
+    unit: items,
+    "rounds": rounds,
+    "seconds": round(seconds, 6),
+    f"{unit}_per_sec": round(items * rounds / seconds, 1) if seconds else None,
+    "peak_memory_kb": round(peak / 1024, 1),
+    "stages": {
+      key: {"seconds": round(s.seconds, 6), "us_per_item": round(s.seconds / s.count * 1e6, 2) if s.count else None}
+      for key, s in stages.items()
+    },
+  }
+
+
+def bench_channel(mode: str, backend_name: str, pages: list[str], rounds: int) -> dict:
+  """测试一种解析模式在一个后端上的各阶段耗时"""
+  crawler = ChannelCrawler(MODE_CHANNELS[mode], backend=get_backend(backend_name))
+  backend = crawler.backend
+  for html in pages:  # 预热（编译 XPath、加载模块等）
+    crawler._parse_page(html)
+
+  stages = {key: StageStats(label, "条") for key, label in CHANNEL_STAGES}
+  stages["tree"].unit = "页"
+  clean_html = backend._clean_html
+
+  def timed_clean(message_elem) -> str:
+    with stages["clean_html"].timer():
+      return clean_html(message_elem)
+
+  backend._clean_html = timed_clean
+  try:
+    for _ in range(rounds):
+      for html in pages:
+        with stages["tree"].timer():
+          wraps = backend._message_wraps(html)
+        for wrap in wraps:
+          with stages["extract"].timer():
+            node = backend._parse_message(wrap)
+          if node:
+            with stages["resources"].timer():
+              crawler._parse_single_message(node)
+    messages = stages["extract"].count // rounds
+  finally:
+    del backend._clean_html
+  # extract 的计时包含卡片清理，扣除后各阶段之和即总耗时
+  stages["extract"].seconds -= stages["clean_html"].seconds
+
+  peak = peak_memory(lambda: [crawler._parse_page(html) for html in pages])
+  result = _result(f"{mode}/{backend_name}", messages, "messages", rounds, stages, peak)
+  result["pages"] = len(pages)
+  return result
+
+
+def bench_articles(articles: list[dict], rounds: int) -> dict:
+  """测试 TelegraphParser 解析录制的文章"""
+  parser = RecordedTelegraphParser(articles)
+  stages = {key: StageStats(label, "篇") for key, label in ARTICLE_STAGES}
+  methods = {"api": parser._parse_api, "html": parser._parse_html}
+  for key, method in methods.items():
+    urls = [a["url"] for a in articles if a[key] is not None]
+    for url in urls:  # 预热
+      method(url)
+    for _ in range(rounds):
+      for url in urls:
+        with stages[key].timer():
+          method(url)
+
+  def parse_all():
+    for article in articles:
+      for key, method in methods.items():
+        if article[key] is not None:
+          method(article["url"])
+
+  peak = peak_memory(parse_all)
+  return _result("telegraph_articles", len(articles), "articles", rounds, stages, peak)
+
+
+def git_commit() -> Optional[str]:
+  try:
+    out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+  except (OSError, subprocess.SubprocessError):
+    return None
+  return out.stdout.strip() or None
+
+
+def print_result(result: dict, labels: dict[str, str]):
+  unit = "messages" if "messages" in result else "articles"
+  rate = result[f"{unit}_per_sec"]
+  rate = f"{rate:9.1f} {'条' if unit == 'messages' else '篇'}/秒" if rate else "-"
+  print(f"{result['name']:<20} {result[unit]:>5} {'条' if unit == 'messages' else '篇'}  {rate}  "
+        f"峰值内存 {result['peak_memory_kb']:8.1f} KB")
+  for key, stage in result["stages"].items():
+    if stage["us_per_item"] is None:
+      continue
+    share = stage["seconds"] / result["seconds"] if result["seconds"] else 0
+    print(f"  {labels[key]:<8} {stage['seconds']:8.3f} 秒  {stage['us_per_item']:9.1f} 微秒/项  {share:5.0%}")
+
+
+def compare(base: dict, current: dict):
+  """按名称对比每秒处理量与峰值内存"""
+  old = {r["name"]: r for r in base["results"]}
+  print(f"\n与 {base.get('commit') or '基准结果'} 对比:")
+  for result in current["results"]:
+    previous = old.get(result["name"])
+    if not previous:
+      continue
+    unit = "messages" if "messages" in result else "articles"
+    line = f"  {result['name']:<20}"
+    a, b = previous.get(f"{unit}_per_sec"), result.get(f"{unit}_per_sec")
+    if a and b:
+      line += f" 速度 {b / a - 1:+7.1%}"
+    a, b = previous["peak_memory_kb"], result["peak_memory_kb"]
+    if a:
+      line += f"  内存 {b / a - 1:+7.1%}"
+    for key, stage in result["stages"].items():
+      before = previous["stages"].get(key, {}).get("us_per_item")
+      if before and stage["us_per_item"]:
+        line += f"  {key} {stage['us_per_item'] / before - 1:+.0%}"
+    print(line)
+
+
+def main():
+  parser = argparse.ArgumentParser(description="解析器基准测试（离线）")
+  parser.add_argument("--rounds", type=int, default=5, help="测速轮数")
+  parser.add_argument("--backend", choices=list(BACKENDS), action="append", help="只测试指定后端（可重复）")
+  parser.add_argument("--mode", choices=list(MODE_CHANNELS), action="append", help="只测试指定解析模式（可重复）")
+  parser.add_argument("--json", metavar="FILE", help="保存 JSON 结果（- 表示标准输出）")
+  parser.add_argument("--compare", metavar="FILE", help="与之前保存的 JSON 结果对比")
+  args = parser.parse_args()
+
+  try:
+    recorded = {mode: read(mode) for mode in args.mode or MODE_CHANNELS}
+    articles = read(ARTICLES_FILE)["articles"]
+  except FileNotFoundError as e:
+    sys.exit(f"没有录制的页面: {e.filename}，请先运行 python -m benchmarks.record")
+
+  # 输出 JSON 到标准输出时，表格输出到标准错误
+  out = sys.stderr if args.json == "-" else sys.stdout
+  stdout, sys.stdout = sys.stdout, out
+  labels = dict(CHANNEL_STAGES + ARTICLE_STAGES)
+  results = []
+  try:
+    for mode, data in recorded.items():
+      for backend_name in args.backend or BACKENDS:
+        result = bench_channel(mode, backend_name, data["pages"], args.rounds)
+        result["source"] = data["source"]
+        results.append(result)
+        print_result(result, labels)
+    if not args.mode or "telegraph" in args.mode:
+      result = bench_articles(articles, args.rounds)
+      results.append(result)
+      print_result(result, labels)
+
+    report = {
+      "commit": git_commit(),
+      "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+      "python": platform.python_version(),
+      "platform": platform.platform(),
+      "rounds": args.rounds,
+      "results": results,
+    }
+    if args.compare:
+      with open(args.compare, encoding="utf-8") as f:
+        compare(json.load(f), report)
+  finally:
+    sys.stdout = stdout
+
+  if args.json:
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.json == "-":
+      print(text)
+    else:
+      with open(args.json, "w", encoding="utf-8") as f:
+        f.write(text + "\n")
+
+
+if __name__ == "__main__":
+  main()
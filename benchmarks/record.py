@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""录制解析器基准测试使用的页面（benchmarks/pages）
+
+用法（在项目根目录）：
+  python -m benchmarks.record            # 录制合成页面
+  python -m benchmarks.record --cache    # 优先使用页面缓存（data/http_cache）中的真实页面
+
+基准测试只读取录制的文件，页面生成方式改变后旧结果仍可与新结果对比；
+需要更换测试页面时重新录制并提交。
+"""
+
+import argparse
+import gzip
+import json
+from pathlib import Path
+from urllib.parse import urlparse
+
+from src.channels.config import TELEGRAPH_API_URL
+from src.core.cache import PageCache
+from benchmarks.fixtures import MODE_CHANNELS, channel_pages, edge_case_page, telegraph_article, telegraph_urls
+from benchmarks.parser_backends import cached_pages
+
+PAGES_DIR = Path(__file__).parent / "pages"
+ARTICLES_FILE = "telegraph_articles"
+
+
+def write(name: str, data: dict):
+  """保存为 pages/<name>.json.gz"""
+  PAGES_DIR.mkdir(exist_ok=True)
+  path = PAGES_DIR / f"{name}.json.gz"
+  # mtime=0：内容不变时文件也不变
+  with gzip.GzipFile(path, "wb", mtime=0) as f:
+    f.write(json.dumps(data, ensure_ascii=False, indent=0).encode("utf-8"))
+  print(f"已保存 {path}（{path.stat().st_size / 1024:.0f} KB）")
+
+
+def read(name: str) -> dict:
+  """读取 pages/<name>.json.gz（不存在时抛出 FileNotFoundError）"""
+  with gzip.open(PAGES_DIR / f"{name}.json.gz", "rb") as f:
+    return json.loads(f.read().decode("utf-8"))
+
+
+def cached_articles() -> list[dict]:
+  """页面缓存中的 Telegraph 文章（页面 HTML 与 getPage 接口返回，缺少的一项为 None）"""
+  api_prefix = f"{TELEGRAPH_API_URL}/getPage/"
+  articles = {}
+  for entry in PageCache().entries():
+    url = entry["url"]
+    if url.startswith(api_prefix):
+      path = url[len(api_prefix):].split("?")[0]
+      article = articles.setdefault(f"https://telegra.ph/{path}", {"html": None, "api": None})
+      article["api"] = entry["body"]
+    elif urlparse(url).netloc == "telegra.ph":
+      articles.setdefault(url, {"html": None, "api": None})["html"] = entry["body"]
+  return [{"url": url, **article} for url, article in articles.items()]
+
+
+def main():
+  parser = argparse.ArgumentParser(description="录制解析器基准测试使用的页面")
+  parser.add_argument("--pages", type=int, default=10, help="每种模式合成的页数")
+  parser.add_argument("--cache", action="store_true", help="优先使用页面缓存中的真实页面")
+  args = parser.parse_args()
+
+  cached = cached_pages() if args.cache else {}
+  for mode, ch_id in MODE_CHANNELS.items():
+    if cached.get(ch_id):
+      pages, source = cached[ch_id], "cache"
+    else:
+      pages, source = channel_pages(mode, args.pages) + [edge_case_page(mode)], "synthetic"
+    write(mode, {"channel": ch_id, "mode": mode, "source": source, "pages": pages})
+
+  articles, source = (cached_articles() if args.cache else []), "cache"
+  if not articles:
+    # 为录制的 telegraph 频道页面中出现的地址生成文章
+    articles, source = [], "synthetic"
+    for url in telegraph_urls(read("telegraph")["pages"]):
+      html, api = telegraph_article(url)
+      articles.append({"url": url, "html": html, "api": api})
+  write(ARTICLES_FILE, {"source": source, "articles": articles})
+
+
+if __name__ == "__main__":
+  main()
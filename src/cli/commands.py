@@ -3,10 +3,36 @@
 
 import argparse
 
-from src.channels.config import CHANNELS
+from src.channels.config import CHANNELS, TELEGRAPH_WORKERS
 from src.core.database import Database, StateManager
 from src.core.crawler import ChannelCrawler
+from src.core.async_crawler import run_concurrent_sync, run_sharded_backfill
 from src.core.parser import TelegraphParser
+from src.core.cache import PageCache
+from src.core.ratelimit import get_rate_limiter
+from src.core.transport import get_transport
+from src.core.proxies import get_proxy_pool
+from src.utils import profiling
+
+
+def _make_cache(args):
+  """根据 --cache / --replay 创建页面缓存"""
+  if getattr(args, "replay", False):
+    return PageCache(replay=True)
+  if getattr(args, "cache", False):
+    return PageCache()
+  return None
+
+
+def _print_request_summary(cache):
+  """输出页面缓存、各主机限速、连接复用与代理情况"""
+  if cache:
+    print(cache.summary())
+  pool = get_proxy_pool()
+  summaries = [get_rate_limiter().summary(), get_transport().summary(), pool.summary() if pool else ""]
+  for summary in summaries:
+    if summary:
+      print(summary)
 
 
 def cmd_channels(args):
@@ -29,37 +55,55 @@ def cmd_crawl(args):
     return
 
   db = Database()
-  crawler = ChannelCrawler(channel_id)
+  cache = _make_cache(args)
+  crawler = ChannelCrawler(channel_id, cache, stream_parse=args.stream_parse or None)
   state_manager = StateManager()
 
+  try:
+    _crawl(args, channel_id, db, crawler, state_manager, cache)
+  finally:
+    _print_request_summary(cache)
+
+
+def _crawl(args, channel_id, db, crawler, state_manager, cache):
+  """cmd_crawl 的各个爬取分支"""
   if args.resume:
-    state = state_manager.load()
-    if state and state.channel_id == channel_id:
-      crawler.crawl_all(db, state_manager, resume_state=state)
-    else:
-      print("没有该频道的未完成任务")
+    # 分片爬取的断点：继续所有未完成的分片
+    if StateManager.shard_managers(channel_id):
+      run_sharded_backfill(channel_id, args.shards, db, cache, crawler.stream_parse)
+      return
+    # 先查找单频道爬取的状态，再查找并发同步时的频道独立状态
+    for manager in (state_manager, StateManager.for_channel(channel_id)):
+      state = manager.load()
+      if state and state.channel_id == channel_id:
+        crawler.crawl_all(db, manager, resume_state=state)
+        return
+    print("没有该频道的未完成任务")
     return
 
   if args.incremental:
     count = crawler.crawl_incremental(db)
     if count > 0 and args.parse and CHANNELS[channel_id]["parse_mode"] == "telegraph":
       print("\n开始解析网盘链接...")
-      parser = TelegraphParser()
+      parser = TelegraphParser(cache)
       parser.parse_batch(db, channel_id, limit=count)
     return
 
   if args.all:
-    crawler.crawl_all(db, state_manager)
+    if args.shards > 1:
+      run_sharded_backfill(channel_id, args.shards, db, cache, crawler.stream_parse)
+    else:
+      crawler.crawl_all(db, state_manager)
     if args.parse and CHANNELS[channel_id]["parse_mode"] == "telegraph":
       print("\n开始解析网盘链接...")
-      parser = TelegraphParser()
+      parser = TelegraphParser(cache)
       parser.parse_batch(db, channel_id)
     return
 
   count = crawler.crawl_with_limit(args.limit, db)
   if count > 0 and args.parse and CHANNELS[channel_id]["parse_mode"] == "telegraph":
     print("\n开始解析网盘链接...")
-    parser = TelegraphParser()
+    parser = TelegraphParser(cache)
     parser.parse_batch(db, channel_id, limit=count)
 
 
@@ -75,16 +119,19 @@ def cmd_parse(args):
     return
 
   db = Database()
-  parser = TelegraphParser()
+  cache = _make_cache(args)
+  parser = TelegraphParser(cache)
 
   unparsed = db.count_unparsed(channel_id)
-  print(f"未解析资源: {unparsed}")
+  retry_due = db.count_retry_due(channel_id)
+  print(f"未解析资源: {unparsed}，到期重试: {retry_due}")
 
-  if unparsed == 0:
+  if unparsed + retry_due == 0:
     return
 
-  limit = args.limit if args.limit > 0 else unparsed
-  parser.parse_batch(db, channel_id, limit=limit)
+  limit = args.limit if args.limit > 0 else unparsed + retry_due
+  parser.parse_batch(db, channel_id, limit=limit, workers=args.workers)
+  _print_request_summary(cache)
 
 
 def cmd_search(args):
@@ -201,6 +248,18 @@ def cmd_get(args):
       print(f"手动访问: {r.telegraph_url}")
 
 
+def cmd_reindex(args):
+  """重建搜索索引命令"""
+  channel_id = args.channel
+  if channel_id and channel_id not in CHANNELS:
+    print(f"错误: 未知频道 '{channel_id}'")
+    return
+
+  db = Database()
+  for ch_id, count in db.rebuild_search_index(channel_id).items():
+    print(f"{CHANNELS[ch_id]['name']}: 已索引 {count} 条")
+
+
 def cmd_status(args):
   """状态命令"""
   db = Database()
@@ -210,24 +269,36 @@ def cmd_status(args):
   channels = [channel_id] if channel_id else list(CHANNELS.keys())
 
   print("=== 数据库状态 ===")
+  stats = db.channel_stats()
   for ch_id in channels:
     if ch_id not in CHANNELS:
       continue
-    total = db.count(ch_id)
-    unparsed = db.count_unparsed(ch_id)
-    latest = db.get_latest_message_id(ch_id)
+    total = stats[ch_id]["total"]
+    unparsed = stats[ch_id]["unparsed"]
+    latest = stats[ch_id]["latest"]
     print(f"\n[{ch_id}] {CHANNELS[ch_id]['name']}")
     print(f"  资源: {total} 条 (已解析: {total - unparsed}, 未解析: {unparsed})")
     print(f"  最新ID: {latest}")
+    print(f"  增量水位线: {db.get_watermark(ch_id) or '-'}")
 
   print("\n=== 爬取状态 ===")
-  state = state_manager.load()
-  if state:
+  states = [state_manager.load()] + [StateManager.for_channel(ch_id).load() for ch_id in channels]
+  states = [s for s in states if s]
+  for state in states:
     print(f"有未完成任务: {state.channel_id}")
     print(f"  模式: {state.mode}")
     print(f"  已爬取: {state.total_crawled}")
     print(f"使用 'crawl -c {state.channel_id} --resume' 继续")
-  else:
+  for ch_id in channels:
+    shard_states = [m.load() for m in StateManager.shard_managers(ch_id)]
+    shard_states = [s for s in shard_states if s]
+    if shard_states:
+      states.extend(shard_states)
+      print(f"有未完成的分片任务: {ch_id}（{len(shard_states)} 个分片）")
+      for state in shard_states:
+        print(f"  区间 {state.low_id + 1}-{state.high_id}，当前位置: {state.last_before_id or '-'}，已爬取: {state.total_crawled}")
+      print(f"使用 'crawl -c {ch_id} --resume' 继续")
+  if not states:
     print("无未完成任务")
 
 
@@ -235,17 +306,36 @@ def cmd_sync(args):
   """同步所有频道（增量爬取 + 解析）"""
   db = Database()
   state_manager = StateManager()
-  parser = TelegraphParser()
+  cache = _make_cache(args)
+  parser = TelegraphParser(cache)
 
   print("="*50)
   print("开始同步所有频道")
   print("="*50)
 
+  if args.concurrent:
+    mode = "full" if args.full else "incremental"
+    counts = run_concurrent_sync(list(CHANNELS.keys()), mode, cache, args.stream_parse or None)
+
+    # 爬取完成后再解析 telegraph 频道的网盘链接
+    for ch_id, config in CHANNELS.items():
+      if config["parse_mode"] == "telegraph":
+        unparsed = db.count_to_resolve(ch_id)
+        if unparsed > 0:
+          print(f"\n[{ch_id}] 解析未处理的 {unparsed} 条资源...")
+          parser.parse_batch(db, ch_id, limit=unparsed)
+
+    print("\n" + "="*50)
+    print("所有频道同步完成: " + "，".join(f"{ch_id} 新增 {n} 条" for ch_id, n in counts.items()))
+    _print_request_summary(cache)
+    print("="*50)
+    return
+
   for ch_id, config in CHANNELS.items():
     print(f"\n>>> [{ch_id}] {config['name']}")
     print("-" * 40)
 
-    crawler = ChannelCrawler(ch_id)
+    crawler = ChannelCrawler(ch_id, cache, stream_parse=args.stream_parse or None)
 
     # 根据模式选择爬取方式
     if args.full:
@@ -255,13 +345,14 @@ def cmd_sync(args):
 
     # 如果是 telegraph 模式，解析网盘链接
     if config["parse_mode"] == "telegraph":
-      unparsed = db.count_unparsed(ch_id)
+      unparsed = db.count_to_resolve(ch_id)
       if unparsed > 0:
         print(f"\n解析未处理的 {unparsed} 条资源...")
         parser.parse_batch(db, ch_id, limit=unparsed)
 
   print("\n" + "="*50)
   print("所有频道同步完成")
+  _print_request_summary(cache)
   print("="*50)
 
 
@@ -277,23 +368,40 @@ def main():
   python main.py crawl -c vip115hot --limit 50   限量爬取
   python main.py crawl -c lsp115 --incremental   增量爬取
   python main.py crawl -c lsp115 --resume        断点续传
+  python main.py crawl -c lsp115 --all --shards 4  分片并行全量爬取
   python main.py parse -c lsp115                 解析链接
+  python main.py parse -c lsp115 --workers 8     8 线程并发解析链接
+  python main.py crawl -c lsp115 --incremental --stream-parse  边爬边解析链接
   python main.py search "仙逆" -c lsp115         搜索
   python main.py get "仙逆"                      获取链接
   python main.py list -c vip115hot               列出资源
+  python main.py reindex                         重建搜索索引
   python main.py status                          查看状态
   python main.py sync                            同步所有频道（增量）
   python main.py sync --full                     同步所有频道（全量）
+  python main.py sync --concurrent               并发同步所有频道
+  python main.py crawl -c lsp115 --all --cache   爬取并缓存页面
+  python main.py crawl -c lsp115 --all --replay  只从缓存回放（离线）
+  python main.py --profile sync                  同步并输出各阶段耗时
+  python main.py --profile-dump sync.prof sync   同时保存 cProfile 数据
     """
   )
+  parser.add_argument("--profile", action="store_true", help="结束时输出各阶段（请求、解析、清理、数据库、等待）耗时")
+  parser.add_argument("--profile-dump", metavar="FILE", help="同时用 cProfile 分析并把 pstats 数据保存到 FILE")
 
   subparsers = parser.add_subparsers(dest="command", help="命令")
 
+  # 页面缓存选项（crawl / parse / sync 共用）
+  cache_opts = argparse.ArgumentParser(add_help=False)
+  cache_g = cache_opts.add_mutually_exclusive_group()
+  cache_g.add_argument("--cache", action="store_true", help="缓存下载的页面（条件请求复用未修改的页面）")
+  cache_g.add_argument("--replay", action="store_true", help="只从页面缓存读取，不访问网络")
+
   # channels
   subparsers.add_parser("channels", help="列出可用频道")
 
   # crawl
-  crawl_p = subparsers.add_parser("crawl", help="爬取频道")
+  crawl_p = subparsers.add_parser("crawl", help="爬取频道", parents=[cache_opts])
   crawl_p.add_argument("-c", "--channel", required=True, help="频道ID")
   crawl_g = crawl_p.add_mutually_exclusive_group()
   crawl_g.add_argument("--all", action="store_true", help="全量爬取")
@@ -301,11 +409,14 @@ def main():
   crawl_g.add_argument("--incremental", action="store_true", help="增量爬取")
   crawl_g.add_argument("--resume", action="store_true", help="断点续传")
   crawl_p.add_argument("--parse", action="store_true", help="爬取后解析链接")
+  crawl_p.add_argument("--stream-parse", action="store_true", help="爬取的同时解析 telegraph 链接")
+  crawl_p.add_argument("--shards", type=int, default=1, help="全量爬取时按消息 ID 拆分为 N 个分片并行爬取")
 
   # parse
-  parse_p = subparsers.add_parser("parse", help="解析网盘链接")
+  parse_p = subparsers.add_parser("parse", help="解析网盘链接", parents=[cache_opts])
   parse_p.add_argument("-c", "--channel", required=True, help="频道ID")
   parse_p.add_argument("--limit", type=int, default=0, help="限制数量")
+  parse_p.add_argument("--workers", type=int, default=TELEGRAPH_WORKERS, help=f"并发解析线程数（默认 {TELEGRAPH_WORKERS}）")
 
   # search
   search_p = subparsers.add_parser("search", help="搜索资源")
@@ -322,16 +433,39 @@ def main():
   list_p.add_argument("-c", "--channel", required=True, help="频道ID")
   list_p.add_argument("--limit", type=int, default=50, help="显示数量")
 
+  # reindex
+  reindex_p = subparsers.add_parser("reindex", help="重建搜索索引")
+  reindex_p.add_argument("-c", "--channel", help="指定频道")
+
   # status
   status_p = subparsers.add_parser("status", help="查看状态")
   status_p.add_argument("-c", "--channel", help="指定频道")
 
   # sync
-  sync_p = subparsers.add_parser("sync", help="同步所有频道")
+  sync_p = subparsers.add_parser("sync", help="同步所有频道", parents=[cache_opts])
   sync_p.add_argument("--full", action="store_true", help="全量爬取（默认增量）")
+  sync_p.add_argument("--concurrent", action="store_true", help="所有频道并发爬取")
+  sync_p.add_argument("--stream-parse", action="store_true", help="爬取的同时解析 telegraph 链接")
 
   args = parser.parse_args()
-
+  if args.command == "crawl":
+    if args.shards < 1:
+      crawl_p.error("--shards 必须大于 0")
+    if args.shards > 1 and not (args.all or args.resume):
+      crawl_p.error("--shards 只用于全量爬取，请与 --all 或 --resume 一起使用")
+
+  if args.profile or args.profile_dump:
+    profiling.enable(args.profile_dump)
+  try:
+    _dispatch(parser, args)
+  finally:
+    summary = profiling.report()
+    if summary:
+      print(summary)
+
+
+def _dispatch(parser, args):
+  """执行子命令"""
   if args.command == "channels":
     cmd_channels(args)
   elif args.command == "crawl":
@@ -344,6 +478,8 @@ def main():
     cmd_get(args)
   elif args.command == "list":
     cmd_list(args)
+  elif args.command == "reindex":
+    cmd_reindex(args)
   elif args.command == "status":
     cmd_status(args)
   elif args.command == "sync":
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""异步并发爬取引擎（多频道同时爬取）"""
+
+import asyncio
+import signal
+import threading
+from contextlib import asynccontextmanager
+from typing import Optional
+from urllib.parse import urlparse
+
+from src.channels.config import CHANNELS, HOST_CONCURRENCY
+from src.models.resource import CrawlState
+from src.core.database import Database, StateManager
+from src.core.cache import PageCache
+from src.core.crawler import (
+  ChannelCrawler, CrawlRun, FullCrawlRun, IncrementalCrawlRun, LimitedCrawlRun,
+  ShardCrawlRun, plan_shards,
+)
+from src.core.pipeline import CrawlPipeline, page_message_ids
+
+
+class HostLimiter:
+  """按主机限制并发请求数
+
+  请求间隔、重试与熔断由各爬虫共用的 RateLimiter 负责（在线程池中等待）。
+  """
+
+  def __init__(self, concurrency: int = HOST_CONCURRENCY):
+    self.concurrency = concurrency
+    self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+  @asynccontextmanager
+  async def slot(self, url: str):
+    """占用一个请求名额"""
+    host = urlparse(url).netloc
+    if host not in self._semaphores:
+      self._semaphores[host] = asyncio.Semaphore(self.concurrency)
+
+    async with self._semaphores[host]:
+      yield
+
+
+class AsyncChannelCrawler:
+  """ChannelCrawler 的异步版本
+
+  分页与入库逻辑与同步版本共用（CrawlRun、CrawlPipeline），阻塞的流水线和数据库
+  操作放到线程池执行，多个频道（或分片）可以在同一事件循环中并发爬取。
+  """
+
+  def __init__(self, channel_id: str, limiter: Optional[HostLimiter] = None,
+               cache: Optional[PageCache] = None, stream_parse: Optional[bool] = None,
+               cancel: Optional[threading.Event] = None):
+    self.crawler = ChannelCrawler(channel_id, cache, stream_parse=stream_parse, cancel=cancel)
+    self.crawler.log_prefix = f"[{channel_id}] "
+    self.channel_id = channel_id
+    self.limiter = limiter or HostLimiter()
+
+  def interrupt(self):
+    self.crawler._interrupted = True
+
+  async def crawl_all(self, db: Database, state_manager: StateManager,
+                      resume_state: Optional[CrawlState] = None) -> int:
+    """全量爬取"""
+    return await self._run(FullCrawlRun(self.crawler, db, state_manager, resume_state))
+
+  async def crawl_incremental(self, db: Database) -> int:
+    """增量爬取"""
+    return await self._run(IncrementalCrawlRun(self.crawler, db))
+
+  async def crawl_with_limit(self, limit: int, db: Database) -> int:
+    """限量爬取"""
+    return await self._run(LimitedCrawlRun(self.crawler, db, limit))
+
+  async def crawl_sharded(self, db: Database, shards: int) -> int:
+    """分片并行全量爬取：按消息 ID 区间拆分，各分片独立翻页、独立保存断点
+
+    存在未完成的分片断点时忽略 shards 参数，继续所有未完成的分片。
+    """
+    managers = StateManager.shard_managers(self.channel_id)
+    states = [m.load() for m in managers]
+    pending = [(m, s) for m, s in zip(managers, states) if s]
+
+    if pending:
+      self.crawler.log(f"从断点恢复 {len(pending)} 个未完成分片")
+    else:
+      newest_id = await self._newest_message_id()
+      if not newest_id:
+        self.crawler.log("频道没有可爬取的消息")
+        return 0
+      pending = []
+      for i, state in enumerate(plan_shards(self.channel_id, newest_id, shards)):
+        manager = StateManager.for_shard(self.channel_id, i)
+        manager.save(state)
+        pending.append((manager, state))
+      self.crawler.log(f"最新消息 ID: {newest_id}，拆分为 {len(pending)} 个分片")
+
+    # 所有分片共用一份已入库 ID 集合
+    known = await asyncio.to_thread(db.load_message_ids, self.channel_id)
+    runs = [ShardCrawlRun(self.crawler, db, m, s, known) for m, s in pending]
+    counts = await asyncio.gather(*(self._run(run) for run in runs))
+    if all(run.done for run in runs):
+      await asyncio.to_thread(db.set_watermark, self.channel_id, known.max())
+
+    total = sum(counts)
+    self.crawler.log("-" * 50)
+    self.crawler.log(f"分片爬取结束，共保存 {total} 条资源")
+    return total
+
+  async def _newest_message_id(self) -> int:
+    """请求频道首页，取最新的消息 ID"""
+    url = self.crawler._page_url()
+    async with self.limiter.slot(url):
+      html = await asyncio.to_thread(self.crawler._fetch, url)
+    return max(page_message_ids(html), default=0)
+
+  async def _run(self, run: CrawlRun) -> int:
+    """在线程中运行与同步版本相同的流水线（预取、进程池解析、各阶段耗时）
+
+    流水线只有一个下载线程，运行期间占用该主机的一个请求名额。
+    """
+    if not await asyncio.to_thread(run.begin):
+      return 0
+    pipeline = CrawlPipeline(self.crawler, run)
+    run.start_resolver()
+    try:
+      async with self.limiter.slot(self.crawler._page_url()):
+        await asyncio.to_thread(pipeline.execute)
+    finally:
+      await asyncio.to_thread(run.stop_resolver)
+    count = await asyncio.to_thread(run.finish)
+    run.log(pipeline.summary())
+    return count
+
+
+async def crawl_channels(channel_ids: list[str], mode: str = "incremental",
+                         db: Optional[Database] = None,
+                         limiter: Optional[HostLimiter] = None,
+                         cache: Optional[PageCache] = None,
+                         stream_parse: Optional[bool] = None,
+                         cancel: Optional[threading.Event] = None) -> dict[str, int]:
+  """并发爬取多个频道，返回 {频道ID: 新增数量}
+
+  mode: incremental / full。全量模式下每个频道使用独立的状态文件，
+  可通过 crawl -c <频道> --resume 分别续传。cancel 被设置后边爬边解析不再发出新请求。
+  """
+  db = db or Database()
+  limiter = limiter or HostLimiter()
+  crawlers = [AsyncChannelCrawler(ch_id, limiter, cache, stream_parse, cancel) for ch_id in channel_ids]
+  _install_interrupt_handler(crawlers)
+
+  async def crawl_one(c: AsyncChannelCrawler) -> int:
+    if mode == "full":
+      state_manager = StateManager.for_channel(c.channel_id)
+      return await c.crawl_all(db, state_manager, resume_state=state_manager.load())
+    return await c.crawl_incremental(db)
+
+  results = await asyncio.gather(*(crawl_one(c) for c in crawlers), return_exceptions=True)
+
+  counts = {}
+  for c, result in zip(crawlers, results):
+    if isinstance(result, Exception):
+      c.crawler.log(f"爬取失败: {result}")
+      counts[c.channel_id] = 0
+    else:
+      counts[c.channel_id] = result
+  return counts
+
+
+def run_concurrent_sync(channel_ids: Optional[list[str]] = None, mode: str = "incremental",
+                        cache: Optional[PageCache] = None, stream_parse: Optional[bool] = None,
+                        cancel: Optional[threading.Event] = None) -> dict[str, int]:
+  """同步接口：并发爬取多个频道（默认全部频道）"""
+  channel_ids = channel_ids or list(CHANNELS.keys())
+  return asyncio.run(crawl_channels(channel_ids, mode, cache=cache, stream_parse=stream_parse, cancel=cancel))
+
+
+def run_sharded_backfill(channel_id: str, shards: int, db: Optional[Database] = None,
+                         cache: Optional[PageCache] = None, stream_parse: Optional[bool] = None) -> int:
+  """同步接口：单频道分片并行全量爬取（有未完成分片时自动续传）"""
+  async def main() -> int:
+    crawler = AsyncChannelCrawler(channel_id, cache=cache, stream_parse=stream_parse)
+    _install_interrupt_handler([crawler])
+    return await crawler.crawl_sharded(db or Database(), shards)
+
+  return asyncio.run(main())
+
+
+def _install_interrupt_handler(crawlers: list[AsyncChannelCrawler]):
+  """Ctrl+C 时通知所有频道停止（全量模式会在结束时保存进度）"""
+  # 信号处理只能在主线程设置
+  if threading.current_thread() is not threading.main_thread():
+    return
+
+  def handler(signum, frame):
+    print("\n\n收到中断信号，正在停止所有频道...")
+    for c in crawlers:
+      c.interrupt()
+
+  try:
+    signal.signal(signal.SIGINT, handler)
+    signal.signal(signal.SIGTERM, handler)
+  except ValueError:
+    pass
@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""频道页面 HTML 解析后端
+
+后端只负责从页面中取出每条消息的原始信息（MessageNode），
+标签、标题、链接等提取规则仍由 ChannelCrawler 按解析模式处理，
+因此不同后端得到的 Resource 完全一致。
+"""
+
+import html as html_lib
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+from bs4 import BeautifulSoup
+from bs4.builder import HTMLTreeBuilder
+from bs4.element import Tag
+from bs4.formatter import HTMLFormatter
+
+try:
+  from lxml import etree
+except ImportError:  # 没有 lxml 时只能使用 BeautifulSoup
+  etree = None
+
+from src.channels.config import PARSER_BACKEND
+from src.utils.profiling import stage
+
+
+@dataclass
+class MessageNode:
+  """一条消息中解析所需的全部信息"""
+  message_id: int
+  links: list[tuple[str, str]] = field(default_factory=list)       # 消息卡片内所有链接 (href, 文本)
+  text_links: list[tuple[str, str]] = field(default_factory=list)  # 正文内的链接 (href, 文本)
+  text: Optional[str] = None  # 正文文本（每段一行），没有正文区域时为 None
+  raw_html: str = ""          # 清理后的消息卡片 HTML
+
+
+# 清理消息卡片时移除的元素：(标签, class)，class 为 None 表示整个标签
+CLEAN_REMOVE = [
+  ("a", "tgme_widget_message_owner_name"),   # 频道名
+  ("div", "tgme_widget_message_user"),       # 用户头像
+  ("a", "tgme_widget_message_photo_wrap"),   # 用户头像链接
+  ("span", "tgme_widget_message_views"),     # 浏览量
+  ("span", "tgme_widget_message_date"),      # 日期
+  ("script", None),
+  ("style", None),
+]
+
+PHOTO_CLASS = "tgme_widget_message_photo"
+PHOTO_URL_PATTERN = re.compile(r"url\(['\"]?([^'\"]+)['\"]?\)")
+PHOTO_IMG_STYLE = "max-width:100%;border-radius:8px;margin:8px 0;"
+
+
+# ============================================================
+# 卡片 HTML 输出（与 BeautifulSoup 的 str() 结果保持一致）
+# ============================================================
+
+VOID_TAGS = HTMLTreeBuilder.DEFAULT_EMPTY_ELEMENT_TAGS
+LIST_ATTRIBUTES = HTMLTreeBuilder.DEFAULT_CDATA_LIST_ATTRIBUTES
+RAW_TEXT_TAGS = {"script", "style"}  # 输出时不转义
+PRESERVE_WHITESPACE_TAGS = HTMLTreeBuilder.DEFAULT_PRESERVE_WHITESPACE_TAGS
+ASCII_SPACES = " \n\t\x0c\r"
+MINIMAL_FORMATTER = HTMLFormatter.REGISTRY["minimal"]
+
+
+def _escape(text: str) -> str:
+  return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _collapse(text: str) -> str:
+  """BeautifulSoup 会把只含空白的文本压缩成一个换行或空格"""
+  if text.strip(ASCII_SPACES):
+    return text
+  return "\n" if "\n" in text else " "
+
+
+def _quote(value: str) -> str:
+  """属性值加引号（与 BeautifulSoup 的 minimal 格式一致）"""
+  value = _escape(value)
+  if '"' in value:
+    if "'" in value:
+      return '"' + value.replace('"', "&quot;") + '"'
+    return "'" + value + "'"
+  return '"' + value + '"'
+
+
+def _start_tag(tag: str, attrib) -> str:
+  """开始标签，属性按名称排序，多值属性规整空白"""
+  if not len(attrib):
+    return f"<{tag}/>" if tag in VOID_TAGS else f"<{tag}>"
+  list_attrs = LIST_ATTRIBUTES["*"] | LIST_ATTRIBUTES.get(tag, set())
+  parts = []
+  for key, value in sorted(attrib.items()):
+    if key in list_attrs:
+      value = " ".join(value.split())
+    parts.append(f"{key}={_quote(value)}")
+  close = "/>" if tag in VOID_TAGS else ">"
+  return f"<{tag} {' '.join(parts)}{close}"
+
+
+def _removed(tag: str, classes: list[str]) -> bool:
+  """清理时是否移除该元素"""
+  for remove_tag, remove_class in CLEAN_REMOVE:
+    if tag == remove_tag and (remove_class is None or remove_class in classes):
+      return True
+  return False
+
+
+def _photo_img(classes: list[str], style: str) -> Optional[str]:
+  """背景图片元素转换为 img 标签，不是背景图片时返回 None"""
+  if PHOTO_CLASS not in classes or "background-image" not in style:
+    return None
+  match = PHOTO_URL_PATTERN.search(style)
+  if not match:
+    return None
+  # 旧版实现把图片地址拼进 HTML 再解析一次，地址中的实体会被还原
+  img_url = html_lib.unescape(match.group(1))
+  return _start_tag("img", {"src": img_url, "style": PHOTO_IMG_STYLE})
+
+
+class PageBackend:
+  """解析后端基类"""
+
+  name = ""
+
+  def parse_page(self, html: str) -> list[MessageNode]:
+    """解析整页 HTML，返回页面中的消息（按页面顺序）"""
+    nodes = []
+    for wrap in self._message_wraps(html):
+      try:
+        node = self._parse_message(wrap)
+      except Exception as e:
+        print(f"解析消息失败: {e}")
+        continue
+      if node:
+        nodes.append(node)
+    return nodes
+
+  def _message_wraps(self, html: str) -> list:
+    raise NotImplementedError
+
+  def _parse_message(self, wrap) -> Optional[MessageNode]:
+    raise NotImplementedError
+
+
+def _message_id(data_post: str) -> Optional[int]:
+  """data-post="频道/消息ID" 中的消息 ID"""
+  if "/" not in data_post:
+    return None
+  return int(data_post.split("/")[-1])
+
+
+class SoupBackend(PageBackend):
+  """BeautifulSoup 后端（兼容性最好，速度较慢）"""
+
+  name = "soup"
+
+  def _message_wraps(self, html: str) -> list:
+    soup = BeautifulSoup(html, "lxml")
+    return soup.find_all("div", class_="tgme_widget_message_wrap")
+
+  def _parse_message(self, div) -> Optional[MessageNode]:
+    message_elem = div.find("div", class_="tgme_widget_message")
+    if not message_elem:
+      return None
+
+    message_id = _message_id(message_elem.get("data-post", ""))
+    if message_id is None:
+      return None
+
+    node = MessageNode(message_id=message_id)
+    node.links = [(a.get("href", ""), a.get_text(strip=True)) for a in div.find_all("a", href=True)]
+
+    text_div = div.find("div", class_="tgme_widget_message_text")
+    if text_div:
+      node.text_links = [(a.get("href", ""), a.get_text(strip=True)) for a in text_div.find_all("a", href=True)]
+      node.text = text_div.get_text(separator="\n", strip=True)
+
+    with stage("sanitize"):
+      node.raw_html = self._clean_html(message_elem)
+    return node
+
+  def _clean_html(self, message_elem) -> str:
+    """获取清理后的消息卡片HTML（只保留消息内容）
+
+    一次遍历直接输出：跳过头像、用户信息、时间、浏览量等元素，
+    背景图片输出为 img 标签，不复制、不修改原始树。
+    """
+    out = []
+    self._serialize(message_elem, out)
+    return "".join(out)
+
+  def _serialize(self, tag: Tag, out: list):
+    attrs = {key: " ".join(value) if isinstance(value, list) else value for key, value in tag.attrs.items()}
+    out.append(_start_tag(tag.name, attrs))
+    if tag.is_empty_element:
+      return
+
+    for child in tag.contents:
+      if not isinstance(child, Tag):
+        out.append(child.output_ready(MINIMAL_FORMATTER))
+        continue
+      classes = child.get("class") or []
+      if _removed(child.name, classes):
+        continue
+      img = _photo_img(classes, child.get("style", ""))
+      if img:
+        out.append(img)
+      else:
+        self._serialize(child, out)
+
+    out.append(f"</{tag.name}>")
+
+
+# ============================================================
+# lxml 后端
+# ============================================================
+
+STRING_CONTAINERS = set(HTMLTreeBuilder.DEFAULT_STRING_CONTAINERS)  # 这些标签内的文本不属于 get_text()
+
+
+def _has_class(name: str) -> str:
+  return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+
+if etree is not None:
+  _XP_WRAPS = etree.XPath(f'//div[{_has_class("tgme_widget_message_wrap")}]')
+  _XP_MESSAGE = etree.XPath(f'descendant::div[{_has_class("tgme_widget_message")}][1]')
+  _XP_TEXT = etree.XPath(f'descendant::div[{_has_class("tgme_widget_message_text")}][1]')
+  _XP_LINKS = etree.XPath('descendant::a[@href]')
+
+
+def _strings(elem, out: list):
+  """按文档顺序收集文本（与 BeautifulSoup 的 get_text 取值范围一致）"""
+  if elem.text:
+    out.append(elem.text)
+  for child in elem:
+    if isinstance(child.tag, str) and child.tag not in STRING_CONTAINERS:
+      _strings(child, out)
+    if child.tail:
+      out.append(child.tail)
+
+
+def _get_text(elem, separator: str = "") -> str:
+  if elem.tag in STRING_CONTAINERS:
+    return ""
+  out = []
+  _strings(elem, out)
+  return separator.join(s for s in (s.strip() for s in out) if s)
+
+
+class LxmlBackend(PageBackend):
+  """lxml 后端：预编译 XPath 直接遍历 lxml 树，不构建 BeautifulSoup 对象"""
+
+  name = "lxml"
+
+  def _message_wraps(self, html: str) -> list:
+    if not html.strip():
+      return []
+    # 解析器实例不能跨线程共用，每页新建一个
+    root = etree.fromstring(html, etree.HTMLParser())
+    if root is None:
+      return []
+    return _XP_WRAPS(root)
+
+  def _parse_message(self, div) -> Optional[MessageNode]:
+    found = _XP_MESSAGE(div)
+    if not found:
+      return None
+    message_elem = found[0]
+
+    message_id = _message_id(message_elem.get("data-post", ""))
+    if message_id is None:
+      return None
+
+    node = MessageNode(message_id=message_id)
+    node.links = [(a.get("href"), _get_text(a)) for a in _XP_LINKS(div)]
+
+    found = _XP_TEXT(div)
+    if found:
+      text_div = found[0]
+      node.text_links = [(a.get("href"), _get_text(a)) for a in _XP_LINKS(text_div)]
+      node.text = _get_text(text_div, "\n")
+
+    with stage("sanitize"):
+      node.raw_html = self._clean_html(message_elem)
+    return node
+
+  def _clean_html(self, message_elem) -> str:
+    """一次遍历输出清理后的消息卡片 HTML（输出格式与 SoupBackend 相同）"""
+    out = []
+    self._serialize(message_elem, out, preserve=False)
+    return "".join(out)
+
+  def _serialize(self, elem, out: list, preserve: bool):
+    tag = elem.tag
+    out.append(_start_tag(tag, elem.attrib))
+    if tag in VOID_TAGS:
+      return
+
+    raw = tag in RAW_TEXT_TAGS
+    preserve = preserve or tag in PRESERVE_WHITESPACE_TAGS
+
+    def text(value: str) -> str:
+      if not preserve:
+        value = _collapse(value)
+      return value if raw else _escape(value)
+
+    if elem.text:
+      out.append(text(elem.text))
+
+    for child in elem:
+      child_tag = child.tag
+      if child_tag is etree.Comment:
+        comment = child.text or ""
+        out.append(f"<!--{comment if preserve else _collapse(comment)}-->")
+      elif isinstance(child_tag, str):
+        classes = child.get("class", "").split()
+        if not _removed(child_tag, classes):
+          img = _photo_img(classes, child.get("style", ""))
+          if img:
+            out.append(img)
+          else:
+            self._serialize(child, out, preserve)
+      if child.tail:
+        out.append(text(child.tail))
+
+    out.append(f"</{tag}>")
+
+
+BACKENDS = {
+  "lxml": LxmlBackend,
+  "soup": SoupBackend,
+}
+
+
+def get_backend(name: Optional[str] = None) -> PageBackend:
+  """按名称创建解析后端（默认 PARSER_BACKEND），没有安装 lxml 时使用 soup"""
+  name = name or PARSER_BACKEND
+  if name not in BACKENDS:
+    raise ValueError(f"未知解析后端: {name}，可选: {', '.join(BACKENDS)}")
+  if name == "lxml" and etree is None:
+    name = "soup"
+  return BACKENDS[name]()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""HTTP 页面缓存（磁盘）"""
+
+import hashlib
+import json
+import os
+import time
+import zlib
+from pathlib import Path
+from typing import Iterator, Optional
+
+import requests
+
+from src.channels.config import HTTP_CACHE_DIR
+from src.core.ratelimit import RateLimiter
+from src.core.proxies import ProxyPool
+
+
+class CacheMiss(requests.RequestException):
+  """回放模式下缓存中没有该 URL"""
+
+
+class PageCache:
+  """按 URL 缓存响应正文
+
+  正文以 zlib 压缩保存；再次请求时带上 ETag / Last-Modified 发起条件请求，
+  服务器返回 304 时直接使用缓存。replay=True 时完全不访问网络，只从缓存读取。
+  """
+
+  def __init__(self, cache_dir: Path = HTTP_CACHE_DIR, replay: bool = False):
+    self.cache_dir = Path(cache_dir)
+    self.replay = replay
+    self.stats = {"hit": 0, "not_modified": 0, "download": 0, "miss": 0}
+
+  def _path(self, url: str) -> Path:
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return self.cache_dir / key[:2] / f"{key}.z"
+
+  def get(self, url: str) -> Optional[dict]:
+    """读取缓存条目 {url, body, etag, last_modified, fetched_at}"""
+    path = self._path(url)
+    if not path.exists():
+      return None
+    return self._read(path)
+
+  def entries(self) -> Iterator[dict]:
+    """遍历所有缓存条目"""
+    for path in sorted(self.cache_dir.glob("*/*.z")):
+      entry = self._read(path)
+      if entry:
+        yield entry
+
+  def _read(self, path: Path) -> Optional[dict]:
+    try:
+      return json.loads(zlib.decompress(path.read_bytes()).decode("utf-8"))
+    except (OSError, ValueError, zlib.error):
+      return None
+
+  def put(self, url: str, body: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+    entry = {
+      "url": url,
+      "body": body,
+      "etag": etag,
+      "last_modified": last_modified,
+      "fetched_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    path = self._path(url)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # 先写临时文件再替换，避免并发读到半个文件
+    tmp = path.with_suffix(f".{os.getpid()}.{id(entry)}.tmp")
+    tmp.write_bytes(zlib.compress(json.dumps(entry, ensure_ascii=False).encode("utf-8"), 6))
+    os.replace(tmp, path)
+
+  def fetch(self, session: requests.Session, url: str, timeout=None,
+            limiter: Optional[RateLimiter] = None, proxy_pool: Optional[ProxyPool] = None) -> str:
+    """通过缓存请求 URL，返回正文文本（失败时抛出 requests.RequestException）
+
+    timeout 为 None 时使用 REQUEST_TIMEOUT；proxy_pool 只在通过 limiter 请求时使用。
+    """
+    entry = self.get(url)
+
+    if self.replay:
+      if entry is None:
+        self.stats["miss"] += 1
+        raise CacheMiss(f"缓存中没有: {url}")
+      self.stats["hit"] += 1
+      return entry["body"]
+
+    headers = {}
+    if entry:
+      if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+      if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    if limiter:
+      response = limiter.request(session, "GET", url, headers=headers, timeout=timeout,
+                                 proxy_pool=proxy_pool)
+    else:
+      response = session.get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304 and entry:
+      self.stats["not_modified"] += 1
+      return entry["body"]
+    response.raise_for_status()
+
+    self.stats["download"] += 1
+    self.put(url, response.text, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+    return response.text
+
+  def summary(self) -> str:
+    s = self.stats
+    if self.replay:
+      return f"缓存回放: 命中 {s['hit']}，未命中 {s['miss']}"
+    return f"页面缓存: 未修改 {s['not_modified']}，下载 {s['download']}"
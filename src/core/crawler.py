@@ -3,22 +3,34 @@
 
 import re
 import signal
-import time
+import threading
 from typing import Optional
 from urllib.parse import unquote
 
-import requests
-from bs4 import BeautifulSoup
-
-from src.channels.config import CHANNELS, HEADERS, REQUEST_DELAY, PAN_115_PATTERN, PAN_115_PATTERN_ALT, is_valid_115_url
+from src.channels.config import (
+  CHANNELS, HEADERS, PAN_115_PATTERN, PAN_115_PATTERN_ALT, TELEGRAPH_STREAM_PARSE, is_valid_115_url,
+)
 from src.models.resource import Resource, CrawlState
 from src.core.database import Database, StateManager
+from src.core.idset import MessageIdSet
+from src.core.cache import PageCache
+from src.core.backends import MessageNode, PageBackend, get_backend
+from src.core.ratelimit import RateLimiter, get_rate_limiter
+from src.core.transport import get_transport
+from src.core.proxies import ProxyPool, get_proxy_pool
+from src.utils.metrics import CRAWL_PAGES, CRAWL_MESSAGES, CRAWL_NEW
+from src.utils.profiling import profiled
+from src.core.pipeline import CrawlPipeline, Page, page_message_ids
+from src.core.parser import StreamingResolver
 
 
 class ChannelCrawler:
   """Telegram 频道爬虫"""
 
-  def __init__(self, channel_id: str):
+  def __init__(self, channel_id: str, cache: Optional[PageCache] = None,
+               backend: Optional[PageBackend] = None, limiter: Optional[RateLimiter] = None,
+               stream_parse: Optional[bool] = None, proxy_pool: Optional[ProxyPool] = None,
+               cancel: Optional[threading.Event] = None):
     if channel_id not in CHANNELS:
       raise ValueError(f"未知频道: {channel_id}")
 
@@ -27,9 +39,18 @@ class ChannelCrawler:
     self.channel_url = self.channel_config["url"]
     self.parse_mode = self.channel_config["parse_mode"]
 
-    self.session = requests.Session()
-    self.session.headers.update(HEADERS)
+    self.session = get_transport().session(HEADERS)
+    self.cache = cache
+    self.backend = backend or get_backend()
+    self.limiter = limiter or get_rate_limiter()
+    self.proxy_pool = proxy_pool or get_proxy_pool()
+    # telegraph 模式的频道边爬边解析网盘链接
+    if stream_parse is None:
+      stream_parse = TELEGRAPH_STREAM_PARSE
+    self.stream_parse = stream_parse and self.parse_mode == "telegraph"
+    self.cancel = cancel  # 设置后边爬边解析不再发出新请求（Web 端停止同步）
     self._interrupted = False
+    self.log_prefix = ""
 
   def setup_signal_handler(self, state_manager: StateManager, state: CrawlState):
     """设置中断信号处理"""
@@ -53,177 +74,67 @@ class ChannelCrawler:
   def crawl_all(self, db: Database, state_manager: StateManager,
           resume_state: Optional[CrawlState] = None) -> int:
     """全量爬取"""
-    if resume_state:
-      state = resume_state
-      print(f"从断点恢复，已爬取: {state.total_crawled}")
-    else:
-      state = CrawlState(channel_id=self.channel_id, mode="all")
-
-    self.setup_signal_handler(state_manager, state)
-
-    print(f"开始爬取频道: {self.channel_config['name']}")
-    print(f"模式: 全量爬取 (Ctrl+C 可中断保存)")
-    print("-" * 50)
-
-    current_before_id = state.last_before_id
-    saved_count = state.total_crawled
-
-    while not self._interrupted:
-      url = self.channel_url
-      if current_before_id:
-        url = f"{self.channel_url}?before={current_before_id}"
-
-      print(f"正在请求: {url}")
-
-      try:
-        response = self.session.get(url, timeout=30)
-        response.raise_for_status()
-      except requests.RequestException as e:
-        print(f"请求失败: {e}，等待 10 秒重试...")
-        time.sleep(10)
-        continue
-
-      soup = BeautifulSoup(response.text, "lxml")
-      messages = self._parse_messages(soup)
-
-      if not messages:
-        print("没有更多消息了，爬取完成！")
-        state_manager.clear()
-        break
-
-      new_count = 0
-      for msg in messages:
-        if self._interrupted:
-          break
-        if not db.exists(self.channel_id, msg.message_id):
-          db.save_resource(self.channel_id, msg)
-          new_count += 1
-          saved_count += 1
-
-      print(f"本页: {len(messages)} 条，新增: {new_count} 条，累计: {saved_count} 条")
-
-      current_before_id = min(msg.message_id for msg in messages)
-      state.last_before_id = current_before_id
-      state.total_crawled = saved_count
-
-      if saved_count % 100 == 0:
-        state_manager.save(state)
-
-      time.sleep(REQUEST_DELAY)
-
-    print("-" * 50)
-    print(f"爬取完成，共保存 {saved_count} 条资源")
-    return saved_count
+    run = FullCrawlRun(self, db, state_manager, resume_state)
+    self.setup_signal_handler(state_manager, run.state)
+    return self._run(run)
 
   def crawl_incremental(self, db: Database) -> int:
     """增量爬取"""
-    latest_id = db.get_latest_message_id(self.channel_id)
-
-    print(f"开始增量爬取: {self.channel_config['name']}")
-    print(f"数据库最新消息 ID: {latest_id}")
-    print("-" * 50)
-
-    if latest_id == 0:
-      print("数据库为空，请先使用 --all 进行初始爬取")
-      return 0
-
-    new_count = 0
-    current_before_id = None
-    consecutive_exists = 0
-
-    while consecutive_exists < 20:
-      url = self.channel_url
-      if current_before_id:
-        url = f"{self.channel_url}?before={current_before_id}"
-
-      print(f"正在请求: {url}")
-
-      try:
-        response = self.session.get(url, timeout=30)
-        response.raise_for_status()
-      except requests.RequestException as e:
-        print(f"请求失败: {e}")
-        break
-
-      soup = BeautifulSoup(response.text, "lxml")
-      messages = self._parse_messages(soup)
-
-      if not messages:
-        break
-
-      page_new = 0
-      for msg in messages:
-        if db.exists(self.channel_id, msg.message_id):
-          consecutive_exists += 1
-        else:
-          consecutive_exists = 0
-          db.save_resource(self.channel_id, msg)
-          page_new += 1
-          new_count += 1
-
-      print(f"本页: {len(messages)} 条，新增: {page_new} 条")
-
-      current_before_id = min(msg.message_id for msg in messages)
-      time.sleep(REQUEST_DELAY)
-
-    print("-" * 50)
-    print(f"增量爬取完成，新增 {new_count} 条资源")
-    return new_count
+    return self._run(IncrementalCrawlRun(self, db))
 
   def crawl_with_limit(self, limit: int, db: Database) -> int:
     """限量爬取"""
-    print(f"开始爬取: {self.channel_config['name']}")
-    print(f"目标数量: {limit}")
-    print("-" * 50)
-
-    current_before_id = None
-    saved_count = 0
-
-    while saved_count < limit:
-      url = self.channel_url
-      if current_before_id:
-        url = f"{self.channel_url}?before={current_before_id}"
-
-      print(f"正在请求: {url}")
-
-      try:
-        response = self.session.get(url, timeout=30)
-        response.raise_for_status()
-      except requests.RequestException as e:
-        print(f"请求失败: {e}")
-        break
-
-      soup = BeautifulSoup(response.text, "lxml")
-      messages = self._parse_messages(soup)
+    return self._run(LimitedCrawlRun(self, db, limit))
 
-      if not messages:
-        print("没有更多消息了")
-        break
-
-      for msg in messages:
-        if saved_count >= limit:
-          break
-        if not db.exists(self.channel_id, msg.message_id):
-          db.save_resource(self.channel_id, msg)
-          saved_count += 1
-
-      print(f"本页: {len(messages)} 条，累计: {saved_count} 条")
-
-      current_before_id = min(msg.message_id for msg in messages)
-      time.sleep(REQUEST_DELAY)
-
-    print("-" * 50)
-    print(f"爬取完成，共保存 {saved_count} 条资源")
-    return saved_count
+  def _run(self, run: "CrawlRun") -> int:
+    """同步驱动一次爬取：下载、解析、入库三个阶段流水线并行（请求间隔由 limiter 控制）"""
+    if not run.begin():
+      return 0
 
-  def _parse_messages(self, soup: BeautifulSoup) -> list[Resource]:
-    """解析页面消息"""
+    pipeline = CrawlPipeline(self, run)
+    run.start_resolver()
+    try:
+      pipeline.execute()
+    finally:
+      run.stop_resolver()
+    count = run.finish()
+    run.log(pipeline.summary())
+    return count
+
+  def make_resolver(self, db: Database) -> Optional[StreamingResolver]:
+    """边爬边解析时的解析器（未开启时为 None）"""
+    if not self.stream_parse:
+      return None
+    return StreamingResolver(db, self.channel_id, self.cache, self.limiter, log=self.log, cancel=self.cancel)
+
+  def retry_wait(self, url: str) -> float:
+    """全量爬取在请求（含重试）失败后再次尝试前的等待时间"""
+    return max(10.0, self.limiter.blocked_for(url))
+
+  def log(self, message: str):
+    """输出日志（并发爬取时带频道前缀）"""
+    print(f"{self.log_prefix}{message}")
+
+  def _page_url(self, before_id: Optional[int] = None) -> str:
+    if before_id:
+      return f"{self.channel_url}?before={before_id}"
+    return self.channel_url
+
+  def _fetch(self, url: str) -> str:
+    """请求页面，返回 HTML 文本"""
+    if self.cache:
+      return self.cache.fetch(self.session, url, limiter=self.limiter, proxy_pool=self.proxy_pool)
+    response = self.limiter.request(self.session, "GET", url, proxy_pool=self.proxy_pool)
+    response.raise_for_status()
+    return response.text
+
+  @profiled("parse")
+  def _parse_page(self, html: str) -> list[Resource]:
+    """解析整页 HTML"""
     resources = []
-    message_divs = soup.find_all("div", class_="tgme_widget_message_wrap")
-
-    for div in message_divs:
+    for node in self.backend.parse_page(html):
       try:
-        resource = self._parse_single_message(div)
+        resource = self._parse_single_message(node)
         if resource:
           resources.append(resource)
       except Exception as e:
@@ -232,88 +143,29 @@ class ChannelCrawler:
 
     return resources
 
-  def _parse_single_message(self, div) -> Optional[Resource]:
+  def _parse_single_message(self, node: MessageNode) -> Optional[Resource]:
     """解析单条消息"""
-    message_elem = div.find("div", class_="tgme_widget_message")
-    if not message_elem:
-      return None
-
-    data_post = message_elem.get("data-post", "")
-    if "/" not in data_post:
-      return None
-
-    message_id = int(data_post.split("/")[-1])
-
     # 提取标签
     tags = []
     title_parts = []
-    text_div = div.find("div", class_="tgme_widget_message_text")
-
-    if text_div:
-      for link in text_div.find_all("a", href=True):
-        href = link.get("href", "")
-        if "?q=%23" in href:
-          tag_text = link.get_text(strip=True)
-          if tag_text.startswith("#"):
-            tags.append(tag_text)
-            title_parts.append(tag_text.lstrip("#"))
+    for href, link_text in node.text_links:
+      if "?q=%23" in href:
+        if link_text.startswith("#"):
+          tags.append(link_text)
+          title_parts.append(link_text.lstrip("#"))
 
     # 根据解析模式处理
-    # 获取清理后的原始HTML
-    raw_html = self._get_clean_html(div)
-
     if self.parse_mode == "telegraph":
-      return self._parse_telegraph_mode(div, message_id, tags, title_parts, raw_html)
+      return self._parse_telegraph_mode(node, tags, title_parts)
     elif self.parse_mode == "button":
-      return self._parse_button_mode(div, message_id, tags, title_parts, text_div, raw_html)
+      return self._parse_button_mode(node, tags, title_parts)
     else:
-      return self._parse_inline_mode(div, message_id, tags, title_parts, text_div, raw_html)
-
-  def _get_clean_html(self, div) -> str:
-    """获取清理后的消息卡片HTML（只保留消息内容）"""
-    from bs4 import BeautifulSoup
-    from copy import deepcopy
-
-    # 查找消息内容区域
-    message_elem = div.find("div", class_="tgme_widget_message")
-    if not message_elem:
-      return ""
-
-    # 深拷贝以避免修改原始数据
-    msg_copy = deepcopy(message_elem)
-
-    # 移除不需要的元素：头像、用户信息、时间、浏览量等
-    for selector in [
-      'a.tgme_widget_message_owner_name',  # 频道名
-      'div.tgme_widget_message_user',       # 用户头像
-      'a.tgme_widget_message_photo_wrap',   # 用户头像链接
-      'span.tgme_widget_message_views',     # 浏览量
-      'span.tgme_widget_message_date',      # 日期
-      'script', 'style'
-    ]:
-      for elem in msg_copy.select(selector):
-        elem.decompose()
-
-    # 处理背景图片：将 style="background-image:url(...)" 转换为 img 标签
-    for photo in msg_copy.find_all(class_="tgme_widget_message_photo"):
-      style = photo.get("style", "")
-      if "background-image" in style:
-        import re
-        match = re.search(r"url\(['\"]?([^'\"]+)['\"]?\)", style)
-        if match:
-          img_url = match.group(1)
-          # 创建 img 标签替换
-          img_tag = BeautifulSoup(f'<img src="{img_url}" style="max-width:100%;border-radius:8px;margin:8px 0;">', 'html.parser')
-          photo.replace_with(img_tag)
-
-    return str(msg_copy)
+      return self._parse_inline_mode(node, tags, title_parts)
 
-  def _parse_telegraph_mode(self, div, message_id: int, tags: list, title_parts: list, raw_html: str) -> Optional[Resource]:
+  def _parse_telegraph_mode(self, node: MessageNode, tags: list, title_parts: list) -> Optional[Resource]:
     """解析 telegraph 模式（Lsp115）"""
     telegraph_url = ""
-    for link in div.find_all("a", href=True):
-      href = link.get("href", "")
-      link_text = link.get_text(strip=True)
+    for href, link_text in node.links:
       if "telegra.ph" in href and ("查看资源" in link_text or "📎" in link_text):
         telegraph_url = href
         break
@@ -325,27 +177,26 @@ class ChannelCrawler:
     if not title and title_parts:
       title = " ".join(title_parts)
     if not title:
-      title = f"资源_{message_id}"
+      title = f"资源_{node.message_id}"
 
     return Resource(
-      message_id=message_id,
+      message_id=node.message_id,
       title=title,
       tags=",".join(tags),
       telegraph_url=telegraph_url,
-      raw_html=raw_html
+      raw_html=node.raw_html
     )
 
-  def _parse_inline_mode(self, div, message_id: int, tags: list, title_parts: list, text_div, raw_html: str) -> Optional[Resource]:
+  def _parse_inline_mode(self, node: MessageNode, tags: list, title_parts: list) -> Optional[Resource]:
     """解析 inline 模式（vip115hot）"""
     pan_url = ""
     description = ""
     title = ""
 
-    if text_div:
-      text_content = text_div.get_text(separator="\n", strip=True)
+    if node.text is not None:
+      text_content = node.text
 
-      for link in text_div.find_all("a", href=True):
-        href = link.get("href", "")
+      for href, _ in node.text_links:
         if is_valid_115_url(href):
           pan_url = href
           break
@@ -376,26 +227,24 @@ class ChannelCrawler:
       if title_parts:
         title = " ".join(title_parts[:3])
       else:
-        title = f"资源_{message_id}"
+        title = f"资源_{node.message_id}"
 
     return Resource(
-      message_id=message_id,
+      message_id=node.message_id,
       title=title,
       tags=",".join(tags),
       pan_url=pan_url,
       description=description,
-      raw_html=raw_html
+      raw_html=node.raw_html
     )
 
-  def _parse_button_mode(self, div, message_id: int, tags: list, title_parts: list, text_div, raw_html: str) -> Optional[Resource]:
+  def _parse_button_mode(self, node: MessageNode, tags: list, title_parts: list) -> Optional[Resource]:
     """解析 button 模式（QukanMovie）"""
     pan_url = ""
     description = ""
     title = ""
 
-    for link in div.find_all("a", href=True):
-      link_text = link.get_text(strip=True)
-      href = link.get("href", "")
+    for href, link_text in node.links:
       if "点击跳转" in link_text:
         if is_valid_115_url(href):
           pan_url = href
@@ -404,9 +253,8 @@ class ChannelCrawler:
     if not is_valid_115_url(pan_url):
       return None
 
-    if text_div:
-      text_content = text_div.get_text(separator="\n", strip=True)
-      lines = [l for l in text_content.split("\n") if l.strip()][:10]
+    if node.text is not None:
+      lines = [l for l in node.text.split("\n") if l.strip()][:10]
       description = "\n".join(lines)
 
       # 从描述中提取标题
@@ -429,15 +277,15 @@ class ChannelCrawler:
       if title_parts:
         title = " ".join(title_parts[:3])
       else:
-        title = f"资源_{message_id}"
+        title = f"资源_{node.message_id}"
 
     return Resource(
-      message_id=message_id,
+      message_id=node.message_id,
       title=title,
       tags=",".join(tags),
       pan_url=pan_url,
       description=description,
-      raw_html=raw_html
+      raw_html=node.raw_html
     )
 
   def _extract_title_from_url(self, url: str) -> str:
@@ -449,3 +297,266 @@ class ChannelCrawler:
       return title
     except Exception:
       return ""
+
+
+
+class CrawlRun:
+  """单次爬取的分页控制与入库逻辑（同步、异步引擎共用）"""
+
+  retry_on_error = False  # 请求失败时重试，否则结束本次爬取
+
+  def __init__(self, crawler: ChannelCrawler, db: Database, known: Optional[MessageIdSet] = None):
+    self.crawler = crawler
+    self.db = db
+    self.channel_id = crawler.channel_id
+    self.before_id: Optional[int] = None
+    self.saved_count = 0
+    self.known = known  # 已入库的消息 ID，首次使用时从数据库加载
+    self.resolver: Optional[StreamingResolver] = None
+
+  def log(self, message: str):
+    self.crawler.log(message)
+
+  def begin(self) -> bool:
+    """开始爬取，返回 False 表示无需爬取"""
+    return True
+
+  def handle_page(self, page: Page) -> bool:
+    """处理一页消息，返回是否继续翻页
+
+    翻页位置 before_id 取页面上最早的消息 ID（包括没有资源的消息），
+    与流水线预取下一页时使用的位置一致。
+    """
+    raise NotImplementedError
+
+  def may_continue(self, min_id: int) -> bool:
+    """下载阶段据此判断是否预取更早的页面（只看消息 ID，最终由 handle_page 决定）"""
+    return True
+
+  def known_ids(self) -> MessageIdSet:
+    if self.known is None:
+      self.known = self.db.load_message_ids(self.channel_id)
+    return self.known
+
+  def save_page(self, messages: list[Resource], max_new: Optional[int] = None) -> list[int]:
+    """保存一页中尚未入库的消息，返回新增的消息 ID（边爬边解析时交给解析线程）"""
+    new_ids = self.db.save_resources(self.channel_id, messages, max_new=max_new, known=self.known_ids())
+    CRAWL_PAGES.inc(channel=self.channel_id)
+    CRAWL_MESSAGES.inc(len(messages), channel=self.channel_id)
+    CRAWL_NEW.inc(len(new_ids), channel=self.channel_id)
+    if self.resolver and new_ids:
+      new = set(new_ids)
+      self.resolver.submit([m for m in messages if m.message_id in new])
+    return new_ids
+
+  def start_resolver(self):
+    self.resolver = self.crawler.make_resolver(self.db)
+
+  def stop_resolver(self):
+    """等待边爬边解析的请求完成（中断时放弃排队中的请求）"""
+    if self.resolver:
+      self.resolver.close(interrupted=self.crawler._interrupted)
+      self.resolver = None
+
+  def finish(self) -> int:
+    return self.saved_count
+
+
+class FullCrawlRun(CrawlRun):
+  """全量爬取（支持断点续传）"""
+
+  retry_on_error = True
+
+  def __init__(self, crawler: ChannelCrawler, db: Database, state_manager: StateManager,
+               resume_state: Optional[CrawlState] = None):
+    super().__init__(crawler, db)
+    self.state_manager = state_manager
+    if resume_state:
+      self.state = resume_state
+      self.log(f"从断点恢复，已爬取: {self.state.total_crawled}")
+    else:
+      self.state = CrawlState(channel_id=self.channel_id, mode="all")
+    self.before_id = self.state.last_before_id
+    self.saved_count = self.state.total_crawled
+
+  def begin(self) -> bool:
+    self.log(f"开始爬取频道: {self.crawler.channel_config['name']}")
+    self.log(f"模式: 全量爬取 (Ctrl+C 可中断保存)")
+    self.log("-" * 50)
+    return True
+
+  def handle_page(self, page: Page) -> bool:
+    if not page.message_ids:
+      self.log("没有更多消息了，爬取完成！")
+      self.state_manager.clear()
+      self.db.set_watermark(self.channel_id, self.known_ids().max())
+      return False
+
+    self._store(page.resources, page.min_id)
+    if self.saved_count % 100 == 0:
+      self.state_manager.save(self.state)
+    return True
+
+  def _store(self, messages: list[Resource], before_id: int):
+    """保存一页中的新消息并推进断点"""
+    new_count = len(self.save_page(messages))
+    self.saved_count += new_count
+
+    self.log(f"本页: {len(messages)} 条，新增: {new_count} 条，累计: {self.saved_count} 条")
+
+    self.before_id = before_id
+    self.state.last_before_id = self.before_id
+    self.state.total_crawled = self.saved_count
+
+  def finish(self) -> int:
+    if self.crawler._interrupted:
+      self.state_manager.save(self.state)
+      self.log(f"进度已保存，使用 crawl -c {self.channel_id} --resume 继续")
+    self.log("-" * 50)
+    self.log(f"爬取完成，共保存 {self.saved_count} 条资源")
+    return self.saved_count
+
+
+class ShardCrawlRun(FullCrawlRun):
+  """分片全量爬取：只负责消息 ID 区间 (low_id, high_id]，每页保存断点"""
+
+  def __init__(self, crawler: ChannelCrawler, db: Database, state_manager: StateManager, state: CrawlState,
+               known: Optional[MessageIdSet] = None):
+    super().__init__(crawler, db, state_manager)
+    self.known = known
+    self.state = state
+    self.before_id = state.last_before_id or state.high_id + 1
+    self.saved_count = state.total_crawled
+    self.done = False
+
+  def log(self, message: str):
+    self.crawler.log(f"[分片 {self.state.low_id + 1}-{self.state.high_id}] {message}")
+
+  def begin(self) -> bool:
+    self.log(f"开始爬取，已保存: {self.saved_count}")
+    return True
+
+  def may_continue(self, min_id: int) -> bool:
+    return min_id > self.state.low_id + 1
+
+  def handle_page(self, page: Page) -> bool:
+    low_id, high_id = self.state.low_id, self.state.high_id
+    if page.message_ids:
+      # 区间外的消息只用于推进翻页位置
+      in_range = [m for m in page.resources if low_id < m.message_id <= high_id]
+      self._store(in_range, page.min_id)
+
+    if not page.message_ids or not self.may_continue(self.before_id):
+      self.log("分片爬取完成")
+      self.done = True
+      self.state_manager.clear()
+      return False
+    self.state_manager.save(self.state)
+    return True
+
+  def finish(self) -> int:
+    if self.crawler._interrupted and not self.done:
+      self.state_manager.save(self.state)
+    self.log(f"结束，共保存 {self.saved_count} 条资源")
+    return self.saved_count
+
+
+def plan_shards(channel_id: str, newest_id: int, shards: int) -> list[CrawlState]:
+  """把 [1, newest_id] 均分为若干个连续、不重叠的区间"""
+  shards = max(1, min(shards, newest_id))
+  size = -(-newest_id // shards)
+  states = []
+  high_id = newest_id
+  while high_id > 0:
+    low_id = max(0, high_id - size)
+    states.append(CrawlState(channel_id=channel_id, mode="shard", low_id=low_id, high_id=high_id))
+    high_id = low_id
+  return states
+
+
+class IncrementalCrawlRun(CrawlRun):
+  """增量爬取：翻到水位线（上次同步到的最大消息 ID）即停止
+
+  没有新消息时只需请求一次频道首页。只有完整翻到水位线后才推进水位线，
+  中途失败时下次仍从旧水位线补齐。
+  """
+
+  def __init__(self, crawler: ChannelCrawler, db: Database):
+    super().__init__(crawler, db)
+    self.watermark = 0
+    self.high_id = 0
+    self.reached = False
+
+  def begin(self) -> bool:
+    self.watermark = self.db.get_watermark(self.channel_id)
+    if not self.watermark:
+      # 尚未记录水位线（旧数据库），以库中最新消息为准
+      self.watermark = self.known_ids().max()
+
+    self.log(f"开始增量爬取: {self.crawler.channel_config['name']}")
+    self.log(f"水位线消息 ID: {self.watermark}")
+    self.log("-" * 50)
+
+    if self.watermark == 0:
+      self.log("数据库为空，请先使用 --all 进行初始爬取")
+      return False
+    return True
+
+  def may_continue(self, min_id: int) -> bool:
+    return min_id > self.watermark
+
+  def handle_page(self, page: Page) -> bool:
+    if not page.message_ids:
+      self.reached = True  # 已翻到频道开头
+      return False
+
+    page_new = len(self.save_page(page.resources))
+    self.saved_count += page_new
+    self.high_id = max(self.high_id, page.max_id)
+
+    self.log(f"本页: {len(page.resources)} 条，新增: {page_new} 条")
+
+    self.before_id = page.min_id
+    if not self.may_continue(self.before_id):
+      self.reached = True
+      return False
+    return True
+
+  def finish(self) -> int:
+    if self.reached and self.high_id > self.watermark:
+      self.db.set_watermark(self.channel_id, self.high_id)
+    self.log("-" * 50)
+    self.log(f"增量爬取完成，新增 {self.saved_count} 条资源")
+    return self.saved_count
+
+
+class LimitedCrawlRun(CrawlRun):
+  """限量爬取"""
+
+  def __init__(self, crawler: ChannelCrawler, db: Database, limit: int):
+    super().__init__(crawler, db)
+    self.limit = limit
+
+  def begin(self) -> bool:
+    self.log(f"开始爬取: {self.crawler.channel_config['name']}")
+    self.log(f"目标数量: {self.limit}")
+    self.log("-" * 50)
+    return self.limit > 0
+
+  def handle_page(self, page: Page) -> bool:
+    if not page.message_ids:
+      self.log("没有更多消息了")
+      return False
+
+    remaining = self.limit - self.saved_count
+    self.saved_count += len(self.save_page(page.resources, max_new=remaining))
+
+    self.log(f"本页: {len(page.resources)} 条，累计: {self.saved_count} 条")
+
+    self.before_id = page.min_id
+    return self.saved_count < self.limit
+
+  def finish(self) -> int:
+    self.log("-" * 50)
+    self.log(f"爬取完成，共保存 {self.saved_count} 条资源")
+    return self.saved_count
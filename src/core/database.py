@@ -1,14 +1,25 @@
 # -*- coding: utf-8 -*-
 """数据库模块"""
 
+import base64
+import hashlib
 import json
 import sqlite3
+import threading
 import time
+import zlib
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional
 
-from src.channels.config import CHANNELS, DATABASE_PATH, STATE_FILE
-from src.models.resource import Resource, CrawlState
+from src.channels.config import (
+  CHANNELS, DATABASE_PATH, STATE_FILE, DB_BUSY_TIMEOUT, DB_SYNCHRONOUS, DB_CACHE_SIZE_KB, DB_MMAP_SIZE,
+  SEARCH_COLUMN_WEIGHTS, SEARCH_RECENCY_WEIGHT, SEARCH_COUNT_CAP,
+)
+from src.core.fts import ngrams, match_query
+from src.models.resource import Resource, CrawlState, TelegraphResult
+from src.core.idset import MessageIdSet
+from src.utils.metrics import DB_WRITE_SECONDS, SEARCH_SECONDS
+from src.utils.profiling import profiled
 
 
 class StateManager:
@@ -17,6 +28,22 @@ class StateManager:
   def __init__(self, state_file: Path = STATE_FILE):
     self.state_file = state_file
 
+  @classmethod
+  def for_channel(cls, channel_id: str) -> "StateManager":
+    """频道独立的状态文件（并发爬取时避免互相覆盖）"""
+    return cls(STATE_FILE.with_name(f"crawl_state_{channel_id}.json"))
+
+  @classmethod
+  def for_shard(cls, channel_id: str, index: int) -> "StateManager":
+    """分片爬取时每个分片独立的状态文件"""
+    return cls(STATE_FILE.with_name(f"crawl_state_{channel_id}_shard{index}.json"))
+
+  @classmethod
+  def shard_managers(cls, channel_id: str) -> list["StateManager"]:
+    """频道现有的分片状态文件"""
+    files = STATE_FILE.parent.glob(f"crawl_state_{channel_id}_shard*.json")
+    return [cls(f) for f in sorted(files)]
+
   def load(self) -> Optional[CrawlState]:
     if not self.state_file.exists():
       return None
@@ -38,160 +65,799 @@ class StateManager:
       self.state_file.unlink()
 
 
+# 可以读取的资源字段；raw_html 来自 html_blobs（压缩数据，Resource 读取时才解压）
+RESOURCE_FIELDS = ("message_id", "title", "tags", "telegraph_url", "pan_url", "description", "created_at", "raw_html")
+# 已解析出网盘链接的资源（浏览模式只显示这些，部分索引使用同样的条件）
+HAS_PAN_URL = "pan_url IS NOT NULL AND pan_url != '' AND pan_url != 'N/A'"
+
+
+def compress_html(html: str) -> tuple[Optional[str], Optional[bytes]]:
+  """消息卡片 HTML -> (内容哈希, zlib 压缩数据)，空 HTML 返回 (None, None)"""
+  if not html:
+    return None, None
+  data = html.encode("utf-8")
+  return hashlib.sha1(data).hexdigest(), zlib.compress(data, 6)
+
+
+def _placeholders(values: list) -> str:
+  return ",".join("?" * len(values))
+
+
+def encode_cursor(key: list) -> str:
+  """分页游标：上一页最后一行的排序键，编码为不透明的字符串"""
+  data = json.dumps(key, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+  return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, types: tuple) -> list:
+  """解码 encode_cursor 的结果并检查各项的类型，无效时抛出 ValueError"""
+  try:
+    key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+  except (ValueError, TypeError) as e:
+    raise ValueError("无效的 cursor") from e
+  if (not isinstance(key, list) or len(key) != len(types)
+      or not all(type(v) is t for v, t in zip(key, types))):
+    raise ValueError("无效的 cursor")
+  return key
+
+
 class Database:
-  """SQLite 数据库管理（支持多频道独立表）"""
+  """SQLite 数据库管理
+
+  所有频道的资源保存在同一张 resources 表中（按 (channel_id, message_id) 唯一），
+  跨频道的搜索、浏览都是一条带索引的查询，不随频道数增加。
+
+  每个线程对每个数据库文件保持一个连接，重复使用；数据库使用 WAL 模式，
+  爬虫写入时 Web 端仍可以读取。表结构按 PRAGMA user_version 记录的版本迁移，
+  每个进程只在第一次连接时检查一次。
+  """
+
+  # 本进程中已迁移的数据库，避免每次连接都重复检查
+  _migrated: set[str] = set()
+  _schema_lock = threading.Lock()
+  _local = threading.local()
 
   def __init__(self, db_path: Path = DATABASE_PATH):
     self.db_path = db_path
 
-  def _get_table_name(self, channel_id: str) -> str:
-    return f"resources_{channel_id}"
-
-  def _init_table(self, channel_id: str):
-    table = self._get_table_name(channel_id)
-    with sqlite3.connect(self.db_path) as conn:
-      conn.execute(f"""
-        CREATE TABLE IF NOT EXISTS {table} (
-          message_id INTEGER PRIMARY KEY,
-          title TEXT NOT NULL,
-          tags TEXT,
-          telegraph_url TEXT,
-          pan_url TEXT,
-          description TEXT,
-          created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-          raw_html TEXT
-        )
-      """)
-      conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{channel_id}_title ON {table}(title)")
-      conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{channel_id}_tags ON {table}(tags)")
-      # 自动迁移: 添加 raw_html 列（如果不存在）
-      try:
+  def _select_resources(self, fields: Optional[Iterable[str]] = None, keys: Iterable[str] = (),
+                        extra: str = "") -> str:
+    """查询资源的 SELECT ... FROM 部分
+
+    fields 为需要读取的字段（默认全部，channel_id 与 message_id 总是读取），
+    keys 为分页需要的排序列，extra 为附加的列表达式；读取 raw_html 时才关联 html_blobs。
+    """
+    if fields is None:
+      fields = RESOURCE_FIELDS
+    else:
+      fields = set(fields)
+      unknown = fields - set(RESOURCE_FIELDS) - {"channel_id"}
+      if unknown:
+        raise ValueError(f"未知字段: {', '.join(sorted(unknown))}")
+      fields = [f for f in RESOURCE_FIELDS if f in fields or f in keys or f == "message_id"]
+    columns = ["t.channel_id"] + [f"t.{f}" for f in fields if f != "raw_html"]
+    source = "resources t"
+    if "raw_html" in fields:
+      columns.append("b.data AS raw_html")
+      source += " LEFT JOIN html_blobs b ON b.hash = t.html_hash"
+    if extra:
+      columns.append(extra)
+    return f"SELECT {', '.join(columns)} FROM {source}"
+
+  def _channel_filter(self, channel_id: Optional[str], ordered: bool = False) -> tuple[str, list]:
+    """限定频道的条件：指定频道，或 CHANNELS 中配置的所有频道（已删除频道的数据不显示）
+
+    ordered=True 时所有频道的条件不使用索引（"+" 前缀），查询按 ORDER BY 对应的索引顺序读取，
+    而不是按频道取出全部行再排序。
+    """
+    if channel_id:
+      return "t.channel_id = ?", [channel_id]
+    channels = list(CHANNELS.keys())
+    return f"{'+' if ordered else ''}t.channel_id IN ({_placeholders(channels)})", channels
+
+  def _channel_resources(self, rows: Iterable[sqlite3.Row]) -> list[tuple[str, Resource]]:
+    """(频道, 资源) 列表；没有读取的字段为空字符串"""
+    results = []
+    for row in rows:
+      data = {"title": "", "tags": ""}
+      data.update(row)
+      for key in ("id", "score"):  # 搜索分页使用的列
+        data.pop(key, None)
+      results.append((data.pop("channel_id"), Resource(**data)))
+    return results
+
+  def _resources(self, cursor: sqlite3.Cursor) -> list[Resource]:
+    return [resource for _, resource in self._channel_resources(cursor)]
+
+  # ------------------------------------------------------------
+  # 连接与表结构
+  # ------------------------------------------------------------
+
+  def _connect(self) -> sqlite3.Connection:
+    """当前线程的连接（第一次使用时打开并迁移表结构）
+
+    with self._connect() as conn: 结束时提交（出错时回滚），不关闭连接。
+    """
+    connections = self._local.__dict__.setdefault("connections", {})
+    key = str(self.db_path)
+    conn = connections.get(key)
+    if conn is None:
+      conn = sqlite3.connect(self.db_path, timeout=DB_BUSY_TIMEOUT)
+      conn.row_factory = sqlite3.Row
+      conn.execute("PRAGMA journal_mode = WAL")
+      conn.execute(f"PRAGMA synchronous = {DB_SYNCHRONOUS}")
+      conn.execute(f"PRAGMA cache_size = {-DB_CACHE_SIZE_KB}")
+      conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+      conn.execute("PRAGMA temp_store = MEMORY")
+      connections[key] = conn
+      self._migrate(conn)
+    return conn
+
+  def close(self):
+    """关闭当前线程的连接（线程结束时连接会自动关闭，一般不需要调用）"""
+    conn = self._local.__dict__.get("connections", {}).pop(str(self.db_path), None)
+    if conn is not None:
+      conn.close()
+
+  def _migrate(self, conn: sqlite3.Connection):
+    """执行尚未执行的迁移步骤（每个进程每个数据库检查一次）"""
+    key = str(self.db_path)
+    if key in self._migrated:
+      return
+    with self._schema_lock:
+      if key in self._migrated:
+        return
+      vacuum = False
+      if conn.execute("PRAGMA user_version").fetchone()[0] < len(self.MIGRATIONS):
+        # 立即加写锁，其他进程同时打开数据库时只有一个执行迁移
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+          version = conn.execute("PRAGMA user_version").fetchone()[0]
+          for step in self.MIGRATIONS[version:]:
+            vacuum = step(self, conn) or vacuum
+          conn.execute(f"PRAGMA user_version = {len(self.MIGRATIONS)}")
+          conn.commit()
+        except BaseException:
+          conn.rollback()
+          raise
+      if vacuum:
+        self._vacuum(conn)
+      self._migrated.add(key)
+
+  def _channel_tables(self, conn: sqlite3.Connection) -> list[str]:
+    """旧版每个频道独立的资源表 resources_<频道ID>"""
+    cursor = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'resources\\_%' ESCAPE '\\'")
+    return [row[0] for row in cursor]
+
+  def _migrate_v1_shared_tables(self, conn: sqlite3.Connection):
+    """v1: 所有频道共用的表"""
+    self._init_blob_table(conn)
+    self._init_watermark_table(conn)
+    self._init_telegraph_table(conn)
+
+  def _migrate_v2_html_hash(self, conn: sqlite3.Connection):
+    """v2: 旧版资源表添加 raw_html / html_hash 列"""
+    for table in self._channel_tables(conn):
+      columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+      if "raw_html" not in columns:
         conn.execute(f"ALTER TABLE {table} ADD COLUMN raw_html TEXT")
-      except sqlite3.OperationalError:
-        pass  # 列已存在
-      conn.commit()
+      if "html_hash" not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN html_hash TEXT")
+
+  def _migrate_v3_compress_html(self, conn: sqlite3.Connection) -> bool:
+    """v3: 旧版直接存在资源表中的 raw_html 压缩后移到 html_blobs，返回是否需要回收空间"""
+    return sum(self._migrate_raw_html(conn, table) for table in self._channel_tables(conn)) > 0
+
+  def _migrate_v4_unified_table(self, conn: sqlite3.Connection) -> bool:
+    """v4: 各频道的资源表合并到 resources 表，建立统一的搜索索引"""
+    self._create_resource_table(conn)
+    tables = self._channel_tables(conn)
+    for table in tables:
+      channel_id = table[len("resources_"):]
+      count = conn.execute(f"""
+        INSERT OR IGNORE INTO resources
+        (channel_id, message_id, title, tags, telegraph_url, pan_url, description, created_at, html_hash)
+        SELECT ?, message_id, title, tags, telegraph_url, pan_url, description, COALESCE(created_at, ''), html_hash
+        FROM {table}
+      """, (channel_id,)).rowcount
+      print(f"迁移 {table}: {count} 条资源合并到 resources")
+      # 删除表时其上的触发器（旧版各频道搜索索引的触发器）一起删除
+      conn.execute(f"DROP TABLE {table}")
+      conn.execute(f"DROP TABLE IF EXISTS search_{channel_id}")
+    self._create_search_index(conn)
+    self._fill_search_index(conn)
+    return bool(tables)
+
+  def _migrate_v5_blob_refs(self, conn: sqlite3.Connection) -> bool:
+    """v5: html_hash 索引；删除之前重新爬取后不再被引用的消息卡片，返回是否需要回收空间"""
+    self._create_resource_table(conn)
+    count = self._delete_unreferenced_blobs(conn)
+    if count:
+      print(f"删除 {count} 条不再被引用的消息卡片")
+    return count > 0
+
+  def _migrate_v6_search_writes(self, conn: sqlite3.Connection):
+    """v6: 搜索索引改为由 _write_rows 写入，删除调用 Python 函数 fts_ngrams 的触发器
+
+    这两个触发器使其他客户端（sqlite3 命令行等）无法写入资源表。
+    """
+    for trigger in ("insert", "update"):
+      conn.execute(f"DROP TRIGGER IF EXISTS resource_search_{trigger}")
+
+  # 按版本顺序排列的迁移步骤，user_version 为已执行的步骤数
+  MIGRATIONS = (
+    _migrate_v1_shared_tables,
+    _migrate_v2_html_hash,
+    _migrate_v3_compress_html,
+    _migrate_v4_unified_table,
+    _migrate_v5_blob_refs,
+    _migrate_v6_search_writes,
+  )
+
+  def _create_resource_table(self, conn: sqlite3.Connection):
+    # id 为 FTS 索引的 rowid（显式的 INTEGER PRIMARY KEY 在 VACUUM 后保持不变）
+    conn.execute("""
+      CREATE TABLE IF NOT EXISTS resources (
+        id INTEGER PRIMARY KEY,
+        channel_id TEXT NOT NULL,
+        message_id INTEGER NOT NULL,
+        title TEXT NOT NULL,
+        tags TEXT,
+        telegraph_url TEXT,
+        pan_url TEXT,
+        description TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        html_hash TEXT,
+        UNIQUE (channel_id, message_id)
+      )
+    """)
+    # 解析状态（未解析、N/A 重试）
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_resources_pan ON resources(channel_id, pan_url)")
+    # 浏览：全部频道 / 单个频道按入库时间排序，只包含有网盘链接的资源
+    conn.execute(f"""
+      CREATE INDEX IF NOT EXISTS idx_resources_browse
+      ON resources(created_at, message_id, channel_id) WHERE {HAS_PAN_URL}
+    """)
+    conn.execute(f"""
+      CREATE INDEX IF NOT EXISTS idx_resources_channel_browse
+      ON resources(channel_id, created_at, message_id) WHERE {HAS_PAN_URL}
+    """)
+    # 检查消息卡片是否仍被引用
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_resources_html_hash ON resources(html_hash)")
+
+  def _init_blob_table(self, conn: sqlite3.Connection):
+    """消息卡片 HTML 按内容哈希去重、压缩保存"""
+    conn.execute("""
+      CREATE TABLE IF NOT EXISTS html_blobs (
+        hash TEXT PRIMARY KEY,
+        data BLOB NOT NULL
+      )
+    """)
+
+  def _migrate_raw_html(self, conn: sqlite3.Connection, table: str) -> int:
+    """把旧版直接存在资源表中的 raw_html 移到 html_blobs，返回迁移的条数"""
+    ids = [row[0] for row in conn.execute(
+      f"SELECT message_id FROM {table} WHERE raw_html IS NOT NULL")]
+    if not ids:
+      return 0
+
+    print(f"迁移 {table}: 压缩 {len(ids)} 条 raw_html ...")
+    for i in range(0, len(ids), 500):
+      chunk = ids[i:i + 500]
+      cursor = conn.execute(
+        f"SELECT message_id, raw_html FROM {table} WHERE message_id IN ({_placeholders(chunk)})", chunk)
+      blobs, updates = [], []
+      for message_id, raw_html in cursor.fetchall():
+        html_hash, data = compress_html(raw_html)
+        if html_hash:
+          blobs.append((html_hash, data))
+        updates.append((html_hash, message_id))
+      conn.executemany("INSERT OR IGNORE INTO html_blobs (hash, data) VALUES (?, ?)", blobs)
+      conn.executemany(f"UPDATE {table} SET html_hash = ?, raw_html = NULL WHERE message_id = ?", updates)
+    return len(ids)
+
+  def _delete_unreferenced_blobs(self, conn: sqlite3.Connection, hashes: Optional[Iterable[str]] = None) -> int:
+    """删除没有资源引用的消息卡片，hashes 为空时检查全部，返回删除的条数"""
+    unreferenced = "NOT EXISTS (SELECT 1 FROM resources r WHERE r.html_hash = html_blobs.hash)"
+    if hashes is None:
+      return conn.execute(f"DELETE FROM html_blobs WHERE {unreferenced}").rowcount
+    hashes = list(hashes)
+    count = 0
+    for i in range(0, len(hashes), 500):
+      chunk = hashes[i:i + 500]
+      count += conn.execute(
+        f"DELETE FROM html_blobs WHERE hash IN ({_placeholders(chunk)}) AND {unreferenced}", chunk).rowcount
+    return count
+
+  def _vacuum(self, conn: sqlite3.Connection):
+    """迁移后回收旧数据占用的空间（数据库被其他进程占用时跳过）"""
+    try:
+      conn.execute("VACUUM")
+    except sqlite3.OperationalError as e:
+      print(f"回收空间失败（可稍后重试）: {e}")
+
+  # ------------------------------------------------------------
+  # 全文搜索索引
+  # ------------------------------------------------------------
+
+  def _create_search_index(self, conn: sqlite3.Connection):
+    """创建 FTS5 索引表 resource_search（rowid 为 resources.id）
+
+    索引中的文本为 ngrams 切分后的词，由 _write_rows 在写入资源的同一事务中写入
+    （不用触发器，触发器需要每个连接都注册 Python 函数，其他客户端无法写入资源表）。
+    删除资源时由触发器删除对应的索引行。不经过 Database 写入的资源不会被索引，
+    可以用 rebuild_search_index（reindex 命令）补齐。
+    """
+    conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS resource_search USING fts5(title, tags, description)")
+    conn.execute("""
+      CREATE TRIGGER IF NOT EXISTS resource_search_delete AFTER DELETE ON resources BEGIN
+        DELETE FROM resource_search WHERE rowid = old.id;
+      END
+    """)
+
+  def _fill_search_index(self, conn: sqlite3.Connection, channel_id: Optional[str] = None):
+    """重新写入索引（指定频道时只写入该频道）"""
+    where, params = ("WHERE channel_id = ?", [channel_id]) if channel_id else ("", [])
+    conn.execute(f"DELETE FROM resource_search WHERE rowid IN (SELECT id FROM resources {where})", params)
+    cursor = conn.execute(f"SELECT id, title, tags, description FROM resources {where}", params)
+    while rows := cursor.fetchmany(1000):
+      self._insert_search_rows(conn, rows)
+    conn.execute("INSERT INTO resource_search (resource_search) VALUES ('optimize')")
+
+  def _index_resources(self, conn: sqlite3.Connection, channel_id: str, message_ids: list[int]):
+    """按资源表中的当前内容重新写入这些资源的索引行"""
+    for i in range(0, len(message_ids), 500):
+      chunk = message_ids[i:i + 500]
+      rows = conn.execute(f"""
+        SELECT id, title, tags, description FROM resources
+        WHERE channel_id = ? AND message_id IN ({_placeholders(chunk)})
+      """, [channel_id, *chunk]).fetchall()
+      conn.executemany("DELETE FROM resource_search WHERE rowid = ?", [(row[0],) for row in rows])
+      self._insert_search_rows(conn, rows)
+
+  def _insert_search_rows(self, conn: sqlite3.Connection, rows: list):
+    """rows: (id, title, tags, description)"""
+    conn.executemany(
+      "INSERT INTO resource_search (rowid, title, tags, description) VALUES (?, ?, ?, ?)",
+      [(row[0], ngrams(row[1]), ngrams(row[2]), ngrams(row[3])) for row in rows])
 
+  @profiled("db")
+  def rebuild_search_index(self, channel_id: Optional[str] = None) -> dict[str, int]:
+    """重建搜索索引（分词方式改变或索引损坏时使用），返回 {频道: 索引条数}
+
+    不指定频道时删除并重新创建整个索引。
+    """
+    with self._connect() as conn:
+      if not channel_id:
+        for trigger in ("insert", "update", "delete"):
+          conn.execute(f"DROP TRIGGER IF EXISTS resource_search_{trigger}")
+        conn.execute("DROP TABLE IF EXISTS resource_search")
+        self._create_search_index(conn)
+      self._fill_search_index(conn, channel_id)
+      where, params = self._channel_filter(channel_id)
+      cursor = conn.execute(f"""
+        SELECT t.channel_id, COUNT(*) FROM resource_search JOIN resources t ON t.id = resource_search.rowid
+        WHERE {where} GROUP BY t.channel_id
+      """, params)
+      counts = dict.fromkeys(params, 0)
+      counts.update((row[0], row[1]) for row in cursor)
+      return counts
+
+  # ------------------------------------------------------------
+  # 资源
+  # ------------------------------------------------------------
+
+  @profiled("db")
+  @DB_WRITE_SECONDS.time(operation="save_resource")
   def save_resource(self, channel_id: str, resource: Resource) -> bool:
-    self._init_table(channel_id)
-    table = self._get_table_name(channel_id)
-    with sqlite3.connect(self.db_path) as conn:
-      conn.execute(f"""
-        INSERT OR REPLACE INTO {table}
-        (message_id, title, tags, telegraph_url, pan_url, description, created_at, raw_html)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-      """, (
-        resource.message_id,
-        resource.title,
-        resource.tags,
-        resource.telegraph_url,
-        resource.pan_url,
-        resource.description,
-        resource.created_at or time.strftime("%Y-%m-%d %H:%M:%S"),
-        resource.raw_html
-      ))
+    with self._connect() as conn:
+      self._write_rows(conn, channel_id, [resource], replace=True)
       conn.commit()
     return True
 
+  @profiled("db")
+  @DB_WRITE_SECONDS.time(operation="save_resources")
+  def save_resources(self, channel_id: str, resources: list[Resource], replace: bool = False,
+                     max_new: Optional[int] = None, known: Optional[MessageIdSet] = None) -> list[int]:
+    """批量保存（单连接、单事务），返回新增的消息 ID
+
+    replace=False 时已存在的消息保持不变；replace=True 时覆盖已存在的消息。
+    max_new 限制最多新增的条数（按传入顺序）。
+    known 为该频道已入库的 ID 集合（见 load_message_ids），传入时直接用它判断
+    是否已存在而不查询数据库，并把新增的 ID 加入其中。
+    """
+    if not resources:
+      return []
+    ids = list(dict.fromkeys(r.message_id for r in resources))
+
+    with self._connect() as conn:
+      if known is not None:
+        existing = {i for i in ids if i in known}
+      else:
+        existing = set()
+        for i in range(0, len(ids), 500):
+          chunk = ids[i:i + 500]
+          cursor = conn.execute(
+            f"SELECT message_id FROM resources WHERE channel_id = ? AND message_id IN ({_placeholders(chunk)})",
+            [channel_id, *chunk])
+          existing.update(row[0] for row in cursor)
+
+      new_ids = [i for i in ids if i not in existing]
+      if max_new is not None:
+        new_ids = new_ids[:max(0, max_new)]
+      accepted = set(new_ids)
+
+      if replace:
+        rows = [r for r in resources if r.message_id in existing or r.message_id in accepted]
+      else:
+        rows = [r for r in resources if r.message_id in accepted]
+
+      self._write_rows(conn, channel_id, rows, replace)
+      conn.commit()
+
+    if known is not None:
+      known.update(new_ids)
+    return new_ids
+
+  def _write_rows(self, conn: sqlite3.Connection, channel_id: str, resources: list[Resource], replace: bool):
+    """写入资源行，raw_html 压缩后写入 html_blobs
+
+    replace=True 时已存在的行原地更新（保持 id 不变），卡片内容变化后不再被任何资源
+    引用的旧卡片随之删除。写入的资源同时写入搜索索引。
+    """
+    rows, blobs = [], {}
+    for resource in resources:
+      html_hash, data = compress_html(resource.raw_html)
+      if html_hash:
+        blobs[html_hash] = data
+      rows.append(self._resource_row(channel_id, resource, html_hash))
+
+    old_hashes = set()
+    if replace:
+      ids = [r.message_id for r in resources]
+      for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        old_hashes.update(row[0] for row in conn.execute(f"""
+          SELECT html_hash FROM resources
+          WHERE channel_id = ? AND message_id IN ({_placeholders(chunk)}) AND html_hash IS NOT NULL
+        """, [channel_id, *chunk]))
+      old_hashes.difference_update(blobs)
+
+    conn.executemany("INSERT OR IGNORE INTO html_blobs (hash, data) VALUES (?, ?)", blobs.items())
+    if replace:
+      conflict = """
+        ON CONFLICT (channel_id, message_id) DO UPDATE SET
+          title = excluded.title, tags = excluded.tags, telegraph_url = excluded.telegraph_url,
+          pan_url = excluded.pan_url, description = excluded.description,
+          created_at = excluded.created_at, html_hash = excluded.html_hash
+      """
+    else:
+      conflict = "ON CONFLICT DO NOTHING"
+    conn.executemany(f"""
+      INSERT INTO resources
+      (channel_id, message_id, title, tags, telegraph_url, pan_url, description, created_at, html_hash)
+      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+      {conflict}
+    """, rows)
+    self._index_resources(conn, channel_id, list(dict.fromkeys(r.message_id for r in resources)))
+    if old_hashes:
+      self._delete_unreferenced_blobs(conn, old_hashes)
+
+  def _resource_row(self, channel_id: str, resource: Resource, html_hash: Optional[str]) -> tuple:
+    return (
+      channel_id,
+      resource.message_id,
+      resource.title,
+      resource.tags,
+      resource.telegraph_url,
+      resource.pan_url,
+      resource.description,
+      resource.created_at or time.strftime("%Y-%m-%d %H:%M:%S"),
+      html_hash
+    )
+
+  @profiled("db")
   def exists(self, channel_id: str, message_id: int) -> bool:
-    self._init_table(channel_id)
-    table = self._get_table_name(channel_id)
-    with sqlite3.connect(self.db_path) as conn:
-      cursor = conn.execute(f"SELECT 1 FROM {table} WHERE message_id = ?", (message_id,))
+    with self._connect() as conn:
+      cursor = conn.execute(
+        "SELECT 1 FROM resources WHERE channel_id = ? AND message_id = ?", (channel_id, message_id))
       return cursor.fetchone() is not None
 
+  @profiled("db")
+  def load_message_ids(self, channel_id: str) -> MessageIdSet:
+    """读取频道全部已入库的消息 ID"""
+    with self._connect() as conn:
+      cursor = conn.cursor()
+      cursor.row_factory = None  # 只取一列，不需要 sqlite3.Row
+      return MessageIdSet(row[0] for row in cursor.execute(
+        "SELECT message_id FROM resources WHERE channel_id = ?", (channel_id,)))
+
+  @profiled("db")
   def get_unparsed(self, channel_id: str, limit: int = 100) -> list[Resource]:
-    self._init_table(channel_id)
-    table = self._get_table_name(channel_id)
-    with sqlite3.connect(self.db_path) as conn:
-      conn.row_factory = sqlite3.Row
+    with self._connect() as conn:
       cursor = conn.execute(f"""
-        SELECT * FROM {table}
-        WHERE pan_url IS NULL OR pan_url = ''
-        ORDER BY message_id DESC LIMIT ?
-      """, (limit,))
-      return [Resource(**dict(row)) for row in cursor.fetchall()]
+        {self._select_resources()}
+        WHERE t.channel_id = ? AND (t.pan_url IS NULL OR t.pan_url = '')
+        ORDER BY t.message_id DESC LIMIT ?
+      """, (channel_id, limit))
+      return self._resources(cursor)
 
   def search(self, keyword: str, channel_id: Optional[str] = None) -> list[tuple[str, Resource]]:
-    """搜索资源（只搜索标题和标签）"""
-    results = []
-    channels = [channel_id] if channel_id else list(CHANNELS.keys())
+    """搜索资源的全部结果（见 search_page）"""
+    return self.search_page(keyword, channel_id)[0]
 
-    with sqlite3.connect(self.db_path) as conn:
-      conn.row_factory = sqlite3.Row
-      for ch_id in channels:
-        table = self._get_table_name(ch_id)
-        try:
-          cursor = conn.execute(f"""
-            SELECT * FROM {table}
-            WHERE (title LIKE ? OR tags LIKE ?) AND pan_url != 'N/A'
-            ORDER BY message_id DESC
-          """, (f"%{keyword}%", f"%{keyword}%"))
-          for row in cursor.fetchall():
-            results.append((ch_id, Resource(**dict(row))))
-        except sqlite3.OperationalError:
-          continue
+  @profiled("db")
+  @SEARCH_SECONDS.time(kind="keyword")
+  def search_page(self, keyword: str, channel_id: Optional[str] = None, limit: Optional[int] = None,
+                  cursor: Optional[str] = None,
+                  fields: Optional[Iterable[str]] = None) -> tuple[list[tuple[str, Resource]], Optional[str]]:
+    """搜索资源（标题、标签、简介），按相关度与新旧排序，返回 (资源列表, 下一页的游标)
 
-    return results
+    使用全文搜索索引；关键词太短无法使用索引时（单个汉字）改为在标题和标签中模糊匹配，按入库时间从新到旧排序。
+    limit 为空时返回全部结果；fields 见 _select_resources。
+    """
+    query = match_query(keyword)
+    if query is None:
+      where, params = self._channel_filter(channel_id, ordered=True)
+      return self._keyset_page(
+        f"(t.title LIKE ? OR t.tags LIKE ?) AND {where} AND t.pan_url != 'N/A'",
+        [f"%{keyword}%", f"%{keyword}%", *params], self._BROWSE_ORDER, limit, cursor, 0, fields)
+
+    # bm25 越小越相关；新旧程度按频道内消息 ID 归一化到 0~1 后加权扣减。
+    # 按 (score, id) 从小到大排序，游标为上一页最后一行的 (score, id)
+    where, params = self._channel_filter(channel_id)
+    score = """bm25(resource_search, ?, ?, ?) - ? * t.message_id
+      / (SELECT MAX(message_id) FROM resources m WHERE m.channel_id = t.channel_id)"""
+    after, key = "", []
+    if cursor:
+      key = decode_cursor(cursor, (float, int))
+      after = "WHERE (score, id) > (?, ?)"
+    with self._connect() as conn:
+      # 先只按 (id, score) 排序取出一页，再读取这一页的字段；
+      # 最内层子查询带 LIMIT -1，不会被展开，bm25 只出现在结果列中
+      rows = conn.execute(f"""
+        {self._select_resources(fields, extra="k.id AS id, k.score AS score")}
+        JOIN (
+          SELECT id, score FROM (
+            SELECT t.id AS id, {score} AS score
+            FROM resource_search JOIN resources t ON t.id = resource_search.rowid
+            WHERE resource_search MATCH ? AND {where} AND t.pan_url != 'N/A'
+            LIMIT -1
+          ) {after}
+          ORDER BY score, id LIMIT ?
+        ) k ON k.id = t.id
+        ORDER BY k.score, k.id
+      """, (*SEARCH_COLUMN_WEIGHTS, float(SEARCH_RECENCY_WEIGHT), query, *params, *key,
+            -1 if limit is None else limit + 1)).fetchall()
+    if limit is None or len(rows) <= limit:
+      return self._channel_resources(rows), None
+    return self._channel_resources(rows[:limit]), encode_cursor([rows[limit - 1]["score"], rows[limit - 1]["id"]])
+
+  @profiled("db")
+  def count_matches(self, keyword: str, channel_id: Optional[str] = None,
+                    cap: int = SEARCH_COUNT_CAP) -> tuple[int, bool]:
+    """搜索结果的条数，最多数到 cap 条，返回 (条数, 是否准确)"""
+    query = match_query(keyword)
+    where, params = self._channel_filter(channel_id)
+    if query is None:
+      sql = f"""
+        SELECT 1 FROM resources t
+        WHERE (t.title LIKE ? OR t.tags LIKE ?) AND {where} AND t.pan_url != 'N/A'
+      """
+      params = [f"%{keyword}%", f"%{keyword}%", *params]
+    else:
+      sql = f"""
+        SELECT 1 FROM resource_search JOIN resources t ON t.id = resource_search.rowid
+        WHERE resource_search MATCH ? AND {where} AND t.pan_url != 'N/A'
+      """
+      params = [query, *params]
+    with self._connect() as conn:
+      count = conn.execute(f"SELECT COUNT(*) FROM ({sql} LIMIT ?)", (*params, cap + 1)).fetchone()[0]
+    return min(count, cap), count <= cap
+
+  def _keyset_page(self, where: str, params: list, order: tuple, limit: Optional[int],
+                   cursor: Optional[str], offset: int,
+                   fields: Optional[Iterable[str]] = None) -> tuple[list[tuple[str, Resource]], Optional[str]]:
+    """按 order 中的列从大到小分页，返回 (资源列表, 下一页的游标)
+
+    传入 cursor 时从游标之后读取（WHERE (列...) < (游标)，直接在索引中定位，
+    翻到多深都和第一页一样快）；否则跳过前 offset 行。没有下一页时游标为 None，
+    limit 为空时读取全部。
+    """
+    columns = ", ".join(f"t.{c}" for c in order)
+    if cursor:
+      key = decode_cursor(cursor, tuple(self._KEY_TYPES[c] for c in order))
+      where += f" AND ({columns}) < ({_placeholders(key)})"
+      params = [*params, *key]
+      offset = 0
+    with self._connect() as conn:
+      rows = conn.execute(f"""
+        {self._select_resources(fields, keys=order)}
+        WHERE {where}
+        ORDER BY {", ".join(f"t.{c} DESC" for c in order)}
+        LIMIT ? OFFSET ?
+      """, (*params, -1 if limit is None else limit + 1, max(offset, 0))).fetchall()
+    if limit is None or len(rows) <= limit:
+      return self._channel_resources(rows), None
+    return self._channel_resources(rows[:limit]), encode_cursor([rows[limit - 1][c] for c in order])
+
+  # 游标中各排序列的类型；浏览（以及模糊匹配）的排序
+  _KEY_TYPES = {"created_at": str, "message_id": int, "channel_id": str}
+  _BROWSE_ORDER = ("created_at", "message_id", "channel_id")
 
   def list_all(self, channel_id: str, limit: int = 50) -> list[Resource]:
-    self._init_table(channel_id)
-    table = self._get_table_name(channel_id)
-    with sqlite3.connect(self.db_path) as conn:
-      conn.row_factory = sqlite3.Row
-      cursor = conn.execute(f"SELECT * FROM {table} ORDER BY message_id DESC LIMIT ?", (limit,))
-      return [Resource(**dict(row)) for row in cursor.fetchall()]
+    return self.list_page(channel_id, limit)[0]
+
+  @profiled("db")
+  def list_page(self, channel_id: str, limit: int = 20, cursor: Optional[str] = None,
+                offset: int = 0) -> tuple[list[Resource], Optional[str]]:
+    """频道的资源（按消息 ID 从新到旧），返回 (资源列表, 下一页的游标)"""
+    results, next_cursor = self._keyset_page(
+      "t.channel_id = ?", [channel_id], ("message_id",), limit, cursor, offset)
+    return [r for _, r in results], next_cursor
+
+  @profiled("db")
+  @SEARCH_SECONDS.time(kind="browse")
+  def browse(self, channel_id: Optional[str] = None, limit: int = 20, cursor: Optional[str] = None,
+             offset: int = 0, fields: Optional[Iterable[str]] = None) -> tuple[list[tuple[str, Resource]], Optional[str]]:
+    """所有频道（或指定频道）有网盘链接的资源，按入库时间从新到旧，返回 (资源列表, 下一页的游标)"""
+    where, params = self._channel_filter(channel_id, ordered=True)
+    return self._keyset_page(f"{where} AND {HAS_PAN_URL}", params, self._BROWSE_ORDER, limit, cursor, offset, fields)
+
+  @profiled("db")
+  def get_resource(self, channel_id: str, message_id: int,
+                   fields: Optional[Iterable[str]] = None) -> Optional[Resource]:
+    with self._connect() as conn:
+      rows = conn.execute(f"{self._select_resources(fields)} WHERE t.channel_id = ? AND t.message_id = ?",
+                          (channel_id, message_id)).fetchall()
+    return self._resources(rows)[0] if rows else None
+
+  @profiled("db")
+  def count_browsable(self, channel_id: Optional[str] = None) -> int:
+    """browse 的总条数"""
+    where, params = self._channel_filter(channel_id)
+    with self._connect() as conn:
+      return conn.execute(f"SELECT COUNT(*) FROM resources t WHERE {where} AND {HAS_PAN_URL}", params).fetchone()[0]
 
   def list_all_channels(self, channel_id: Optional[str] = None, page: int = 1, per_page: int = 20) -> tuple[list[tuple[str, Resource]], int]:
-    """获取所有频道资源（分页），返回 (资源列表, 总数)"""
-    channels = [channel_id] if channel_id else list(CHANNELS.keys())
-    all_results = []
-    total_count = 0
+    """按页码获取 browse 的一页，返回 (资源列表, 总数)；翻页较深时使用 browse 的游标更快"""
+    results, _ = self.browse(channel_id, per_page, offset=(max(page, 1) - 1) * per_page)
+    return results, self.count_browsable(channel_id)
 
-    with sqlite3.connect(self.db_path) as conn:
-      conn.row_factory = sqlite3.Row
-      for ch_id in channels:
-        table = self._get_table_name(ch_id)
-        try:
-          # 获取总数
-          cursor = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE pan_url IS NOT NULL AND pan_url != '' AND pan_url != 'N/A'")
-          total_count += cursor.fetchone()[0]
-          
-          # 获取资源
-          cursor = conn.execute(f"""
-            SELECT * FROM {table}
-            WHERE pan_url IS NOT NULL AND pan_url != '' AND pan_url != 'N/A'
-            ORDER BY created_at DESC, message_id DESC
-          """)
-          for row in cursor.fetchall():
-            all_results.append((ch_id, Resource(**dict(row))))
-        except sqlite3.OperationalError:
-          continue
-
-    # 按 created_at 排序（跨频道）
-    all_results.sort(key=lambda x: (x[1].created_at or '', x[1].message_id), reverse=True)
-    
-    # 分页
-    start = (page - 1) * per_page
-    return all_results[start:start + per_page], total_count
+  @profiled("db")
+  def channel_stats(self) -> dict[str, dict[str, int]]:
+    """各频道的资源数、未解析数与最新消息 ID（一次查询）
+
+    {频道: {"total": ..., "unparsed": ..., "latest": ...}}
+    """
+    where, params = self._channel_filter(None)
+    with self._connect() as conn:
+      cursor = conn.execute(f"""
+        SELECT t.channel_id, COUNT(*), SUM(t.pan_url IS NULL OR t.pan_url = ''), MAX(t.message_id)
+        FROM resources t WHERE {where} GROUP BY t.channel_id
+      """, params)
+      stats = {ch_id: {"total": 0, "unparsed": 0, "latest": 0} for ch_id in params}
+      for ch_id, total, unparsed, latest in cursor:
+        stats[ch_id] = {"total": total, "unparsed": unparsed or 0, "latest": latest or 0}
+      return stats
+
+  def _init_watermark_table(self, conn: sqlite3.Connection):
+    conn.execute("""
+      CREATE TABLE IF NOT EXISTS crawl_watermarks (
+        channel_id TEXT PRIMARY KEY,
+        high_id INTEGER NOT NULL,
+        updated_at TEXT
+      )
+    """)
+
+  @profiled("db")
+  def get_watermark(self, channel_id: str) -> int:
+    """增量同步水位线：已完整同步到的最大消息 ID，未记录时为 0"""
+    with self._connect() as conn:
+      row = conn.execute("SELECT high_id FROM crawl_watermarks WHERE channel_id = ?", (channel_id,)).fetchone()
+      return row[0] if row else 0
+
+  @profiled("db")
+  @DB_WRITE_SECONDS.time(operation="set_watermark")
+  def set_watermark(self, channel_id: str, high_id: int):
+    """推进水位线（只增不减）"""
+    if not high_id:
+      return
+    with self._connect() as conn:
+      conn.execute("""
+        INSERT INTO crawl_watermarks (channel_id, high_id, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT(channel_id) DO UPDATE SET
+          high_id = MAX(high_id, excluded.high_id), updated_at = excluded.updated_at
+      """, (channel_id, high_id, time.strftime("%Y-%m-%d %H:%M:%S")))
+      conn.commit()
 
+  @profiled("db")
   def get_latest_message_id(self, channel_id: str) -> int:
-    self._init_table(channel_id)
-    table = self._get_table_name(channel_id)
-    with sqlite3.connect(self.db_path) as conn:
-      cursor = conn.execute(f"SELECT MAX(message_id) FROM {table}")
+    with self._connect() as conn:
+      cursor = conn.execute("SELECT MAX(message_id) FROM resources WHERE channel_id = ?", (channel_id,))
       result = cursor.fetchone()[0]
       return result or 0
 
+  @profiled("db")
   def count(self, channel_id: str) -> int:
-    self._init_table(channel_id)
-    table = self._get_table_name(channel_id)
-    with sqlite3.connect(self.db_path) as conn:
-      cursor = conn.execute(f"SELECT COUNT(*) FROM {table}")
+    with self._connect() as conn:
+      cursor = conn.execute("SELECT COUNT(*) FROM resources WHERE channel_id = ?", (channel_id,))
       return cursor.fetchone()[0]
 
+  @profiled("db")
   def count_unparsed(self, channel_id: str) -> int:
-    self._init_table(channel_id)
-    table = self._get_table_name(channel_id)
-    with sqlite3.connect(self.db_path) as conn:
-      cursor = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE pan_url IS NULL OR pan_url = ''")
+    with self._connect() as conn:
+      cursor = conn.execute(
+        "SELECT COUNT(*) FROM resources WHERE channel_id = ? AND (pan_url IS NULL OR pan_url = '')", (channel_id,))
       return cursor.fetchone()[0]
+
+  # ------------------------------------------------------------
+  # Telegraph 解析结果缓存
+  # ------------------------------------------------------------
+
+  def _init_telegraph_table(self, conn: sqlite3.Connection):
+    conn.execute("""
+      CREATE TABLE IF NOT EXISTS telegraph_cache (
+        url TEXT PRIMARY KEY,
+        pan_url TEXT,
+        description TEXT,
+        status TEXT NOT NULL,
+        failures INTEGER DEFAULT 0,
+        checked_at REAL,
+        retry_at REAL
+      )
+    """)
+
+  # 标记为 N/A、但不在重试等待期内的资源（没有缓存记录的旧数据也会重试一次）
+  _RETRY_DUE = """
+    t.channel_id = ? AND t.pan_url = 'N/A' AND t.telegraph_url != '' AND t.telegraph_url NOT IN (
+      SELECT url FROM telegraph_cache WHERE status != 'ok' AND (retry_at IS NULL OR retry_at > ?)
+    )
+  """
+
+  @profiled("db")
+  def get_telegraph_results(self, urls: list[str]) -> dict[str, TelegraphResult]:
+    """查询 Telegraph 链接的缓存结果 {URL: 结果}"""
+    results = {}
+    with self._connect() as conn:
+      for i in range(0, len(urls), 500):
+        chunk = urls[i:i + 500]
+        cursor = conn.execute(
+          f"SELECT * FROM telegraph_cache WHERE url IN ({_placeholders(chunk)})", chunk)
+        for row in cursor:
+          results[row["url"]] = TelegraphResult(**dict(row))
+    return results
+
+  @profiled("db")
+  @DB_WRITE_SECONDS.time(operation="save_telegraph_result")
+  def save_telegraph_result(self, result: TelegraphResult):
+    with self._connect() as conn:
+      conn.execute("""
+        INSERT OR REPLACE INTO telegraph_cache
+        (url, pan_url, description, status, failures, checked_at, retry_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+      """, (result.url, result.pan_url, result.description, result.status,
+            result.failures, result.checked_at, result.retry_at))
+      conn.commit()
+
+  @profiled("db")
+  def get_retry_due(self, channel_id: str, limit: int = 100) -> list[Resource]:
+    """到了重试时间的 N/A 资源（按消息 ID 从新到旧）"""
+    with self._connect() as conn:
+      cursor = conn.execute(f"""
+        {self._select_resources()}
+        WHERE {self._RETRY_DUE}
+        ORDER BY t.message_id DESC LIMIT ?
+      """, (channel_id, time.time(), limit))
+      return self._resources(cursor)
+
+  @profiled("db")
+  def count_retry_due(self, channel_id: str) -> int:
+    with self._connect() as conn:
+      cursor = conn.execute(f"SELECT COUNT(*) FROM resources t WHERE {self._RETRY_DUE}", (channel_id, time.time()))
+      return cursor.fetchone()[0]
+
+  @profiled("db")
+  def count_to_resolve(self, channel_id: str) -> int:
+    """需要解析的资源数：未解析 + 到期重试"""
+    return self.count_unparsed(channel_id) + self.count_retry_due(channel_id)
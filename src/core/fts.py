@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""全文搜索的分词（SQLite FTS5）
+
+FTS5 自带的 unicode61 分词器把连续的中文当作一个词，无法按词的一部分搜索。
+写入索引前先用 ngrams() 把文本转换为以空格分隔的词：
+  - 中日韩文字按相邻两字切分（"复仇者联盟" -> "复仇 仇者 者联 联盟"），单独的一个字保留
+  - 其他字母、数字按单词切分并转为小写
+搜索时用同样的方式切分关键词，组成短语查询，效果接近子串匹配。
+"""
+
+import re
+from typing import Optional
+
+# 中日韩文字（汉字、扩展 A、兼容汉字、假名、谚文）
+_CJK = "㐀-䶿一-鿿豈-﫿぀-ヿ가-힯"
+_TOKEN = re.compile(f"([{_CJK}]+)|([^\\W_{_CJK}]+)")
+
+
+def _tokens(text: str) -> list[tuple[str, bool]]:
+  """(词, 是否为中日韩文字的两字切分)"""
+  tokens = []
+  for cjk, word in _TOKEN.findall(text.lower()):
+    if word:
+      tokens.append((word, False))
+    elif len(cjk) == 1:
+      tokens.append((cjk, True))
+    else:
+      tokens.extend((cjk[i:i + 2], True) for i in range(len(cjk) - 1))
+  return tokens
+
+
+def ngrams(text: Optional[str]) -> str:
+  """写入索引的文本"""
+  if not text:
+    return ""
+  return " ".join(token for token, _ in _tokens(text))
+
+
+def match_query(keyword: str) -> Optional[str]:
+  """关键词 -> FTS5 MATCH 表达式；太短无法用索引搜索时返回 None
+
+  以空白分隔的多个词都要匹配；每个词切分后作为短语，结尾是字母数字时按前缀匹配
+  （"avenger" 可以匹配 "avengers"）。包含单个中日韩文字时索引中没有对应的词，返回 None。
+  """
+  phrases = []
+  for term in keyword.split():
+    tokens = _tokens(term)
+    if not tokens:
+      continue
+    if any(cjk and len(token) == 1 for token, cjk in tokens):
+      return None
+    phrase = '"' + " ".join(token for token, _ in tokens) + '"'
+    if not tokens[-1][1]:
+      phrase += "*"
+    phrases.append(phrase)
+  return " ".join(phrases) or None
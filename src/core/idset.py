@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""消息 ID 集合"""
+
+import threading
+from typing import Iterable, Iterator
+
+
+class MessageIdSet:
+  """紧凑的消息 ID 集合（位图）
+
+  频道消息 ID 从 1 开始连续递增，每个 ID 只占 1 bit，百万级 ID 约 125KB。
+  爬取时用于判断消息是否已入库（不访问数据库），也可用于缺口检测。
+  """
+
+  def __init__(self, ids: Iterable[int] = ()):
+    self._bits = bytearray()
+    self._count = 0
+    self._max = 0
+    self._lock = threading.Lock()
+    self.update(ids)
+
+  def add(self, message_id: int):
+    self.update((message_id,))
+
+  def update(self, ids: Iterable[int]):
+    with self._lock:
+      bits = self._bits
+      top, count = self._max, self._count
+      for message_id in ids:
+        if message_id <= 0:
+          continue
+        index, mask = message_id >> 3, 1 << (message_id & 7)
+        if index >= len(bits):
+          # 按倍数扩容，减少频繁分配
+          bits.extend(bytes(max(index + 1 - len(bits), len(bits))))
+        if not bits[index] & mask:
+          bits[index] |= mask
+          count += 1
+          if message_id > top:
+            top = message_id
+      self._max, self._count = top, count
+
+  def __contains__(self, message_id: int) -> bool:
+    index = message_id >> 3
+    if message_id <= 0 or index >= len(self._bits):
+      return False
+    return bool(self._bits[index] & (1 << (message_id & 7)))
+
+  def __len__(self) -> int:
+    return self._count
+
+  def __iter__(self) -> Iterator[int]:
+    """按从小到大的顺序遍历"""
+    for index, byte in enumerate(self._bits):
+      if byte:
+        base = index << 3
+        for bit in range(8):
+          if byte & (1 << bit):
+            yield base + bit
+
+  def max(self) -> int:
+    """最大的消息 ID，集合为空时为 0"""
+    return self._max
+
+  def missing(self, low: int, high: int) -> Iterator[int]:
+    """[low, high] 区间内不在集合中的 ID"""
+    for message_id in range(max(1, low), high + 1):
+      if message_id not in self:
+        yield message_id
+
+  def gaps(self, low: int, high: int) -> list[tuple[int, int]]:
+    """[low, high] 区间内缺失的连续区间列表 [(起, 止), ...]"""
+    ranges = []
+    start = prev = None
+    for message_id in self.missing(low, high):
+      if start is None:
+        start = message_id
+      elif message_id != prev + 1:
+        ranges.append((start, prev))
+        start = message_id
+      prev = message_id
+    if start is not None:
+      ranges.append((start, prev))
+    return ranges
@@ -1,33 +1,114 @@
 # -*- coding: utf-8 -*-
 """解析器模块"""
 
+import json
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional
+from urllib.parse import urlparse
 
 import requests
 from bs4 import BeautifulSoup
 
-from src.channels.config import HEADERS, REQUEST_DELAY, is_valid_115_url
-from src.models.resource import Resource
+from src.channels.config import (
+  HEADERS, TELEGRAPH_API_URL, TELEGRAPH_RESOLVER, TELEGRAPH_WORKERS, is_valid_115_url,
+  TELEGRAPH_RETRY_BASE, TELEGRAPH_RETRY_FACTOR, TELEGRAPH_RETRY_MAX, TELEGRAPH_RETRY_LIMIT,
+)
+from src.models.resource import Resource, TelegraphResult
 from src.core.database import Database
+from src.core.cache import PageCache, CacheMiss
+from src.core.ratelimit import CircuitOpen, RateLimiter, get_rate_limiter
+from src.core.transport import get_transport
+from src.core.proxies import ProxyPool, get_proxy_pool
+from src.utils.metrics import TELEGRAPH_RESOLUTIONS
+from src.utils.profiling import profiled
+
+
+def _walk_nodes(nodes: list, links: list, strings: list):
+  """按文档顺序收集 Telegraph 节点树中的链接和文本"""
+  for node in nodes:
+    if isinstance(node, str):
+      strings.append(node)
+      continue
+    if node.get("tag") == "a":
+      href = (node.get("attrs") or {}).get("href")
+      if href:
+        links.append(href)
+    _walk_nodes(node.get("children") or [], links, strings)
+
+
+def _first_lines(strings: list[str], count: int = 5) -> str:
+  """文本的前几行非空内容（作为资源描述）"""
+  text = "\n".join(s for s in (s.strip() for s in strings) if s)
+  lines = [l for l in text.split("\n") if l.strip()][:count]
+  return "\n".join(lines)
 
 
 class TelegraphParser:
   """Telegraph 页面解析器（用于 Lsp115 频道）"""
 
-  def __init__(self):
-    self.session = requests.Session()
-    self.session.headers.update(HEADERS)
+  def __init__(self, cache: Optional[PageCache] = None, limiter: Optional[RateLimiter] = None,
+               proxy_pool: Optional[ProxyPool] = None):
+    self.session = get_transport().session(HEADERS)
+    self.cache = cache
+    self.limiter = limiter or get_rate_limiter()
+    self.proxy_pool = proxy_pool or get_proxy_pool()
 
   def parse_pan_link(self, telegraph_url: str) -> tuple[str, str]:
-    """从 telegraph 页面解析 115 链接"""
+    """从 telegraph 页面解析 115 链接，返回 (链接, 描述)，请求失败时返回空结果"""
     try:
-      response = self.session.get(telegraph_url, timeout=30)
-      response.raise_for_status()
+      return self.fetch_pan_link(telegraph_url)
+    except (CacheMiss, CircuitOpen):
+      raise
     except requests.RequestException as e:
       print(f"请求失败: {e}")
       return "", ""
 
-    soup = BeautifulSoup(response.text, "lxml")
+  def fetch_pan_link(self, telegraph_url: str) -> tuple[str, str]:
+    """同 parse_pan_link，但请求失败时抛出 requests.RequestException
+
+    优先使用 Telegraph 内容 API（JSON 节点树，不需要解析 HTML），
+    API 请求或返回内容出错时改为解析页面 HTML。
+    """
+    if TELEGRAPH_RESOLVER == "api":
+      try:
+        return self._parse_api(telegraph_url)
+      except (requests.RequestException, ValueError) as e:
+        print(f"Telegraph API 失败: {e}，改为解析页面")
+    return self._parse_html(telegraph_url)
+
+  def _get(self, url: str) -> str:
+    if self.cache:
+      return self.cache.fetch(self.session, url, limiter=self.limiter, proxy_pool=self.proxy_pool)
+    response = self.limiter.request(self.session, "GET", url, proxy_pool=self.proxy_pool)
+    response.raise_for_status()
+    return response.text
+
+  @profiled("parse")
+  def _parse_api(self, telegraph_url: str) -> tuple[str, str]:
+    """通过 getPage 接口取页面节点树并解析"""
+    path = urlparse(telegraph_url).path.strip("/")
+    if not path:
+      raise ValueError(f"无法识别的 Telegraph 地址: {telegraph_url}")
+    data = json.loads(self._get(f"{TELEGRAPH_API_URL}/getPage/{path}?return_content=true"))
+    if not data.get("ok"):
+      raise ValueError(data.get("error") or "接口返回错误")
+    page = data.get("result") or {}
+
+    links, strings = [], []
+    _walk_nodes(page.get("content") or [], links, strings)
+
+    pan_url = next((href for href in links if is_valid_115_url(href)), "")
+    # 页面 HTML 的正文区域以标题、作者开头，描述保持与页面解析一致
+    description = _first_lines([page.get("title") or "", page.get("author_name") or ""] + strings)
+    return pan_url, description
+
+  @profiled("parse")
+  def _parse_html(self, telegraph_url: str) -> tuple[str, str]:
+    """下载页面 HTML 解析"""
+    html = self._get(telegraph_url)
+    soup = BeautifulSoup(html, "lxml")
 
     pan_url = ""
     for link in soup.find_all("a", href=True):
@@ -43,45 +124,290 @@ class TelegraphParser:
     description = ""
     article = soup.find("article")
     if article:
-      text = article.get_text(separator="\n", strip=True)
-      lines = [l for l in text.split("\n") if l.strip()][:5]
-      description = "\n".join(lines)
+      description = _first_lines([article.get_text(separator="\n", strip=True)])
 
     if not is_valid_115_url(pan_url):
       return "", description
 
     return pan_url, description
 
-  def parse_batch(self, db: Database, channel_id: str, limit: int = 100) -> int:
-    """批量解析未解析的资源"""
+  def parse_batch(self, db: Database, channel_id: str, limit: int = 100,
+                  workers: int = TELEGRAPH_WORKERS, cancel: Optional[threading.Event] = None) -> int:
+    """批量解析未解析的资源（并发解析，见 TelegraphResolver）"""
+    resolver = TelegraphResolver(self.cache, self.limiter, workers, cancel)
+    return resolver.run(db, channel_id, limit)
+
+
+def retry_delay(failures: int) -> Optional[float]:
+  """连续失败 failures 次后距下次重试的秒数（逐次加长），超过重试次数返回 None"""
+  if failures >= TELEGRAPH_RETRY_LIMIT:
+    return None
+  return min(TELEGRAPH_RETRY_MAX, TELEGRAPH_RETRY_BASE * TELEGRAPH_RETRY_FACTOR ** (failures - 1))
+
+
+class TelegraphResolver:
+  """并发解析 Telegraph 链接
+
+  按消息 ID 从新到旧解析 get_unparsed 的结果，还有空位时加上到了重试时间的
+  N/A 资源。每解析完一条立即写入数据库，中断后再次运行会从剩下的资源继续。
+  同一主机的请求速率由共用的 RateLimiter 控制，线程数只决定同时等待响应的请求数。
+
+  解析结果按 URL 缓存在 telegraph_cache 表：成功的结果一直有效，失败（没有链接
+  或请求失败）的结果在 retry_delay 之后过期，资源先标记为 N/A，到期后重新请求。
+  同一批中相同的 URL 只请求一次。
+
+  cancel 被设置（或收到 Ctrl+C）后不再发出新请求，等进行中的请求完成并保存后返回。
+  """
+
+  def __init__(self, cache: Optional[PageCache] = None, limiter: Optional[RateLimiter] = None,
+               workers: int = TELEGRAPH_WORKERS, cancel: Optional[threading.Event] = None):
+    self.cache = cache
+    self.limiter = limiter or get_rate_limiter()
+    self.workers = max(1, workers)
+    self.cancel = cancel or threading.Event()
+    self._local = threading.local()
+
+  def _resolve(self, telegraph_url: str) -> tuple[str, str]:
+    # requests.Session 不保证线程安全，每个线程使用自己的解析器
+    parser = getattr(self._local, "parser", None)
+    if parser is None:
+      parser = self._local.parser = TelegraphParser(self.cache, self.limiter)
+    return parser.fetch_pan_link(telegraph_url)
+
+  def _load(self, db: Database, channel_id: str, limit: int) -> dict[str, list[Resource]]:
+    """待解析的资源，按 Telegraph URL 分组（保持从新到旧的顺序）"""
     resources = db.get_unparsed(channel_id, limit)
+    if len(resources) < limit:
+      resources += db.get_retry_due(channel_id, limit - len(resources))
+    groups = {}
+    for r in resources:
+      groups.setdefault(r.telegraph_url, []).append(r)
+    return groups
+
+  def _record(self, url: str, previous: Optional[TelegraphResult],
+              pan_url: str = "", description: str = "", error: bool = False) -> TelegraphResult:
+    """本次请求的结果 -> 缓存记录（失败时按连续失败次数安排下次重试）"""
+    now = time.time()
+    if pan_url:
+      result = TelegraphResult(url, pan_url, description, "ok", 0, now)
+    else:
+      failures = (previous.failures if previous and not previous.ok else 0) + 1
+      delay = retry_delay(failures)
+      result = TelegraphResult(url, "", description, "error" if error else "empty", failures, now,
+                               now + delay if delay is not None else None)
+    TELEGRAPH_RESOLUTIONS.inc(status=result.status)
+    return result
+
+  def _apply(self, db: Database, channel_id: str, rows: list[Resource], result: TelegraphResult) -> int:
+    """把解析结果写入共用该 URL 的资源，返回解析出链接的条数"""
+    for r in rows:
+      # 请求失败时保留原有描述
+      if result.status != "error":
+        r.description = result.description
+      # 失败的先标记为 N/A，避免每次都当作未解析资源重复请求，到期后按重试计划再解析
+      r.pan_url = result.pan_url if result.ok else "N/A"
+    db.save_resources(channel_id, rows, replace=True)
+    return len(rows) if result.ok else 0
 
-    if not resources:
+  def run(self, db: Database, channel_id: str, limit: int = 100) -> int:
+    """解析并保存，返回成功解析出链接的条数"""
+    groups = self._load(db, channel_id, limit)
+
+    if not groups:
       print("没有需要解析的资源")
       return 0
 
-    print(f"开始解析网盘链接，共 {len(resources)} 条...")
+    parsed_count = 0
+    cached = db.get_telegraph_results([url for url in groups if url])
+    now = time.time()
+    urls = []
+    reused = 0
+    for url, rows in groups.items():
+      result = cached.get(url)
+      if not url:
+        # 没有 Telegraph 地址，无法解析
+        result = TelegraphResult(url, status="empty")
+      if result and not result.due(now):
+        # 缓存中的成功结果，或尚未到重试时间的失败结果
+        parsed_count += self._apply(db, channel_id, rows, result)
+        reused += len(rows)
+      else:
+        urls.append(url)
+
+    total = len(urls)
+    print(f"开始解析网盘链接，共 {sum(len(groups[u]) for u in urls)} 条，{total} 个页面（{self.workers} 线程）...")
+    if reused:
+      print(f"使用缓存结果 {reused} 条")
     print("-" * 50)
 
-    parsed_count = 0
-    for i, r in enumerate(resources, 1):
-      print(f"[{i}/{len(resources)}] {r.title[:30]}...")
+    done = 0
+    queued = iter(urls)
+    running = {}
+    with ThreadPoolExecutor(self.workers, thread_name_prefix=f"telegraph-{channel_id}") as pool:
+      while True:
+        # 排队的请求不超过线程数的两倍，取消后可以尽快停下
+        while not self.cancel.is_set() and len(running) < self.workers * 2:
+          url = next(queued, None)
+          if url is None:
+            break
+          running[pool.submit(self._resolve, url)] = url
+        if not running:
+          break
 
-      pan_url, description = self.parse_pan_link(r.telegraph_url)
-      r.description = description
+        try:
+          finished, _ = wait(running, return_when=FIRST_COMPLETED)
+        except KeyboardInterrupt:
+          print("\n收到中断信号，等待进行中的请求完成...")
+          self.cancel.set()
+          continue
 
-      if pan_url:
-        r.pan_url = pan_url
-        print(f"  ✓ {pan_url[:50]}...")
-        parsed_count += 1
-      else:
-        # 标记为已处理但无有效链接，避免重复解析
-        r.pan_url = "N/A"
-        print(f"  ✗ 未找到115链接（已标记）")
+        for future in finished:
+          url = running.pop(future)
+          rows = groups[url]
+          done += 1
+          shared = f"（{len(rows)} 条消息共用）" if len(rows) > 1 else ""
+          print(f"[{done}/{total}] {rows[0].title[:30]}...{shared}")
 
-      db.save_resource(channel_id, r)
-      time.sleep(REQUEST_DELAY)
+          try:
+            pan_url, description = future.result()
+          except CacheMiss as e:
+            print(f"  - {e}，跳过")
+            continue
+          except CircuitOpen as e:
+            # 不能把后面的资源都标记为无链接，先停止本次解析
+            print(f"  - {e}，停止解析")
+            self.cancel.set()
+            continue
+          except requests.RequestException as e:
+            result = self._record(url, cached.get(url), error=True)
+            print(f"  ✗ 请求失败: {e}")
+          else:
+            result = self._record(url, cached.get(url), pan_url, description)
+            if result.ok:
+              print(f"  ✓ {pan_url[:50]}...")
+            else:
+              print(f"  ✗ 未找到115链接")
+
+          if not result.ok:
+            if result.retry_at is None:
+              print(f"    已失败 {result.failures} 次，不再重试（已标记）")
+            else:
+              print(f"    第 {result.failures} 次失败，{_format_delay(result.retry_at - time.time())} 后重试（已标记）")
+          # 解析完立即保存，中断后不会重复请求
+          db.save_telegraph_result(result)
+          parsed_count += self._apply(db, channel_id, rows, result)
 
     print("-" * 50)
-    print(f"解析完成，成功 {parsed_count} 条")
+    if self.cancel.is_set() and done < total:
+      print(f"解析已停止，成功 {parsed_count} 条，剩余 {total - done} 个页面下次继续")
+    else:
+      print(f"解析完成，成功 {parsed_count} 条")
     return parsed_count
+
+
+class StreamingResolver(TelegraphResolver):
+  """边爬边解析：爬取时新入库的资源直接交给解析线程，不等爬取结束再扫描未解析资源
+
+  submit 由爬取的入库阶段调用，正在解析的请求达到上限（线程数的 4 倍）时阻塞，
+  避免爬取远远跑在解析前面。相同的 URL 只请求一次，缓存中已有结果的直接写入。
+  close 时等待进行中的解析完成；中断时放弃排队中的请求，这些资源保持未解析，
+  之后由 parse / sync 补齐。
+  """
+
+  def __init__(self, db: Database, channel_id: str, cache: Optional[PageCache] = None,
+               limiter: Optional[RateLimiter] = None, workers: int = TELEGRAPH_WORKERS,
+               log: Callable[[str], None] = print, cancel: Optional[threading.Event] = None):
+    super().__init__(cache, limiter, workers, cancel)
+    self.db = db
+    self.channel_id = channel_id
+    self.log = log
+    self.stats = {"ok": 0, "empty": 0, "error": 0, "cached": 0}
+    self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix=f"telegraph-{channel_id}")
+    self._slots = threading.Semaphore(self.workers * 4)
+    self._lock = threading.Lock()
+    self._running: dict[str, list[Resource]] = {}  # 正在解析的 URL -> 共用该 URL 的资源
+    self._previous: dict[str, Optional[TelegraphResult]] = {}
+
+  def submit(self, resources: list[Resource]):
+    if self.cancel.is_set():
+      return
+    groups = {}
+    for r in resources:
+      if r.telegraph_url and not r.pan_url:
+        groups.setdefault(r.telegraph_url, []).append(r)
+    if not groups:
+      return
+
+    cached = self.db.get_telegraph_results(list(groups))
+    now = time.time()
+    for url, rows in groups.items():
+      result = cached.get(url)
+      if result and not result.due(now):
+        self._apply(self.db, self.channel_id, rows, result)
+        self._count("cached", len(rows))
+        continue
+      with self._lock:
+        if url in self._running:
+          self._running[url].extend(rows)
+          continue
+        self._running[url] = rows
+        self._previous[url] = result
+      while not self._slots.acquire(timeout=0.5):
+        if self.cancel.is_set():
+          with self._lock:
+            self._running.pop(url, None)
+          return
+      future = self._pool.submit(self._resolve, url)
+      future.add_done_callback(lambda f, url=url: self._finish(url, f))
+
+  def close(self, interrupted: bool = False):
+    """等待解析结束；interrupted 为 True 时放弃排队中的请求"""
+    if interrupted:
+      self.cancel.set()
+    self._pool.shutdown(wait=True, cancel_futures=interrupted)
+    stats = self.stats
+    self.log(f"边爬边解析: 成功 {stats['ok']} 条，无链接 {stats['empty']} 条，"
+             f"请求失败 {stats['error']} 条，使用缓存 {stats['cached']} 条")
+
+  def _count(self, key: str, n: int):
+    with self._lock:
+      self.stats[key] += n
+
+  def _finish(self, url: str, future):
+    """解析线程中执行：保存结果"""
+    self._slots.release()
+    with self._lock:
+      rows = self._running.pop(url)
+      previous = self._previous.pop(url)
+    if future.cancelled():
+      return
+
+    try:
+      pan_url, description = future.result()
+    except (CacheMiss, CircuitOpen) as e:
+      # 资源保持未解析，之后由 parse / sync 补齐
+      self.log(f"解析 {rows[0].title[:30]}: {e}")
+      if isinstance(e, CircuitOpen):
+        self.cancel.set()
+      return
+    except requests.RequestException as e:
+      result = self._record(url, previous, error=True)
+      self.log(f"解析 {rows[0].title[:30]}: ✗ 请求失败: {e}")
+    except Exception as e:
+      self.log(f"解析 {rows[0].title[:30]} 出错: {e}")
+      return
+    else:
+      result = self._record(url, previous, pan_url, description)
+      self.log(f"解析 {rows[0].title[:30]}: {'✓ ' + pan_url[:50] if result.ok else '✗ 未找到115链接'}")
+
+    self.db.save_telegraph_result(result)
+    self._apply(self.db, self.channel_id, rows, result)
+    self._count(result.status, len(rows))
+
+
+def _format_delay(seconds: float) -> str:
+  if seconds >= 86400:
+    return f"{seconds / 86400:.0f} 天"
+  if seconds >= 3600:
+    return f"{seconds / 3600:.0f} 小时"
+  return f"{max(1, seconds / 60):.0f} 分钟"
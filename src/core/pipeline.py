@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""爬取流水线：下载 -> 解析 -> 入库"""
+
+import multiprocessing
+import queue
+import re
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Optional
+
+import requests
+
+from src.channels.config import PIPELINE_PREFETCH, PIPELINE_PARSE_PROCESSES
+from src.models.resource import Resource
+from src.core.cache import CacheMiss
+from src.utils.metrics import CRAWL_STAGE_SECONDS
+from src.utils.profiling import stage
+
+# 页面中每条消息的 data-post="频道/消息ID"，不解析整页即可确定翻页位置
+DATA_POST_PATTERN = re.compile(r'data-post="[^"]*/(\d+)"')
+
+
+def page_message_ids(html: str) -> list[int]:
+  """页面上所有消息的 ID（包括没有资源的消息）"""
+  return [int(i) for i in DATA_POST_PATTERN.findall(html)]
+
+
+@dataclass
+class Page:
+  """一页频道消息"""
+  url: str
+  message_ids: list[int]  # 页面上所有消息的 ID
+  resources: list[Resource] = field(default_factory=list)  # 解析出的资源
+
+  @property
+  def min_id(self) -> Optional[int]:
+    """页面上最早的消息 ID，即下一页的 before 参数；空页面为 None"""
+    return min(self.message_ids) if self.message_ids else None
+
+  @property
+  def max_id(self) -> Optional[int]:
+    return max(self.message_ids) if self.message_ids else None
+
+
+class StageStats:
+  """单个阶段的处理量与耗时"""
+
+  def __init__(self, name: str, unit: str = "页"):
+    self.name = name
+    self.unit = unit
+    self.count = 0
+    self.seconds = 0.0
+    self._lock = threading.Lock()
+
+  @contextmanager
+  def timer(self):
+    start = time.perf_counter()
+    try:
+      yield
+    finally:
+      with self._lock:
+        self.count += 1
+        self.seconds += time.perf_counter() - start
+
+  def summary(self) -> str:
+    rate = f"{self.count / self.seconds:.1f} {self.unit}/秒" if self.seconds else "-"
+    return f"{self.name} {self.count} {self.unit} {self.seconds:.1f} 秒 ({rate})"
+
+
+_END = object()  # 下载阶段结束标记
+
+# 解析进程中缓存的 ChannelCrawler（每个进程每个频道只创建一次）
+_worker_crawlers = {}
+
+
+def _init_worker():
+  # Ctrl+C 由主进程处理，解析进程忽略
+  signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _parse_in_worker(channel_id: str, backend_name: str, html: str) -> list[Resource]:
+  """在解析进程中解析一页 HTML"""
+  from src.core.backends import get_backend
+  from src.core.crawler import ChannelCrawler
+
+  key = (channel_id, backend_name)
+  if key not in _worker_crawlers:
+    _worker_crawlers[key] = ChannelCrawler(channel_id, backend=get_backend(backend_name))
+  return _worker_crawlers[key]._parse_page(html)
+
+
+class CrawlPipeline:
+  """ChannelCrawler 的三阶段流水线
+
+  - 下载：独立线程，拿到页面后立即用 data-post 算出下一页位置继续预取
+  - 解析：单独线程，或 parse_processes > 0 时使用进程池
+  - 入库：调用线程按页面顺序依次交给 CrawlRun 处理（唯一的写入者）
+
+  阶段之间是有界队列，下载最多领先 prefetch 页，解析最多同时处理
+  max(1, parse_processes) 页。CrawlRun 决定停止（或收到中断）时，
+  已预取但尚未入库的页面直接丢弃，断点只记录已入库的页面。
+  """
+
+  def __init__(self, crawler, run, prefetch: int = PIPELINE_PREFETCH,
+               parse_processes: int = PIPELINE_PARSE_PROCESSES):
+    self.crawler = crawler
+    self.run = run
+    self.parse_processes = parse_processes
+    self.fetched = queue.Queue(maxsize=max(1, prefetch))
+    self.stop = threading.Event()
+    self.fetch_stats = StageStats("下载")
+    self.parse_stats = StageStats("解析")
+    self.write_stats = StageStats("入库")
+
+  def execute(self):
+    fetcher = threading.Thread(target=self._fetch_loop, name=f"fetch-{self.crawler.channel_id}", daemon=True)
+    executor = self._make_executor()
+    fetcher.start()
+    try:
+      self._process(executor)
+    finally:
+      self.stop.set()
+      executor.shutdown(wait=True, cancel_futures=True)
+      fetcher.join()
+      for stage, stats in (("fetch", self.fetch_stats), ("parse", self.parse_stats), ("write", self.write_stats)):
+        CRAWL_STAGE_SECONDS.inc(stats.seconds, channel=self.crawler.channel_id, stage=stage)
+
+  def summary(self) -> str:
+    stages = (self.fetch_stats, self.parse_stats, self.write_stats)
+    return "流水线: " + " | ".join(s.summary() for s in stages)
+
+  def _make_executor(self) -> Executor:
+    if self.parse_processes > 0:
+      # 下载线程已在运行，用 spawn 启动子进程避免 fork 带走线程状态
+      return ProcessPoolExecutor(self.parse_processes, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker)
+    return ThreadPoolExecutor(1)
+
+  def _parse(self, executor: Executor, html: str):
+    if self.parse_processes > 0:
+      return executor.submit(_parse_in_worker, self.crawler.channel_id, self.crawler.backend.name, html)
+    return executor.submit(self.crawler._parse_page, html)
+
+  # ------------------------------------------------------------
+  # 下载阶段
+  # ------------------------------------------------------------
+
+  def _fetch_loop(self):
+    crawler, run = self.crawler, self.run
+    before_id = run.before_id
+    try:
+      while not self.stop.is_set() and not crawler._interrupted:
+        url = crawler._page_url(before_id)
+        run.log(f"正在请求: {url}")
+        try:
+          with self.fetch_stats.timer():
+            html = crawler._fetch(url)
+        except CacheMiss as e:
+          run.log(f"{e}，回放结束")
+          break
+        except requests.RequestException as e:
+          if run.retry_on_error:
+            wait = crawler.retry_wait(url)
+            run.log(f"请求失败: {e}，等待 {wait:.0f} 秒重试...")
+            with stage("sleep"):
+              self.stop.wait(wait)
+            continue
+          run.log(f"请求失败: {e}")
+          break
+
+        ids = page_message_ids(html)
+        if not self._put((url, html, ids)):
+          break
+        # 空页面说明已到频道开头；CrawlRun 确定不需要更早的页面时也不再预取
+        if not ids or not run.may_continue(min(ids)):
+          break
+        before_id = min(ids)
+    finally:
+      self._put(_END)
+
+  def _put(self, item) -> bool:
+    """放入下载队列（队列满时等待），流水线已停止时返回 False"""
+    while not self.stop.is_set():
+      try:
+        self.fetched.put(item, timeout=0.2)
+        return True
+      except queue.Full:
+        continue
+    return False
+
+  # ------------------------------------------------------------
+  # 解析与入库阶段
+  # ------------------------------------------------------------
+
+  def _take(self, block: bool):
+    """从下载队列取一页；block=False 时没有已下载的页面返回 None"""
+    while True:
+      try:
+        return self.fetched.get(timeout=0.2) if block else self.fetched.get_nowait()
+      except queue.Empty:
+        if not block or self.crawler._interrupted:
+          return None
+
+  def _process(self, executor: Executor):
+    pending = deque()  # 按页面顺序排队的解析任务 (url, ids, future, 提交时间)
+    window = max(1, self.parse_processes)
+    fetching = True
+
+    while not self.crawler._interrupted:
+      # 把已下载的页面交给解析阶段；没有在解析的页面时等待下载
+      while fetching and len(pending) < window:
+        item = self._take(block=not pending)
+        if item is None:
+          break
+        if item is _END:
+          fetching = False
+          break
+        url, html, ids = item
+        pending.append((url, ids, self._parse(executor, html), time.perf_counter()))
+
+      if not pending:
+        break
+
+      url, ids, future, submitted = pending.popleft()
+      resources = future.result()
+      with self.parse_stats._lock:
+        self.parse_stats.count += 1
+        self.parse_stats.seconds += time.perf_counter() - submitted
+
+      with self.write_stats.timer():
+        more = self.run.handle_page(Page(url, ids, resources))
+      if not more:
+        break
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""代理池：把爬取请求分散到多个代理，按延迟与错误率评分，暂时剔除故障代理"""
+
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+from src.channels.config import PROXIES, PROXY_EJECT_ERRORS, PROXY_EJECT_SECONDS, PROXY_EJECT_MAX
+
+EWMA_ALPHA = 0.3  # 延迟、错误率的指数加权系数
+DEFAULT_LATENCY = 1.0  # 只失败过、还没有测到延迟的代理按该值（秒）评分
+
+
+def proxy_label(url: str) -> str:
+  """用于日志、异常与指标的代理地址（去掉用户名和密码）"""
+  scheme, sep, rest = url.rpartition("://")
+  return f"{scheme}{sep}{rest.rpartition('@')[2]}"
+
+
+class ProxyState:
+  """单个代理的统计与健康状态"""
+
+  def __init__(self, url: str):
+    self.url = url
+    self.latency: Optional[float] = None  # 平均响应时间（秒，指数加权）
+    self.error_rate = 0.0                 # 错误率（指数加权）
+    self.consecutive_failures = 0
+    self.ejected_until = 0.0              # 剔除结束时间（代理池 clock 的时间）
+    self.ejections = 0                    # 被剔除的次数
+    self.requests = 0
+    self.failures = 0
+
+  def score(self) -> float:
+    """评分，越低越好：延迟按错误率放大"""
+    latency = DEFAULT_LATENCY if self.latency is None else self.latency
+    return latency * (1 + 4 * self.error_rate)
+
+  def ejected(self, now: float) -> bool:
+    return self.ejected_until > now
+
+
+class ProxyPool:
+  """代理池
+
+  - 还没有请求过的代理优先使用，以便测到延迟
+  - 之后每次请求从未被剔除的代理中随机选择，选中概率与评分成反比（请求分散到所有代理，
+    快而稳定的代理分到更多请求）
+  - 连续失败 PROXY_EJECT_ERRORS 次的代理剔除 PROXY_EJECT_SECONDS 秒，
+    再次被剔除时时间加倍（最长 PROXY_EJECT_MAX 秒），到期后自动恢复
+  - 所有代理都被剔除时使用最早恢复的一个
+
+  线程安全。请求间隔与熔断由 RateLimiter 按 (主机, 代理) 分别控制。
+  clock 为计时函数（默认 time.monotonic，测试时可以替换）。
+  """
+
+  def __init__(self, urls: list[str], eject_errors: int = PROXY_EJECT_ERRORS,
+               eject_seconds: float = PROXY_EJECT_SECONDS, eject_max: float = PROXY_EJECT_MAX,
+               clock: Callable[[], float] = time.monotonic):
+    if not urls:
+      raise ValueError("代理池为空")
+    self.eject_errors = eject_errors
+    self.eject_seconds = eject_seconds
+    self.eject_max = eject_max
+    self.clock = clock
+    self.states = {url: ProxyState(url) for url in dict.fromkeys(urls)}
+    self._lock = threading.Lock()
+
+  def choose(self, usable: Optional[Callable[[str], bool]] = None) -> str:
+    """选择一个代理；usable 可以进一步排除代理（例如该代理访问目标主机正处于熔断中）"""
+    now = self.clock()
+    with self._lock:
+      states = list(self.states.values())
+      healthy = [s for s in states if not s.ejected(now)]
+    if usable:
+      healthy = [s for s in healthy if usable(s.url)] or healthy
+    if not healthy:
+      return min(states, key=lambda s: s.ejected_until).url
+    untried = [s for s in healthy if s.requests == 0]
+    if untried:
+      return random.choice(untried).url
+    return random.choices(healthy, weights=[1 / s.score() for s in healthy])[0].url
+
+  def record(self, url: str, ok: bool, latency: float):
+    """记录一次请求的结果"""
+    with self._lock:
+      state = self.states.get(url)
+      if state is None:
+        return
+      state.requests += 1
+      if ok:
+        state.consecutive_failures = 0
+        state.error_rate *= 1 - EWMA_ALPHA
+        if state.latency is None:
+          state.latency = latency
+        else:
+          state.latency += EWMA_ALPHA * (latency - state.latency)
+        return
+
+      state.failures += 1
+      state.consecutive_failures += 1
+      state.error_rate += EWMA_ALPHA * (1 - state.error_rate)
+      if state.consecutive_failures >= self.eject_errors:
+        seconds = min(self.eject_max, self.eject_seconds * 2 ** state.ejections)
+        state.ejected_until = self.clock() + seconds
+        state.ejections += 1
+        state.consecutive_failures = 0
+        print(f"代理 {proxy_label(url)} 连续失败 {self.eject_errors} 次，暂停使用 {seconds:g} 秒")
+
+  def summary(self) -> str:
+    now = self.clock()
+    lines = []
+    with self._lock:
+      for s in self.states.values():
+        latency = "-" if s.latency is None else f"{s.latency * 1000:.0f} ms"
+        status = f"剔除中（{s.ejected_until - now:.0f} 秒后恢复）" if s.ejected(now) else "正常"
+        lines.append(
+          f"代理 {proxy_label(s.url)}: 请求 {s.requests}，失败 {s.failures}，延迟 {latency}，"
+          f"错误率 {s.error_rate:.0%}，剔除 {s.ejections} 次，{status}")
+    return "\n".join(lines)
+
+
+_shared: Optional[ProxyPool] = None
+_shared_lock = threading.Lock()
+
+
+def get_proxy_pool() -> Optional[ProxyPool]:
+  """进程内共用的代理池（PROXIES 为空时返回 None，直接连接）"""
+  global _shared
+  if not PROXIES:
+    return None
+  with _shared_lock:
+    if _shared is None:
+      _shared = ProxyPool(PROXIES)
+    return _shared
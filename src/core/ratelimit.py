@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""自适应限速、重试与熔断（爬虫、Telegraph 解析、CMS 客户端共用）"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from src.core.proxies import ProxyPool, proxy_label
+from src.utils.metrics import HTTP_REQUEST_SECONDS, status_label
+from src.utils.profiling import stage
+from src.channels.config import (
+  REQUEST_DELAY, RATE_MIN_INTERVAL, RATE_MAX_INTERVAL, RATE_INCREASE, RATE_DECREASE,
+  RETRY_MAX, RETRY_BACKOFF, RETRY_BACKOFF_MAX, BREAKER_THRESHOLD, BREAKER_COOLDOWN, HOST_RATE_LIMITS,
+)
+
+THROTTLE_STATUS = {429, 500, 502, 503, 504}  # 视为"请求过快/服务异常"的状态码
+
+
+class CircuitOpen(requests.RequestException):
+  """主机处于熔断状态，暂停请求"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+  """解析 Retry-After 响应头（秒数或 HTTP 日期），返回需要等待的秒数"""
+  if not value:
+    return None
+  value = value.strip()
+  if value.isdigit():
+    return float(value)
+  try:
+    return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+  except (TypeError, ValueError):
+    return None
+
+
+class HostState:
+  """单个主机（经过代理时为单个主机与代理的组合）的限速状态"""
+
+  def __init__(self, host: str, proxy: Optional[str], interval: float, min_interval: float):
+    self.host = host
+    self.proxy = proxy
+    self.interval = interval  # 当前请求间隔（秒）
+    self.min_interval = min_interval  # 该主机允许的最小间隔（秒）
+    self.next_time = 0.0      # 下一个请求最早的发出时间（限速器 clock 的时间）
+    self.failures = 0         # 连续失败次数
+    self.open_until = 0.0     # 熔断结束时间（限速器 clock 的时间）
+    self.lock = threading.Lock()
+    self.stats = {"requests": 0, "throttled": 0, "errors": 0, "retries": 0, "breaks": 0}
+
+
+class RateLimiter:
+  """按主机自适应限速
+
+  - AIMD：请求正常时每次把速率加 RATE_INCREASE（次/秒），遇到 429/5xx
+    时速率乘以 RATE_DECREASE，请求间隔限制在 [RATE_MIN_INTERVAL, RATE_MAX_INTERVAL]，
+    HOST_RATE_LIMITS 中列出的主机使用各自的最小间隔
+  - 服务器返回 Retry-After 时，在该时间之前不再请求该主机
+  - 失败重试使用带随机抖动的指数退避
+  - 连续失败 BREAKER_THRESHOLD 次后熔断 BREAKER_COOLDOWN 秒，期间直接抛出 CircuitOpen，
+    熔断结束后放行一个请求试探，仍失败则再次熔断
+
+  线程安全，多个线程（并发爬取）共用同一实例时同一主机的请求仍按间隔排队。
+  clock / sleep 为计时与等待函数（默认 time.monotonic / time.sleep，测试时可以替换）。
+  """
+
+  def __init__(self, initial_interval: float = REQUEST_DELAY,
+               min_interval: float = RATE_MIN_INTERVAL, max_interval: float = RATE_MAX_INTERVAL,
+               max_retries: int = RETRY_MAX, host_limits: Optional[dict[str, float]] = None,
+               clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+    self.initial_interval = initial_interval
+    self.min_interval = min_interval
+    self.host_limits = HOST_RATE_LIMITS if host_limits is None else host_limits
+    self.max_interval = max_interval
+    self.max_retries = max_retries
+    self.clock = clock
+    self.sleep = sleep
+    self._hosts: dict[str, HostState] = {}
+    self._lock = threading.Lock()
+
+  def _host(self, url: str, proxy: Optional[str] = None) -> HostState:
+    """主机的限速状态；经过代理的请求按 (主机, 代理) 分别限速（限流通常按来源 IP）"""
+    host = urlparse(url).netloc
+    key = f"{host} via {proxy}" if proxy else host
+    with self._lock:
+      if key not in self._hosts:
+        min_interval = self.host_limits.get(host, self.min_interval)
+        self._hosts[key] = HostState(host, proxy, max(self.initial_interval, min_interval), min_interval)
+      return self._hosts[key]
+
+  def blocked_for(self, url: str, proxy: Optional[str] = None) -> float:
+    """该主机还要熔断多少秒（未熔断为 0）"""
+    return max(0.0, self._host(url, proxy).open_until - self.clock())
+
+  def acquire(self, url: str, proxy: Optional[str] = None):
+    """等到该主机可以发出下一个请求；熔断中抛出 CircuitOpen"""
+    state = self._host(url, proxy)
+    with state.lock:
+      now = self.clock()
+      if state.open_until > now:
+        via = f"（代理 {proxy_label(proxy)}）" if proxy else ""
+        raise CircuitOpen(f"{urlparse(url).netloc}{via} 暂停请求中，{state.open_until - now:.0f} 秒后恢复")
+      start = max(now, state.next_time)
+      state.next_time = start + state.interval
+      state.stats["requests"] += 1
+    if start > now:
+      with stage("sleep"):
+        self.sleep(start - now)
+
+  def success(self, url: str, proxy: Optional[str] = None):
+    """请求正常：加性提速"""
+    state = self._host(url, proxy)
+    with state.lock:
+      state.failures = 0
+      state.interval = max(state.min_interval, 1 / (1 / state.interval + RATE_INCREASE))
+
+  def failure(self, url: str, throttled: bool, retry_after: Optional[float] = None,
+              proxy: Optional[str] = None):
+    """请求失败：被限流时乘性降速；连续失败过多时熔断"""
+    state = self._host(url, proxy)
+    with state.lock:
+      now = self.clock()
+      state.failures += 1
+      if throttled:
+        state.stats["throttled"] += 1
+        state.interval = min(self.max_interval, state.interval / RATE_DECREASE)
+      else:
+        state.stats["errors"] += 1
+      if retry_after:
+        state.next_time = max(state.next_time, now + retry_after)
+
+      cooldown = 0.0
+      if state.failures >= BREAKER_THRESHOLD:
+        cooldown = BREAKER_COOLDOWN
+      if retry_after and retry_after > RETRY_BACKOFF_MAX:
+        # 要求等待的时间比退避上限还长，直接熔断到指定时间
+        cooldown = max(cooldown, retry_after)
+      if cooldown and state.open_until <= now:
+        state.open_until = now + cooldown
+        state.stats["breaks"] += 1
+        via = f"（代理 {proxy_label(proxy)}）" if proxy else ""
+        print(f"{urlparse(url).netloc}{via} 连续失败 {state.failures} 次，暂停请求 {cooldown:.0f} 秒")
+
+  def backoff(self, attempt: int) -> float:
+    """第 attempt 次重试前的等待时间（指数退避 + 随机抖动）"""
+    ceiling = min(RETRY_BACKOFF_MAX, RETRY_BACKOFF * 2 ** attempt)
+    return random.uniform(ceiling / 2, ceiling)
+
+  def request(self, session: requests.Session, method: str, url: str,
+              idempotent: bool = True, proxy_pool: Optional["ProxyPool"] = None,
+              **kwargs) -> requests.Response:
+    """限速发送请求，失败时退避重试
+
+    429/5xx 在重试次数用完后原样返回响应（由调用方 raise_for_status）；
+    网络错误在重试次数用完后抛出。idempotent=False 时只在确定服务器没有处理
+    请求的情况下重试（429/503、连接超时）。
+
+    传入 proxy_pool 时每次尝试（包括重试）从代理池中选择代理，并把结果反馈给代理池。
+    """
+    attempt = 0
+    while True:
+      proxy = None
+      if proxy_pool:
+        proxy = proxy_pool.choose(lambda p: not self.blocked_for(url, p))
+        kwargs["proxies"] = {"http": proxy, "https": proxy}
+      self.acquire(url, proxy)
+      response, error, retry_after = None, None, None
+      start = self.clock()
+      try:
+        with stage("fetch"):
+          response = session.request(method, url, **kwargs)
+      except (requests.ConnectionError, requests.Timeout) as e:
+        error = e
+      elapsed = self.clock() - start
+      HTTP_REQUEST_SECONDS.observe(elapsed, host=urlparse(url).netloc,
+                                   status=status_label(response.status_code if response is not None else None))
+      if response is not None:
+        if response.status_code not in THROTTLE_STATUS:
+          if proxy_pool:
+            proxy_pool.record(proxy, True, elapsed)
+          self.success(url, proxy)
+          return response
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+      if proxy_pool:
+        proxy_pool.record(proxy, False, elapsed)
+      self.failure(url, throttled=response is not None, retry_after=retry_after, proxy=proxy)
+
+      retryable = idempotent or isinstance(error, requests.ConnectTimeout) or (
+        response is not None and response.status_code in (429, 503))
+      # 使用代理时换一个代理重试，不必等这个代理熔断结束
+      blocked = self.blocked_for(url, proxy) and not proxy_pool
+      if attempt >= self.max_retries or not retryable or blocked:
+        if error:
+          raise error
+        return response
+
+      self._host(url, proxy).stats["retries"] += 1
+      with stage("sleep"):
+        self.sleep(max(retry_after or 0, self.backoff(attempt)))
+      attempt += 1
+
+  def summary(self) -> str:
+    lines = []
+    for state in list(self._hosts.values()):
+      s = state.stats
+      via = f"（代理 {proxy_label(state.proxy)}）" if state.proxy else ""
+      lines.append(
+        f"{state.host}{via}: 请求 {s['requests']}，限流 {s['throttled']}，错误 {s['errors']}，"
+        f"重试 {s['retries']}，熔断 {s['breaks']}，当前间隔 {state.interval:.2f} 秒")
+    return "\n".join(lines)
+
+
+_shared: Optional[RateLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+  """进程内共用的限速器（同一主机的所有请求共享速率与熔断状态）"""
+  global _shared
+  with _shared_lock:
+    if _shared is None:
+      _shared = RateLimiter()
+    return _shared
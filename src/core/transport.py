@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""共用的 HTTP 连接（爬虫、Telegraph 解析、CMS 客户端）
+
+所有请求共用进程内的连接池：同一主机的连接保持长连接，之后的请求（包括之后
+每次同步）直接复用，不用重新建立 TCP / TLS 连接。每个调用方使用自己的
+requests.Session（请求头、代理设置互不影响），这些 Session 挂载同一个适配器，
+适配器中的连接池是线程安全的。
+"""
+
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers, select_proxy
+from urllib3.util import Retry
+from urllib3.util.request import ACCEPT_ENCODING
+
+from src.channels.config import REQUEST_TIMEOUT, POOL_HOSTS, POOL_MAXSIZE, CONNECT_RETRIES, HTTP2
+
+try:
+  import httpx
+  import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+except ImportError:  # 没有安装 httpx[http2] 时只使用 HTTP/1.1
+  httpx = None
+
+# HTTP/2 中不允许出现的逐跳请求头
+HOP_BY_HOP_HEADERS = {"connection", "keep-alive", "proxy-connection", "transfer-encoding", "upgrade"}
+
+
+def _split_timeout(timeout) -> tuple[float, float]:
+  """(连接超时, 读取超时)"""
+  if timeout is None:
+    return REQUEST_TIMEOUT
+  if isinstance(timeout, tuple):
+    return timeout
+  return timeout, timeout
+
+
+class PooledAdapter(HTTPAdapter):
+  """连接池适配器
+
+  - 保留 POOL_HOSTS 个主机的连接池，每个主机最多保持 POOL_MAXSIZE 个长连接
+  - 没有指定超时的请求使用 REQUEST_TIMEOUT
+  - 只重试建立连接失败（请求还没有发出）的情况，429/5xx 与读取超时由 RateLimiter 重试
+  """
+
+  def __init__(self):
+    retries = Retry(total=None, connect=CONNECT_RETRIES, read=0, status=0, other=0, backoff_factor=0.5)
+    super().__init__(pool_connections=POOL_HOSTS, pool_maxsize=POOL_MAXSIZE, max_retries=retries)
+
+  def send(self, request, timeout=None, **kwargs):
+    return super().send(request, timeout=_split_timeout(timeout), **kwargs)
+
+  def close(self):
+    # 适配器由所有 Session 共用，单个 Session 关闭时保留连接池
+    pass
+
+  def shutdown(self):
+    super().close()
+
+  def pool_stats(self) -> dict[str, dict]:
+    """各主机新建的连接数与发出的请求数"""
+    managers = [self.poolmanager] + list(self.proxy_manager.values())
+    stats = {}
+    for manager in managers:
+      pools = manager.pools
+      for key in pools.keys():
+        pool = pools.get(key)
+        if pool is None:
+          continue
+        s = stats.setdefault(pool.host, {"connections": 0, "requests": 0})
+        s["connections"] += pool.num_connections
+        s["requests"] += pool.num_requests
+    return stats
+
+
+class Http2Adapter(BaseAdapter):
+  """通过 httpx 以 HTTP/2 发送 https 请求（需要安装 httpx[http2]）
+
+  返回普通的 requests.Response，调用方不需要区分。经过代理的请求，以及使用自定义证书校验
+  （verify 为 CA 文件路径或 False）或客户端证书（cert）的请求交给 fallback：httpx 客户端的
+  这些设置在创建时固定，不能按请求指定。
+  """
+
+  def __init__(self, fallback: PooledAdapter):
+    super().__init__()
+    self.fallback = fallback
+    limits = httpx.Limits(max_connections=POOL_HOSTS * POOL_MAXSIZE, max_keepalive_connections=POOL_HOSTS)
+    transport = httpx.HTTPTransport(http2=True, retries=CONNECT_RETRIES, limits=limits)
+    self.client = httpx.Client(transport=transport, follow_redirects=False, trust_env=False)
+    self.requests: dict[str, int] = {}
+    self._lock = threading.Lock()
+
+  def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+    if (proxies and select_proxy(request.url, proxies)) or verify is not True or cert:
+      return self.fallback.send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+
+    connect, read = _split_timeout(timeout)
+    headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_BY_HOP_HEADERS}
+    body = request.body.encode("utf-8") if isinstance(request.body, str) else request.body
+    try:
+      r = self.client.request(request.method, request.url, headers=headers, content=body,
+                              timeout=httpx.Timeout(read, connect=connect))
+    except httpx.ConnectTimeout as e:
+      raise requests.ConnectTimeout(e, request=request)
+    except httpx.TimeoutException as e:
+      raise requests.ReadTimeout(e, request=request)
+    except httpx.TransportError as e:
+      raise requests.ConnectionError(e, request=request)
+
+    with self._lock:
+      self.requests[r.url.host] = self.requests.get(r.url.host, 0) + 1
+
+    response = requests.Response()
+    response.status_code = r.status_code
+    response.reason = r.reason_phrase
+    response.headers = CaseInsensitiveDict(r.headers)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response._content = r.content  # httpx 已解压
+    response._content_consumed = True
+    response.url = request.url
+    response.request = request
+    response.connection = self
+    return response
+
+  def close(self):
+    pass
+
+  def shutdown(self):
+    self.client.close()
+
+
+class Transport:
+  """进程内共用的连接池"""
+
+  def __init__(self, http2: bool = HTTP2):
+    self.adapter = PooledAdapter()
+    self.http2_adapter: Optional[Http2Adapter] = None
+    if http2:
+      if httpx is None:
+        print("未安装 httpx[http2]，使用 HTTP/1.1")
+      else:
+        self.http2_adapter = Http2Adapter(self.adapter)
+
+  def session(self, headers: Optional[dict] = None) -> requests.Session:
+    """新建一个使用共用连接池的 Session"""
+    session = requests.Session()
+    session.mount("http://", self.adapter)
+    session.mount("https://", self.http2_adapter or self.adapter)
+    # 接受 urllib3 能解压的所有编码（安装 brotli / zstandard 后自动加入 br / zstd）
+    session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+    if headers:
+      session.headers.update(headers)
+    return session
+
+  def stats(self) -> dict[str, dict]:
+    """各主机的连接复用情况 {主机: {"connections": 新建连接数, "requests": 请求数}}"""
+    stats = self.adapter.pool_stats()
+    if self.http2_adapter:
+      for host, count in self.http2_adapter.requests.items():
+        stats.setdefault(host, {"connections": 0, "requests": 0})["requests"] += count
+    return stats
+
+  def summary(self) -> str:
+    lines = []
+    for host, s in self.stats().items():
+      if not s["requests"]:
+        continue
+      reused = max(0, s["requests"] - s["connections"])
+      line = f"{host}: 请求 {s['requests']}，新建连接 {s['connections']}，复用 {reused / s['requests']:.0%}"
+      if self.http2_adapter and host in self.http2_adapter.requests:
+        line += "（HTTP/2）"
+      lines.append(line)
+    return "\n".join(lines)
+
+  def close(self):
+    self.adapter.shutdown()
+    if self.http2_adapter:
+      self.http2_adapter.shutdown()
+
+
+_shared: Optional[Transport] = None
+_shared_lock = threading.Lock()
+
+
+def get_transport() -> Transport:
+  """进程内共用的连接池（爬虫、Telegraph 解析、CMS 客户端、Web 端每次同步共用）"""
+  global _shared
+  with _shared_lock:
+    if _shared is None:
+      _shared = Transport()
+    return _shared
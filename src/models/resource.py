@@ -1,8 +1,28 @@
 # -*- coding: utf-8 -*-
 """数据模型"""
 
+import zlib
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Union
+
+
+class LazyHtml:
+  """raw_html 字段：可以直接保存数据库中的压缩数据，第一次读取时才解压"""
+
+  def __set_name__(self, owner, name: str):
+    self.attr = f"_{name}"
+
+  def __get__(self, obj, objtype=None) -> str:
+    if obj is None:
+      return ""  # dataclass 的默认值
+    value = obj.__dict__.get(self.attr, "")
+    if isinstance(value, bytes):
+      value = zlib.decompress(value).decode("utf-8")
+      obj.__dict__[self.attr] = value
+    return value
+
+  def __set__(self, obj, value: Union[str, bytes, None]):
+    obj.__dict__[self.attr] = value or ""
 
 
 @dataclass
@@ -15,7 +35,27 @@ class Resource:
   pan_url: str = ""
   description: str = ""
   created_at: str = ""
-  raw_html: str = ""  # 原始消息卡片 HTML
+  raw_html: str = LazyHtml()  # 原始消息卡片 HTML（数据库中压缩保存，读取时解压）
+
+
+@dataclass
+class TelegraphResult:
+  """Telegraph 链接的解析结果（按 URL 缓存）"""
+  url: str
+  pan_url: str = ""
+  description: str = ""
+  status: str = ""  # ok / empty（页面中没有 115 链接）/ error（请求失败）
+  failures: int = 0  # 连续失败次数
+  checked_at: float = 0.0  # 最近一次请求的时间（时间戳）
+  retry_at: Optional[float] = None  # 失败后下次重试的时间，None 表示不再重试
+
+  @property
+  def ok(self) -> bool:
+    return self.status == "ok"
+
+  def due(self, now: float) -> bool:
+    """失败结果是否已过期、需要重新请求"""
+    return not self.ok and self.retry_at is not None and self.retry_at <= now
 
 
 @dataclass
@@ -25,6 +65,9 @@ class CrawlState:
   last_before_id: Optional[int] = None
   total_crawled: int = 0
   mode: str = ""
+  # 分片爬取的消息 ID 区间 (low_id, high_id]
+  low_id: Optional[int] = None
+  high_id: Optional[int] = None
 
   def to_dict(self) -> dict:
     return {
@@ -32,6 +75,8 @@ class CrawlState:
       "last_before_id": self.last_before_id,
       "total_crawled": self.total_crawled,
       "mode": self.mode,
+      "low_id": self.low_id,
+      "high_id": self.high_id,
     }
 
   @classmethod
@@ -41,4 +86,6 @@ class CrawlState:
       last_before_id=data.get("last_before_id"),
       total_crawled=data.get("total_crawled", 0),
       mode=data.get("mode", ""),
+      low_id=data.get("low_id"),
+      high_id=data.get("high_id"),
     )
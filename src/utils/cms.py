@@ -6,6 +6,9 @@ import time
 import requests
 import logging
 
+from src.core.ratelimit import get_rate_limiter
+from src.core.transport import get_transport
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,9 +29,8 @@ class CloudSyncMediaClient:
         if not all([self.base_url, self.username, self.password]):
            logger.warning("CMS 配置不完整，部分功能可能不可用")
 
-        # 配置请求会话
-        self.session = requests.Session()
-        self.session.headers.update({
+        # 配置请求会话（与爬虫共用连接池）
+        self.session = get_transport().session({
             'Content-Type': 'application/json',
             'Accept': 'application/json'
         })
@@ -38,6 +40,15 @@ class CloudSyncMediaClient:
             'http': None,
             'https': None
         }
+
+        # 与爬虫共用的限速器（重试、熔断）；转存请求不是幂等的，只在服务器未处理时重试
+        self.limiter = get_rate_limiter()
+
+    def _post(self, path: str, payload: dict) -> requests.Response:
+        return self.limiter.request(
+            self.session, 'POST', f'{self.base_url}{path}',
+            idempotent=False, json=payload
+        )
     
     def _login(self) -> dict:
         """登录CMS系统获取token"""
@@ -45,14 +56,10 @@ class CloudSyncMediaClient:
             raise ValueError("未配置 CMS 连接信息")
 
         try:
-            response = self.session.post(
-                f'{self.base_url}/api/auth/login',
-                json={
-                    'username': self.username,
-                    'password': self.password
-                },
-                timeout=(10, 30)
-            )
+            response = self._post('/api/auth/login', {
+                'username': self.username,
+                'password': self.password
+            })
             response.raise_for_status()
             data = response.json()
             
@@ -92,11 +99,7 @@ class CloudSyncMediaClient:
         try:
             self._ensure_valid_token()
             
-            response = self.session.post(
-                f'{self.base_url}/api/cloud/add_share_down',
-                json={'url': url},
-                timeout=(10, 30)
-            )
+            response = self._post('/api/cloud/add_share_down', {'url': url})
             response.raise_for_status()
             result = response.json()
             
@@ -110,11 +113,7 @@ class CloudSyncMediaClient:
                 self._ensure_valid_token()
                 
                 # 重试请求
-                response = self.session.post(
-                    f'{self.base_url}/api/cloud/add_share_down',
-                    json={'url': url},
-                    timeout=(10, 30)
-                )
+                response = self._post('/api/cloud/add_share_down', {'url': url})
                 response.raise_for_status()
                 return response.json()
             raise
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""运行指标（Prometheus 文本格式，Web 端 /metrics 输出）
+
+只实现需要的 Counter / Gauge / Histogram，不依赖 prometheus_client。
+指标保存在进程内，CLI 每次运行从零开始；Web 服务中累计到进程退出。
+"""
+
+import math
+import threading
+import time
+from contextlib import ContextDecorator
+from typing import Callable, Iterable, Optional
+
+# 默认的耗时分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# 定时任务等长耗时操作的分桶（秒）
+JOB_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+def _escape(value: str) -> str:
+  return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+  parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+  if extra:
+    parts.append(extra)
+  return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+  if value == math.inf:
+    return "+Inf"
+  if float(value).is_integer():
+    return str(int(value))
+  return repr(float(value))
+
+
+class Metric:
+  """指标基类：按标签值分别保存"""
+
+  kind = ""
+
+  def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+    self.name = name
+    self.help = help
+    self.labels = tuple(labels)
+    self._values = {}
+    self._lock = threading.Lock()
+
+  def _key(self, labels: dict) -> tuple:
+    if set(labels) != set(self.labels):
+      raise ValueError(f"{self.name} 的标签应为 {self.labels}，实际为 {tuple(labels)}")
+    return tuple(str(labels[name]) for name in self.labels)
+
+  def clear(self):
+    with self._lock:
+      self._values.clear()
+
+  def samples(self) -> list[tuple[str, str, float]]:
+    """(指标名后缀, 标签, 值)"""
+    raise NotImplementedError
+
+  def render(self) -> str:
+    lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+    for suffix, labels, value in self.samples():
+      lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+    return "\n".join(lines)
+
+
+class Counter(Metric):
+  """只增不减的计数"""
+
+  kind = "counter"
+
+  def inc(self, amount: float = 1, **labels):
+    key = self._key(labels)
+    with self._lock:
+      self._values[key] = self._values.get(key, 0) + amount
+
+  def samples(self):
+    with self._lock:
+      items = sorted(self._values.items())
+    return [("", _format_labels(self.labels, key), value) for key, value in items]
+
+
+class Gauge(Metric):
+  """当前值；一般在输出前由收集函数整体更新（见 Registry.collector）"""
+
+  kind = "gauge"
+
+  def set(self, value: float, **labels):
+    key = self._key(labels)
+    with self._lock:
+      self._values[key] = value
+
+  def samples(self):
+    with self._lock:
+      items = sorted(self._values.items())
+    return [("", _format_labels(self.labels, key), value) for key, value in items]
+
+
+class _Timer(ContextDecorator):
+  """Histogram.time() 的返回值，可作为 with 语句或装饰器使用"""
+
+  def __init__(self, histogram: "Histogram", labels: dict):
+    self.histogram = histogram
+    self.labels = labels
+    self._starts = threading.local()
+
+  def __enter__(self):
+    self._starts.__dict__.setdefault("stack", []).append(time.perf_counter())
+    return self
+
+  def __exit__(self, *exc):
+    self.histogram.observe(time.perf_counter() - self._starts.stack.pop(), **self.labels)
+    return False
+
+
+class Histogram(Metric):
+  """耗时分布：各分桶的累计计数、总和与次数"""
+
+  kind = "histogram"
+
+  def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: tuple = DEFAULT_BUCKETS):
+    super().__init__(name, help, labels)
+    self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+  def observe(self, value: float, **labels):
+    key = self._key(labels)
+    with self._lock:
+      entry = self._values.get(key)
+      if entry is None:
+        entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+      for i, bound in enumerate(self.buckets):
+        if value <= bound:
+          entry[0][i] += 1
+          break
+      entry[1] += value
+      entry[2] += 1
+
+  def time(self, **labels) -> _Timer:
+    """计时：with histogram.time(...): ... 或 @histogram.time(...)"""
+    return _Timer(self, labels)
+
+  def samples(self):
+    with self._lock:
+      items = sorted((key, ([*counts], total, count)) for key, (counts, total, count) in self._values.items())
+    result = []
+    for key, (counts, total, count) in items:
+      cumulative = 0
+      for bound, n in zip(self.buckets, counts):
+        cumulative += n
+        result.append(("_bucket", _format_labels(self.labels, key, f'le="{_format_value(bound)}"'), cumulative))
+      result.append(("_sum", _format_labels(self.labels, key), total))
+      result.append(("_count", _format_labels(self.labels, key), count))
+    return result
+
+
+class Registry:
+  """指标集合"""
+
+  def __init__(self):
+    self.metrics: dict[str, Metric] = {}
+    self.collectors: list[Callable[[], None]] = []
+    self._lock = threading.Lock()
+
+  def _register(self, metric: Metric) -> Metric:
+    with self._lock:
+      existing = self.metrics.get(metric.name)
+      if existing is not None:
+        if type(existing) is not type(metric) or existing.labels != metric.labels:
+          raise ValueError(f"指标 {metric.name} 已以不同的类型或标签注册")
+        return existing
+      self.metrics[metric.name] = metric
+      return metric
+
+  def counter(self, name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+    return self._register(Counter(name, help, labels))
+
+  def gauge(self, name: str, help: str, labels: Iterable[str] = ()) -> Gauge:
+    return self._register(Gauge(name, help, labels))
+
+  def histogram(self, name: str, help: str, labels: Iterable[str] = (),
+                buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+    return self._register(Histogram(name, help, labels, buckets))
+
+  def collector(self, func: Callable[[], None]) -> Callable[[], None]:
+    """注册输出前调用的收集函数（用于从连接池、限速器等读取当前状态）"""
+    self.collectors.append(func)
+    return func
+
+  def render(self) -> str:
+    """Prometheus 文本格式（text/plain; version=0.0.4）"""
+    for func in self.collectors:
+      try:
+        func()
+      except Exception as e:
+        print(f"收集指标失败: {e}")
+    with self._lock:
+      metrics = sorted(self.metrics.values(), key=lambda m: m.name)
+    return "\n".join(m.render() for m in metrics) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ============================================================
+# 指标定义
+# ============================================================
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+  "tg_http_request_duration_seconds", "对外 HTTP 请求耗时（每次尝试，包括重试）", ("host", "status"))
+CRAWL_PAGES = REGISTRY.counter("tg_crawl_pages_total", "爬取入库的频道页面数", ("channel",))
+CRAWL_MESSAGES = REGISTRY.counter("tg_crawl_messages_total", "页面中解析出的资源数", ("channel",))
+CRAWL_NEW = REGISTRY.counter("tg_crawl_new_resources_total", "新入库的资源数", ("channel",))
+CRAWL_STAGE_SECONDS = REGISTRY.counter(
+  "tg_crawl_stage_seconds_total", "爬取流水线各阶段累计耗时", ("channel", "stage"))
+TELEGRAPH_RESOLUTIONS = REGISTRY.counter(
+  "tg_telegraph_resolutions_total", "Telegraph 链接解析结果（ok / empty / error）", ("status",))
+DB_WRITE_SECONDS = REGISTRY.histogram("tg_db_write_duration_seconds", "数据库写入耗时", ("operation",))
+SEARCH_SECONDS = REGISTRY.histogram("tg_search_duration_seconds", "资源搜索耗时", ("kind",))
+API_REQUEST_SECONDS = REGISTRY.histogram(
+  "tg_api_request_duration_seconds", "Web API 请求耗时", ("route", "method", "status"))
+JOB_SECONDS = REGISTRY.histogram(
+  "tg_scheduler_job_duration_seconds", "定时任务耗时", ("job", "status"), buckets=JOB_BUCKETS)
+
+POOL_CONNECTIONS = REGISTRY.gauge("tg_http_pool_connections", "各主机新建的连接数", ("host",))
+POOL_REQUESTS = REGISTRY.gauge("tg_http_pool_requests", "各主机经连接池发出的请求数", ("host",))
+# 限速按 (主机, 代理) 分别计算，直接连接时 proxy 为空
+LIMITER_INTERVAL = REGISTRY.gauge(
+  "tg_ratelimit_interval_seconds", "各主机当前的请求间隔", ("host", "proxy"))
+LIMITER_EVENTS = REGISTRY.gauge(
+  "tg_ratelimit_events", "各主机的限速事件数（requests / throttled / errors / retries / breaks）",
+  ("host", "proxy", "event"))
+LIMITER_OPEN = REGISTRY.gauge("tg_ratelimit_circuit_open", "主机是否处于熔断中", ("host", "proxy"))
+PROXY_REQUESTS = REGISTRY.gauge("tg_proxy_requests", "经过代理的请求数", ("proxy",))
+PROXY_FAILURES = REGISTRY.gauge("tg_proxy_failures", "经过代理失败的请求数", ("proxy",))
+PROXY_LATENCY = REGISTRY.gauge("tg_proxy_latency_seconds", "代理的平均响应时间（指数加权）", ("proxy",))
+PROXY_EJECTED = REGISTRY.gauge("tg_proxy_ejected", "代理是否被暂停使用", ("proxy",))
+
+
+def status_label(status: Optional[int]) -> str:
+  """HTTP 状态码标签（网络错误为 error）"""
+  return str(status) if status else "error"
+
+
+@REGISTRY.collector
+def _collect_runtime():
+  """从共用的连接池、限速器、代理池读取当前状态"""
+  from src.core.proxies import get_proxy_pool, proxy_label
+  from src.core.ratelimit import get_rate_limiter
+  from src.core.transport import get_transport
+
+  for gauge in (POOL_CONNECTIONS, POOL_REQUESTS):
+    gauge.clear()
+  for host, s in get_transport().stats().items():
+    POOL_CONNECTIONS.set(s["connections"], host=host)
+    POOL_REQUESTS.set(s["requests"], host=host)
+
+  limiter = get_rate_limiter()
+  now = limiter.clock()
+  for state in list(limiter._hosts.values()):
+    labels = {"host": state.host, "proxy": proxy_label(state.proxy) if state.proxy else ""}
+    LIMITER_INTERVAL.set(state.interval, **labels)
+    LIMITER_OPEN.set(1 if state.open_until > now else 0, **labels)
+    for event, count in state.stats.items():
+      LIMITER_EVENTS.set(count, event=event, **labels)
+
+  pool = get_proxy_pool()
+  if pool:
+    for url, state in list(pool.states.items()):
+      label = proxy_label(url)
+      PROXY_REQUESTS.set(state.requests, proxy=label)
+      PROXY_FAILURES.set(state.failures, proxy=label)
+      if state.latency is not None:
+        PROXY_LATENCY.set(state.latency, proxy=label)
+      PROXY_EJECTED.set(1 if state.ejected(pool.clock()) else 0, proxy=label)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""分阶段性能分析（命令行 --profile）
+
+代码中用 stage("fetch") / @profiled("db") 标记耗时的阶段；没有开启分析时
+stage() 直接返回共用的空上下文，@profiled 只多一次判断，几乎没有开销。
+
+各阶段按线程分别计时：阶段内嵌套的其他阶段（例如 Telegraph 解析中的下载）
+计入内层阶段，不重复计入外层，因此各阶段时间之和不超过所有线程的总时间。
+解析进程池（PIPELINE_PARSE_PROCESSES > 0）中的解析不在统计范围内。
+"""
+
+import cProfile
+import pstats
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+from typing import Optional
+
+STAGES = ("fetch", "parse", "sanitize", "db", "sleep")
+STAGE_NAMES = {
+  "fetch": "网络请求",
+  "parse": "页面解析",
+  "sanitize": "卡片清理",
+  "db": "数据读写",
+  "sleep": "限速等待",
+}
+
+_NULL = nullcontext()
+
+
+class _Stage:
+  """一次阶段计时"""
+
+  __slots__ = ("profiler", "name", "start", "children")
+
+  def __init__(self, profiler: "StageProfiler", name: str):
+    self.profiler = profiler
+    self.name = name
+
+  def __enter__(self):
+    self.children = 0.0
+    self.profiler._stack().append(self)
+    self.start = time.perf_counter()
+    return self
+
+  def __exit__(self, *exc):
+    elapsed = time.perf_counter() - self.start
+    stack = self.profiler._stack()
+    stack.pop()
+    if stack:
+      stack[-1].children += elapsed
+    self.profiler._add(self.name, elapsed - self.children)
+    return False
+
+
+class StageProfiler:
+  """各阶段的调用次数与耗时（不含嵌套阶段），可同时收集 cProfile 数据"""
+
+  def __init__(self, dump: Optional[str] = None):
+    self.totals: dict[str, list] = {}  # 阶段 -> [次数, 秒]
+    self.dump = dump
+    self.started = time.perf_counter()
+    self._local = threading.local()
+    self._lock = threading.Lock()
+    self._profilers: list[cProfile.Profile] = []
+    if dump:
+      self._start_cprofile()
+
+  def _stack(self) -> list:
+    stack = getattr(self._local, "stack", None)
+    if stack is None:
+      stack = self._local.stack = []
+    return stack
+
+  def _add(self, name: str, seconds: float):
+    with self._lock:
+      entry = self.totals.setdefault(name, [0, 0.0])
+      entry[0] += 1
+      entry[1] += seconds
+
+  def stage(self, name: str) -> _Stage:
+    return _Stage(self, name)
+
+  def _start_cprofile(self):
+    # cProfile 只记录调用 enable() 的线程，之后启动的线程（下载、解析线程）各用一个
+    def start_in_thread(frame, event, arg):
+      profiler = cProfile.Profile()
+      with self._lock:
+        self._profilers.append(profiler)
+      profiler.enable()
+
+    threading.setprofile(start_in_thread)
+    main = cProfile.Profile()
+    self._profilers.append(main)
+    main.enable()
+
+  def _write_dump(self):
+    threading.setprofile(None)
+    main, others = self._profilers[0], self._profilers[1:]
+    main.disable()
+    stats = pstats.Stats(main)
+    for profiler in others:
+      stats.add(profiler)
+    stats.dump_stats(self.dump)
+
+  def report(self) -> str:
+    wall = time.perf_counter() - self.started
+    lines = [f"性能分析（运行 {wall:.1f} 秒；各阶段为所有线程的累计时间，不含嵌套的其他阶段）:"]
+    names = list(STAGES) + sorted(set(self.totals) - set(STAGES))
+    for name in names:
+      count, seconds = self.totals.get(name, (0, 0.0))
+      per_call = f"{seconds / count * 1000:9.2f} 毫秒/次" if count else ""
+      lines.append(f"  {STAGE_NAMES.get(name, name):<6} {name:<9} {seconds:9.2f} 秒 {count:>7} 次 {per_call}")
+    if self.dump:
+      self._write_dump()
+      lines.append(f"cProfile 数据已保存到 {self.dump}（python -m pstats {self.dump} 查看）")
+    return "\n".join(lines)
+
+
+_profiler: Optional[StageProfiler] = None
+
+
+def enable(dump: Optional[str] = None) -> StageProfiler:
+  """开启分阶段计时；dump 不为空时同时收集 cProfile 数据并在 report() 时保存"""
+  global _profiler
+  _profiler = StageProfiler(dump)
+  return _profiler
+
+
+def report() -> str:
+  """结束分析，返回各阶段耗时（没有开启时为空字符串）"""
+  global _profiler
+  if _profiler is None:
+    return ""
+  profiler, _profiler = _profiler, None
+  return profiler.report()
+
+
+def stage(name: str):
+  """with stage("fetch"): ...（未开启分析时为空上下文）"""
+  return _profiler.stage(name) if _profiler else _NULL
+
+
+def profiled(name: str):
+  """把整个函数计入一个阶段"""
+  def decorate(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+      if _profiler is None:
+        return func(*args, **kwargs)
+      with _profiler.stage(name):
+        return func(*args, **kwargs)
+    return wrapper
+  return decorate
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""测试公共设置：项目根目录加入 sys.path（与 python main.py 的导入方式一致）、可控的时钟"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+  sys.path.insert(0, str(ROOT))
+
+
+class FakeClock:
+  """可以手动推进的时钟（代替 time.monotonic / time.sleep）"""
+
+  def __init__(self, now: float = 1000.0):
+    self.now = now
+    self.slept: list[float] = []
+
+  def __call__(self) -> float:
+    return self.now
+
+  def advance(self, seconds: float):
+    self.now += seconds
+
+  def sleep(self, seconds: float):
+    self.slept.append(seconds)
+    self.now += max(0.0, seconds)
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+  return FakeClock()
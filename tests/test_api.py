@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Web API：分页参数、同步时边爬边解析"""
+
+import re
+import threading
+
+import pytest
+
+import web.api as api
+import web.auth as auth
+import web.logs as logs
+from web.app import create_app
+from src.core.crawler import ChannelCrawler
+from src.core.database import Database
+from src.core.parser import TelegraphParser
+from src.models.resource import Resource
+from benchmarks.fixtures import MESSAGES_PER_PAGE, channel_page
+
+TOTAL = 30
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+  db = Database(tmp_path / "tg.db")
+  db.save_resources("vip115hot", [
+    Resource(message_id=i, title=f"仙逆 第{i}集", tags="#动漫", pan_url=f"https://115cdn.com/s/{i}",
+             raw_html=f"<b>{i}</b>", created_at=f"2026-01-01 00:00:{i:02d}")
+    for i in range(1, TOTAL + 1)
+  ])
+  monkeypatch.setattr(api, "Database", lambda: db)
+  return db
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, db):
+  """已登录的测试客户端（用户库与日志写到临时目录）"""
+  monkeypatch.setattr(auth, "DATA_DIR", tmp_path)
+  monkeypatch.setattr(auth, "USERS_DB", tmp_path / "users.db")
+  monkeypatch.setattr(logs, "LOGS_FILE", tmp_path / "sync_logs.json")
+  client = create_app().test_client()
+  token = client.post("/api/auth/login", json={"username": "admin", "password": "admin123"}).json["token"]
+  client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+  return client
+
+
+@pytest.mark.parametrize("value, expected", [("0", 1), ("-5", 1), ("1", 1), ("7", 7), ("1000", 100)])
+def test_page_size_bounds(client, value, expected):
+  search = client.get(f"/api/search?q=仙逆&limit={value}")
+  assert search.status_code == 200
+  assert search.json["count"] == min(expected, TOTAL)
+
+  browse = client.get(f"/api/search?per_page={value}")
+  assert browse.status_code == 200
+  assert browse.json["per_page"] == expected
+  assert browse.json["total_pages"] == -(-TOTAL // expected)
+
+  listing = client.get(f"/api/resources?channel=vip115hot&per_page={value}")
+  assert listing.status_code == 200
+  assert listing.json["per_page"] == expected
+  assert len(listing.json["resources"]) == min(expected, TOTAL)
+
+
+@pytest.fixture
+def telegraph_channel(tmp_path, monkeypatch, db):
+  """lsp115 的合成频道页面与 Telegraph 解析（不访问网络），返回爬取刚结束时未解析的条数"""
+  monkeypatch.setattr(logs, "LOGS_FILE", tmp_path / "sync_logs.json")
+  db.set_watermark("lsp115", 5)  # 增量同步翻到消息 5 为止
+
+  def fetch(self, url):
+    match = re.search(r"before=(\d+)", url)
+    newest = int(match.group(1)) - 1 if match else 60
+    return channel_page("telegraph", newest, count=min(MESSAGES_PER_PAGE, max(0, newest)))
+
+  monkeypatch.setattr(ChannelCrawler, "_fetch", fetch)
+  monkeypatch.setattr(TelegraphParser, "fetch_pan_link",
+                      lambda self, url: (f"https://115cdn.com/s/{abs(hash(url))}", "简介"))
+
+  unresolved = []
+  crawl_incremental = ChannelCrawler.crawl_incremental
+
+  def crawl_and_count(self, db):
+    count = crawl_incremental(self, db)
+    unresolved.append(db.count_to_resolve(self.channel_id))
+    return count
+
+  monkeypatch.setattr(ChannelCrawler, "crawl_incremental", crawl_and_count)
+  return unresolved
+
+
+@pytest.mark.parametrize("stream_parse", [True, False])
+def test_sync_stream_parse(db, telegraph_channel, stream_parse):
+  api.do_sync("lsp115", "incremental", stream_parse)
+  assert api.sync_status["message"].startswith("115")
+  total = db.count("lsp115")
+  assert total > MESSAGES_PER_PAGE
+  if stream_parse:
+    # 爬取返回时链接已经解析完，之后不需要补充解析
+    assert telegraph_channel == [0]
+  else:
+    assert telegraph_channel == [total]
+  assert db.count_to_resolve("lsp115") == 0
+  assert all(r.pan_url.startswith("https://115cdn.com/s/") for r in db.list_all("lsp115", limit=total))
+
+
+def test_sync_routes_pass_stream_parse(client, monkeypatch):
+  calls = []
+  monkeypatch.setattr(api, "do_sync", lambda *args: calls.append(args))
+  client.post("/api/sync", json={"channel": "lsp115", "stream_parse": True})
+  client.post("/api/sync", json={"channel": "lsp115"})
+  for _ in range(100):
+    if len(calls) == 2:
+      break
+    threading.Event().wait(0.01)
+  assert sorted(calls, key=str) == [("lsp115", "incremental", None), ("lsp115", "incremental", True)]
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""频道页面解析后端一致性：lxml 与 BeautifulSoup 得到的 Resource 必须完全相同"""
+
+import pytest
+
+from src.core.backends import LxmlBackend, SoupBackend
+from src.core.crawler import ChannelCrawler
+from benchmarks.fixtures import MODE_CHANNELS
+from benchmarks.record import read
+
+
+def _pages(mode: str) -> list[str]:
+  """录制的测试页面（benchmarks/pages，包括边界情况页面）"""
+  return read(mode)["pages"]
+
+
+@pytest.mark.parametrize("mode", list(MODE_CHANNELS))
+def test_backends_parse_same_resources(mode):
+  ch_id = MODE_CHANNELS[mode]
+  soup = ChannelCrawler(ch_id, backend=SoupBackend())
+  lxml = ChannelCrawler(ch_id, backend=LxmlBackend())
+  resources = []
+  for index, html in enumerate(_pages(mode)):
+    expected = soup._parse_page(html)
+    assert lxml._parse_page(html) == expected, f"{mode} 第 {index + 1} 页"
+    resources += expected
+  assert resources
+  assert any(r.pan_url or r.telegraph_url for r in resources)
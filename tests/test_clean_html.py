@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""消息卡片清理回归测试：一次遍历的新实现与旧版 deepcopy 实现的输出必须逐字节相同"""
+
+import pytest
+from bs4 import BeautifulSoup
+
+from src.core.backends import CLEAN_REMOVE, LxmlBackend, SoupBackend, _message_id
+from benchmarks.fixtures import MODE_CHANNELS, channel_page
+from benchmarks.legacy import clean_html_deepcopy
+from benchmarks.record import read
+
+# 旧版移除的全部元素与各种写法的背景图片
+SELECTOR_MESSAGE = '''<div class="tgme_widget_message_wrap"><div class="tgme_widget_message" data-post="lsp115/9100">
+  <div class="tgme_widget_message_user"><a href="https://t.me/lsp115"><img src="avatar.jpg"></a></div>
+  <a class="tgme_widget_message_owner_name" href="https://t.me/lsp115"><span>频道</span></a>
+  <a class="tgme_widget_message_photo_wrap" href="https://t.me/lsp115/9100" style="background-image:url('https://x.org/wrap.jpg')"></a>
+  <div class="tgme_widget_message_photo" style="background-image:url('https://x.org/single.jpg')"></div>
+  <div class="tgme_widget_message_photo" style="background-image:url(&quot;https://x.org/double.jpg?a=1&amp;b=2&quot;)"></div>
+  <div class="tgme_widget_message_photo big" style="width:10px;background-image:url(https://x.org/bare.jpg)"></div>
+  <div class="tgme_widget_message_photo" style="width:10px"></div>
+  <div class="tgme_widget_message_photo" style="background-image:none"></div>
+  <div class="tgme_widget_message_text">正文 <b>加粗</b> &amp; &lt;实体&gt;</div>
+  <span class="tgme_widget_message_views">1.2K</span>
+  <span class="tgme_widget_message_date">12:00</span>
+  <a class="tgme_widget_message_date" href="https://t.me/lsp115/9100"><time>12:00</time></a>
+  <script>var a = "<b>x</b>";</script><style>.x > b {color: red}</style>
+</div></div>'''
+
+BACKENDS = [SoupBackend(), LxmlBackend()]
+
+
+def _selector(tag: str, cls) -> str:
+  return f"{tag}.{cls}" if cls else tag
+
+
+def _legacy(html: str) -> dict[int, str]:
+  """旧版实现清理后的卡片 {消息ID: HTML}"""
+  result = {}
+  for div in BeautifulSoup(html, "lxml").find_all("div", class_="tgme_widget_message_wrap"):
+    message_elem = div.find("div", class_="tgme_widget_message")
+    if message_elem is None:
+      continue
+    message_id = _message_id(message_elem.get("data-post", ""))
+    if message_id is not None:
+      result[message_id] = clean_html_deepcopy(div)
+  return result
+
+
+@pytest.fixture(scope="module")
+def pages() -> list[tuple[str, dict[int, str]]]:
+  """录制的测试页面与 SELECTOR_MESSAGE，以及旧版实现的结果 [(HTML, {消息ID: 卡片})]"""
+  pages = [page for mode in MODE_CHANNELS for page in read(mode)["pages"]]
+  pages.append(channel_page("telegraph", 20, count=3).replace("</section>", SELECTOR_MESSAGE + "</section>"))
+  return [(html, _legacy(html)) for html in pages]
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=lambda b: b.name)
+def test_clean_html_matches_legacy(backend, pages):
+  checked = 0
+  for index, (html, expected) in enumerate(pages):
+    actual = {node.message_id: node.raw_html for node in backend.parse_page(html)}
+    assert actual.keys() == expected.keys()
+    for message_id, raw_html in actual.items():
+      assert raw_html == expected[message_id], f"第 {index + 1} 页消息 {message_id}"
+      checked += 1
+  assert checked > 100
+
+
+def test_selector_message_covers_every_removed_element():
+  """SELECTOR_MESSAGE 包含所有被移除的元素，清理后全部去掉，背景图片转换为 img"""
+  soup = BeautifulSoup(SELECTOR_MESSAGE, "lxml")
+  cleaned = BeautifulSoup(SoupBackend().parse_page(SELECTOR_MESSAGE)[0].raw_html, "lxml")
+  for tag, cls in CLEAN_REMOVE:
+    assert soup.select(_selector(tag, cls)), _selector(tag, cls)
+    assert not cleaned.select(_selector(tag, cls)), _selector(tag, cls)
+  srcs = [img["src"] for img in cleaned.find_all("img")]
+  assert srcs == ["https://x.org/single.jpg", "https://x.org/double.jpg?a=1&b=2", "https://x.org/bare.jpg"]
+  assert len(cleaned.select("div.tgme_widget_message_photo")) == 2
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""数据库迁移：旧版每频道独立的资源表升级到当前结构"""
+
+import sqlite3
+
+import pytest
+
+from src.core.database import Database
+
+# 旧版（迁移之前）每个频道的资源表
+LEGACY_TABLE = """
+  CREATE TABLE resources_{channel} (
+    message_id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    tags TEXT,
+    telegraph_url TEXT,
+    pan_url TEXT,
+    description TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    raw_html TEXT
+  )
+"""
+
+LEGACY_ROWS = {
+  "lsp115": [
+    (1, "仙逆 第1集", "#动漫", "https://telegra.ph/a-01-01", "https://115cdn.com/s/a", "简介", "2025-01-01 00:00:01",
+     "<div>1</div>"),
+    (2, "凡人修仙传", "#动漫", "https://telegra.ph/b-01-01", "", None, "2025-01-01 00:00:02", "<div>2</div>"),
+    (3, "重复卡片", "", None, "N/A", None, "2025-01-01 00:00:03", "<div>1</div>"),
+  ],
+  "vip115hot": [
+    (7, "复仇者联盟", "#电影", None, "https://115cdn.com/s/b", "", "2025-01-02 00:00:00", "<p>复仇者</p>"),
+    (8, "没有卡片", "", None, "https://115cdn.com/s/c", "", "2025-01-02 00:00:01", None),
+  ],
+}
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+  path = tmp_path / "tg.db"
+  with sqlite3.connect(path) as conn:
+    for channel, rows in LEGACY_ROWS.items():
+      conn.execute(LEGACY_TABLE.format(channel=channel))
+      conn.execute(f"CREATE INDEX idx_{channel}_title ON resources_{channel}(title)")
+      conn.executemany(f"INSERT INTO resources_{channel} VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+  conn.close()
+  return path
+
+
+def test_legacy_database_is_migrated(legacy_db):
+  db = Database(legacy_db)
+  for channel, rows in LEGACY_ROWS.items():
+    assert db.count(channel) == len(rows)
+    for message_id, title, tags, telegraph_url, pan_url, description, created_at, raw_html in rows:
+      r = db.get_resource(channel, message_id)
+      assert (r.title, r.tags, r.telegraph_url, r.pan_url, r.created_at) == (title, tags, telegraph_url, pan_url, created_at)
+      assert r.raw_html == (raw_html or "")
+
+  with sqlite3.connect(legacy_db) as conn:
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(Database.MIGRATIONS)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert not {t for t in tables if t.startswith("resources_")}
+    # 相同的卡片只保存一份
+    assert conn.execute("SELECT COUNT(*) FROM html_blobs").fetchone()[0] == 3
+    triggers = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    assert triggers == {"resource_search_delete"}
+  conn.close()
+
+  assert [r.message_id for _, r in db.search("仙逆")] == [1]
+  assert [r.message_id for _, r in db.search("联盟")] == [7]
+
+
+def test_migrated_database_reopens(legacy_db):
+  Database(legacy_db).count("lsp115")
+  # 模拟新进程打开已迁移的数据库：按 user_version 跳过已执行的步骤
+  Database._migrated.discard(str(legacy_db))
+  db = Database(legacy_db)
+  assert db.count("lsp115") == len(LEGACY_ROWS["lsp115"])
+  assert db.get_resource("lsp115", 3).raw_html == "<div>1</div>"
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""全文搜索：分词、MATCH 表达式、单字模糊匹配、排序与游标翻页、索引维护"""
+
+import sqlite3
+
+import pytest
+
+import src.core.database as database
+from src.core.database import Database
+from src.core.fts import match_query, ngrams
+from src.models.resource import Resource
+
+
+def _resource(message_id: int, title: str, tags: str = "", description: str = "") -> Resource:
+  return Resource(message_id=message_id, title=title, tags=tags, description=description,
+                  pan_url=f"https://115cdn.com/s/{message_id}", created_at=f"2026-01-01 00:{message_id // 60:02d}:{message_id % 60:02d}")
+
+
+def _ids(results) -> list[tuple[str, int]]:
+  return [(ch_id, r.message_id) for ch_id, r in results]
+
+
+@pytest.fixture
+def db(tmp_path):
+  return Database(tmp_path / "tg.db")
+
+
+@pytest.mark.parametrize("text, expected", [
+  ("复仇者联盟", "复仇 仇者 者联 联盟"),
+  ("仙", "仙"),
+  ("The Avengers 2012", "the avengers 2012"),
+  ("仙逆 第128集 4K", "仙逆 第 128 集 4k"),
+  ("#动漫 #国漫", "动漫 国漫"),
+  ("a_b", "a b"),
+  ("", ""),
+  (None, ""),
+])
+def test_ngrams(text, expected):
+  assert ngrams(text) == expected
+
+
+@pytest.mark.parametrize("keyword, expected", [
+  ("复仇者", '"复仇 仇者"'),
+  ("avenger", '"avenger"*'),
+  ("仙逆 4K", '"仙逆" "4k"*'),
+  ("第128集", None),
+  ("仙", None),
+  ("仙逆 仙", None),
+  ("   ", None),
+  ("!!", None),
+])
+def test_match_query(keyword, expected):
+  assert match_query(keyword) == expected
+
+
+def test_substring_and_prefix_match(db):
+  db.save_resources("vip115hot", [_resource(1, "复仇者联盟"), _resource(2, "The Avengers"), _resource(3, "其他")])
+  assert _ids(db.search("仇者联")) == [("vip115hot", 1)]
+  assert _ids(db.search("aveng")) == [("vip115hot", 2)]
+  assert db.search("联盟 avengers") == []
+
+
+def test_single_character_falls_back_to_like(db):
+  db.save_resources("vip115hot", [_resource(1, "仙逆"), _resource(2, "其他", tags="#仙侠"),
+                                  _resource(3, "无关", description="仙")])
+  # 只匹配标题和标签，按入库时间从新到旧
+  assert _ids(db.search("仙")) == [("vip115hot", 2), ("vip115hot", 1)]
+  assert db.count_matches("仙") == (2, True)
+
+
+def test_relevance_and_recency(db, monkeypatch):
+  db.save_resources("vip115hot", [
+    _resource(1, "仙逆"),
+    *(_resource(i, f"其他 {i}") for i in range(2, 20)),
+    _resource(20, "其他", description="仙逆"),
+    _resource(21, "仙逆"),
+  ])
+  # 只按相关度：标题匹配在简介匹配之前
+  monkeypatch.setattr(database, "SEARCH_RECENCY_WEIGHT", 0)
+  assert _ids(db.search("仙逆"))[-1] == ("vip115hot", 20)
+  # 相关度相同时新的在前
+  monkeypatch.setattr(database, "SEARCH_RECENCY_WEIGHT", 2.0)
+  ranked = _ids(db.search("仙逆"))
+  assert ranked[0] == ("vip115hot", 21)
+  assert ranked.index(("vip115hot", 21)) < ranked.index(("vip115hot", 1))
+
+
+def test_cursor_paging_across_rank_ties(db, monkeypatch):
+  # 不计新旧时相同标题的相关度完全相同，按 id 排序翻页
+  monkeypatch.setattr(database, "SEARCH_RECENCY_WEIGHT", 0)
+  for ch_id in ("lsp115", "vip115hot", "qukanmovie"):
+    db.save_resources(ch_id, [_resource(i, "仙逆") for i in range(1, 5)])
+  expected = _ids(db.search("仙逆"))
+  assert len(expected) == 12
+
+  pages, cursor = [], None
+  while True:
+    results, cursor = db.search_page("仙逆", limit=5, cursor=cursor)
+    pages.append(_ids(results))
+    if not cursor:
+      break
+  assert [len(p) for p in pages] == [5, 5, 2]
+  assert sum(pages, []) == expected
+
+
+def test_index_follows_writes(db):
+  db.save_resources("vip115hot", [_resource(1, "仙逆")])
+  db.save_resource("vip115hot", _resource(1, "凡人修仙传"))
+  assert db.search("仙逆") == []
+  assert _ids(db.search("凡人")) == [("vip115hot", 1)]
+  # 不覆盖已存在的资源时索引也不变
+  db.save_resources("vip115hot", [_resource(1, "仙逆")])
+  assert _ids(db.search("修仙")) == [("vip115hot", 1)]
+
+
+def test_other_clients_can_write_and_reindex_repairs(db):
+  db.save_resources("vip115hot", [_resource(1, "仙逆")])
+
+  # 没有注册任何 Python 函数的连接也能写入资源表
+  with sqlite3.connect(db.db_path) as conn:
+    conn.execute("""
+      INSERT INTO resources (channel_id, message_id, title, tags, pan_url, description, created_at)
+      VALUES ('vip115hot', 2, '凡人修仙传', '', 'https://115cdn.com/s/2', '', '2026-01-02 00:00:00')
+    """)
+    conn.execute("DELETE FROM resources WHERE message_id = 1")
+  assert db.search("仙逆") == []
+  assert db.search("凡人") == []
+
+  assert db.rebuild_search_index()["vip115hot"] == 1
+  assert _ids(db.search("凡人")) == [("vip115hot", 2)]
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""分片并行全量爬取：结果与串行爬取一致，中断后各分片从自己的断点继续"""
+
+import asyncio
+import re
+import sys
+import threading
+
+import pytest
+
+import src.core.database as database
+from src.cli import commands
+from src.core.async_crawler import AsyncChannelCrawler
+from src.core.crawler import ChannelCrawler, plan_shards
+from src.core.database import Database, StateManager
+from benchmarks.fixtures import MESSAGES_PER_PAGE, channel_page
+
+CHANNEL = "vip115hot"  # inline 模式，不需要解析 Telegraph
+NEWEST_ID = 130
+
+
+class FakeChannel:
+  """代替 ChannelCrawler._fetch：按 before 参数返回合成页面，记录请求的地址"""
+
+  def __init__(self, interrupt_after: int = 0):
+    self.urls = []
+    self.interrupt_after = interrupt_after  # 第 N 次请求后中断爬虫（0 表示不中断）
+    self._lock = threading.Lock()
+
+  def fetch(self, crawler: ChannelCrawler, url: str) -> str:
+    with self._lock:
+      self.urls.append(url)
+      if self.interrupt_after and len(self.urls) >= self.interrupt_after:
+        crawler._interrupted = True
+    match = re.search(r"before=(\d+)", url)
+    newest = int(match.group(1)) - 1 if match else NEWEST_ID
+    return channel_page("inline", newest, count=min(MESSAGES_PER_PAGE, max(0, newest)))
+
+  def befores(self) -> list[int]:
+    return [int(m.group(1)) for m in map(re.compile(r"before=(\d+)").search, self.urls) if m]
+
+
+@pytest.fixture
+def state_dir(tmp_path, monkeypatch):
+  """断点文件写到临时目录"""
+  monkeypatch.setattr(database, "STATE_FILE", tmp_path / "crawl_state.json")
+  return tmp_path
+
+
+def _use(monkeypatch, fake: FakeChannel):
+  monkeypatch.setattr(ChannelCrawler, "_fetch", lambda self, url: fake.fetch(self, url))
+
+
+def _sharded(db: Database, shards: int = 4) -> int:
+  return asyncio.run(AsyncChannelCrawler(CHANNEL).crawl_sharded(db, shards))
+
+
+def _serial_ids(tmp_path, monkeypatch) -> set[int]:
+  _use(monkeypatch, FakeChannel())
+  db = Database(tmp_path / "serial.db")
+  ChannelCrawler(CHANNEL).crawl_all(db, StateManager(tmp_path / "serial_state.json"))
+  return set(db.load_message_ids(CHANNEL))
+
+
+def test_sharded_backfill_matches_serial(tmp_path, monkeypatch, state_dir):
+  expected = _serial_ids(tmp_path, monkeypatch)
+  assert len(expected) > 100
+
+  _use(monkeypatch, FakeChannel())
+  db = Database(tmp_path / "sharded.db")
+  assert _sharded(db) == len(expected)
+  assert set(db.load_message_ids(CHANNEL)) == expected
+  assert not StateManager.shard_managers(CHANNEL)
+
+  # 分片区间首尾相接，边界两侧的消息都已入库
+  plan = plan_shards(CHANNEL, NEWEST_ID, 4)
+  assert plan[0].high_id == NEWEST_ID
+  for upper, lower in zip(plan, plan[1:]):
+    assert lower.high_id == upper.low_id
+    assert {upper.low_id, upper.low_id + 1} & expected <= set(db.load_message_ids(CHANNEL))
+
+
+def test_interrupted_shards_resume_from_own_checkpoint(tmp_path, monkeypatch, state_dir):
+  expected = _serial_ids(tmp_path, monkeypatch)
+  db = Database(tmp_path / "sharded.db")
+
+  # 首页 + 4 个分片页面后中断
+  _use(monkeypatch, FakeChannel(interrupt_after=5))
+  _sharded(db)
+  partial = set(db.load_message_ids(CHANNEL))
+  managers = StateManager.shard_managers(CHANNEL)
+  assert managers and partial < expected
+  states = [m.load() for m in managers]
+
+  resumed = FakeChannel()
+  _use(monkeypatch, resumed)
+  _sharded(db, shards=2)  # 有未完成的分片时忽略分片数
+  befores = resumed.befores()
+  assert len(resumed.urls) == len(befores), "续传时不应重新请求首页"
+  for state in states:
+    start = state.last_before_id or state.high_id + 1
+    assert start in befores
+    if state.last_before_id:
+      # 已入库的页面不再请求
+      assert state.high_id + 1 not in befores
+  assert set(db.load_message_ids(CHANNEL)) == expected
+  assert not StateManager.shard_managers(CHANNEL)
+
+
+@pytest.mark.parametrize("mode", [["--limit", "10"], ["--incremental"], []])
+def test_shards_require_full_crawl(monkeypatch, mode):
+  monkeypatch.setattr(sys, "argv", ["main.py", "crawl", "-c", CHANNEL, "--shards", "4", *mode])
+  with pytest.raises(SystemExit) as exc:
+    commands.main()
+  assert exc.value.code == 2
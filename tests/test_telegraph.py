@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""Telegraph 解析：getPage 接口取链接与描述，接口出错时改为解析页面 HTML"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import src.core.parser as parser
+from src.channels.config import is_valid_115_url
+from src.core.parser import TelegraphParser
+from src.core.ratelimit import RateLimiter
+from benchmarks.fixtures import telegraph_article
+
+PATH = "Sample-Show-01-01"
+
+
+class TelegraphHandler(BaseHTTPRequestHandler):
+  """/getPage/<path> 返回接口 JSON，/<path> 返回页面 HTML；api 决定接口的行为"""
+  api = "ok"  # ok / error（HTTP 500）/ not_ok（返回 ok: false）
+  paths: list = []
+
+  def do_GET(self):
+    self.paths.append(self.path)
+    html, api = telegraph_article(f"https://telegra.ph/{PATH}")
+    if self.path.startswith("/getPage/"):
+      if self.api == "error":
+        self.send_error(500)
+        return
+      if self.api == "not_ok":
+        api = json.dumps({"ok": False, "error": "PAGE_NOT_FOUND"})
+      self._send(api, "application/json")
+    elif self.path == f"/{PATH}":
+      self._send(html, "text/html")
+    else:
+      self.send_error(404)
+
+  def _send(self, body: str, content_type: str):
+    data = body.encode("utf-8")
+    self.send_response(200)
+    self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+    self.send_header("Content-Length", str(len(data)))
+    self.end_headers()
+    self.wfile.write(data)
+
+  def log_message(self, *args):
+    pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+  server = ThreadingHTTPServer(("127.0.0.1", 0), TelegraphHandler)
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  base = f"http://127.0.0.1:{server.server_address[1]}"
+  monkeypatch.setattr(parser, "TELEGRAPH_API_URL", base)
+  monkeypatch.setattr(parser, "TELEGRAPH_RESOLVER", "api")
+  TelegraphHandler.paths = []
+  yield base
+  server.shutdown()
+  server.server_close()
+
+
+def _parser() -> TelegraphParser:
+  limiter = RateLimiter(initial_interval=0.001, min_interval=0.001, max_retries=0, host_limits={})
+  telegraph = TelegraphParser(limiter=limiter)
+  telegraph.session.trust_env = False  # 不使用环境变量中的代理访问本机
+  return telegraph
+
+
+def test_api_extracts_link_and_description(server):
+  url = f"{server}/{PATH}"
+  pan_url, description = _parser().fetch_pan_link(url)
+
+  assert is_valid_115_url(pan_url)
+  assert description.startswith("Sample Show\n资源分享\n简介：Sample Show")
+  assert TelegraphHandler.paths == [f"/getPage/{PATH}?return_content=true"]
+  # 与页面解析的结果相同
+  assert _parser()._parse_html(url) == (pan_url, description)
+
+
+@pytest.mark.parametrize("api", ["error", "not_ok"])
+def test_api_failure_falls_back_to_html(server, monkeypatch, api):
+  monkeypatch.setattr(TelegraphHandler, "api", api)
+  url = f"{server}/{PATH}"
+  pan_url, description = _parser().fetch_pan_link(url)
+
+  assert is_valid_115_url(pan_url)
+  assert "简介：Sample Show" in description
+  assert TelegraphHandler.paths == [f"/getPage/{PATH}?return_content=true", f"/{PATH}"]
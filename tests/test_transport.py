@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""HTTP/2 适配器：代理与证书设置交给 HTTP/1.1 连接池"""
+
+import pytest
+import requests
+
+pytest.importorskip("httpx")
+pytest.importorskip("h2")
+
+from src.core.transport import Http2Adapter, PooledAdapter
+
+
+class RecordingAdapter(PooledAdapter):
+  """记录交给 fallback 的请求，不发出网络请求"""
+
+  def __init__(self):
+    super().__init__()
+    self.sent = []
+
+  def send(self, request, **kwargs):
+    self.sent.append(kwargs)
+    response = requests.Response()
+    response.status_code = 200
+    return response
+
+
+@pytest.mark.parametrize("kwargs", [
+  {"verify": False},
+  {"verify": "/etc/ssl/certs/custom-ca.pem"},
+  {"cert": ("/tmp/client.pem", "/tmp/client.key")},
+  {"proxies": {"https": "http://127.0.0.1:3128"}},
+])
+def test_falls_back_for_proxy_and_tls_settings(kwargs):
+  fallback = RecordingAdapter()
+  adapter = Http2Adapter(fallback)
+  request = requests.Request("GET", "https://telegra.ph/test").prepare()
+  try:
+    adapter.send(request, timeout=5, **kwargs)
+  finally:
+    adapter.shutdown()
+  assert len(fallback.sent) == 1
+  for key, value in kwargs.items():
+    assert fallback.sent[0][key] == value
+  assert not adapter.requests
@@ -3,20 +3,25 @@
 
 import json
 import threading
+import time
 from pathlib import Path
+from typing import Optional
 from flask import Blueprint, request, jsonify
 
 from .auth import login_required
 from .logs import add_log, get_logs, clear_logs
 
-from src.channels.config import CHANNELS
+from src.channels.config import CHANNELS, SEARCH_PAGE_SIZE
 from src.core.database import Database, StateManager
 from src.core.crawler import ChannelCrawler
+from src.core.async_crawler import run_concurrent_sync
 from src.core.parser import TelegraphParser
+from src.utils.metrics import JOB_SECONDS
 
 api_bp = Blueprint('api', __name__)
 
 sync_status = {'running': False, 'channel': None, 'message': ''}
+sync_cancel = threading.Event()  # 手动同步时停止 Telegraph 链接解析
 
 # 定时任务配置
 DATA_DIR = Path(__file__).parent.parent / "data"
@@ -45,32 +50,62 @@ def get_scheduler():
   return _scheduler
 
 
-def sync_channel_task(channel_id: str, mode: str):
-  """定时任务执行的同步函数"""
+def sync_channel_task(channel_id: str, mode: str, stream_parse: Optional[bool] = None):
+  """定时任务执行的同步函数（stream_parse 为空时按 TELEGRAPH_STREAM_PARSE）"""
   channel_name = CHANNELS.get(channel_id, {}).get('name', channel_id)
   add_log('scheduled', channel_id, f'定时任务开始: {channel_name} ({mode})', 'info')
+  start = time.perf_counter()
   try:
     db = Database()
     state_manager = StateManager()
-    crawler = ChannelCrawler(channel_id)
+    crawler = ChannelCrawler(channel_id, stream_parse=stream_parse)
     if mode == 'full':
       new_count = crawler.crawl_all(db, state_manager)
     else:
       new_count = crawler.crawl_incremental(db)
     if CHANNELS[channel_id]['parse_mode'] == 'telegraph':
+      # 边爬边解析时只剩爬取期间没有解析完的资源
       parser = TelegraphParser()
-      unparsed = db.count_unparsed(channel_id)
+      unparsed = db.count_to_resolve(channel_id)
       if unparsed > 0:
         parser.parse_batch(db, channel_id, limit=unparsed)
     add_log('scheduled', channel_id, f'定时任务完成: {channel_name}，新增 {new_count} 条资源', 'success')
+    JOB_SECONDS.observe(time.perf_counter() - start, job=f'sync_{channel_id}_{mode}', status='success')
   except Exception as e:
     add_log('scheduled', channel_id, f'定时任务失败: {str(e)}', 'error')
+    JOB_SECONDS.observe(time.perf_counter() - start, job=f'sync_{channel_id}_{mode}', status='error')
 
 
-def sync_all_task(mode: str):
+def sync_all_task(mode: str, concurrent: bool = False, stream_parse: Optional[bool] = None):
   """同步所有频道"""
-  for ch_id in CHANNELS.keys():
-    sync_channel_task(ch_id, mode)
+  start = time.perf_counter()
+  if concurrent:
+    add_log('scheduled', 'all', f'定时任务开始: 并发同步全部频道 ({mode})', 'info')
+    try:
+      counts = sync_channels_concurrently(mode, stream_parse)
+      add_log('scheduled', 'all', f'定时任务完成: 新增 {sum(counts.values())} 条资源', 'success')
+      status = 'success'
+    except Exception as e:
+      add_log('scheduled', 'all', f'定时任务失败: {str(e)}', 'error')
+      status = 'error'
+  else:
+    # 各频道的耗时由 sync_channel_task 分别记录
+    for ch_id in CHANNELS.keys():
+      sync_channel_task(ch_id, mode, stream_parse)
+    status = 'success'
+  JOB_SECONDS.observe(time.perf_counter() - start, job=f'sync_all_{mode}', status=status)
+
+
+def sync_channels_concurrently(mode: str, stream_parse: Optional[bool] = None) -> dict:
+  """并发爬取所有频道，然后解析 telegraph 频道剩下的未解析链接"""
+  counts = run_concurrent_sync(list(CHANNELS.keys()), mode, stream_parse=stream_parse, cancel=sync_cancel)
+  db = Database()
+  for ch_id, config in CHANNELS.items():
+    if config['parse_mode'] == 'telegraph':
+      unparsed = db.count_to_resolve(ch_id)
+      if unparsed > 0 and not sync_cancel.is_set():
+        TelegraphParser().parse_batch(db, ch_id, limit=unparsed, cancel=sync_cancel)
+  return counts
 
 
 def save_tasks():
@@ -92,6 +127,8 @@ def save_tasks():
           'channel': parts[1],
           'mode': parts[2],
           'interval_hours': interval,
+          'concurrent': _job_concurrent(job),
+          'stream_parse': _job_stream_parse(job),
           'next_run': next_run
         })
   with open(TASKS_FILE, 'w', encoding='utf-8') as f:
@@ -110,14 +147,33 @@ def load_saved_tasks():
         task['channel'],
         task['mode'],
         task['interval_hours'],
-        task.get('next_run')
+        task.get('next_run'),
+        task.get('concurrent', False),
+        task.get('stream_parse')
       )
   except Exception as e:
     print(f"加载任务失败: {e}")
 
 
-def add_scheduled_job(channel_id: str, mode: str, interval_hours: int, next_run: str = None) -> str:
-  """添加定时任务"""
+def _job_concurrent(job) -> bool:
+  """同步全部频道的任务是否并发执行（sync_all_task 的第二个参数）"""
+  return job.func is sync_all_task and len(job.args) > 1 and bool(job.args[1])
+
+
+def _job_stream_parse(job) -> Optional[bool]:
+  """任务是否边爬边解析（两种任务的第三个参数），为空时按 TELEGRAPH_STREAM_PARSE"""
+  return job.args[2] if len(job.args) > 2 else None
+
+
+def _stream_parse_option(data: dict) -> Optional[bool]:
+  """请求中的 stream_parse，未指定时为 None（按 TELEGRAPH_STREAM_PARSE）"""
+  value = data.get('stream_parse')
+  return None if value is None else bool(value)
+
+
+def add_scheduled_job(channel_id: str, mode: str, interval_hours: int, next_run: str = None,
+                      concurrent: bool = False, stream_parse: Optional[bool] = None) -> str:
+  """添加定时任务（concurrent 只对同步全部频道的任务有效）"""
   scheduler = get_scheduler()
   if not scheduler:
     raise Exception("APScheduler 未安装")
@@ -131,11 +187,11 @@ def add_scheduled_job(channel_id: str, mode: str, interval_hours: int, next_run:
 
   if channel_id == 'all':
     func = sync_all_task
-    args = (mode,)
-    name = f"同步全部频道 ({mode})"
+    args = (mode, concurrent, stream_parse)
+    name = f"{'并发' if concurrent else ''}同步全部频道 ({mode})"
   else:
     func = sync_channel_task
-    args = (channel_id, mode)
+    args = (channel_id, mode, stream_parse)
     name = f"同步 {CHANNELS.get(channel_id, {}).get('name', channel_id)} ({mode})"
 
   # 计算下次执行时间
@@ -169,14 +225,14 @@ def add_scheduled_job(channel_id: str, mode: str, interval_hours: int, next_run:
 @api_bp.route('/dashboard', methods=['GET'])
 @login_required
 def get_dashboard():
-  db = Database()
+  stats = Database().channel_stats()
   channels_data = []
   total_resources = 0
   total_parsed = 0
 
   for ch_id, config in CHANNELS.items():
-    count = db.count(ch_id)
-    unparsed = db.count_unparsed(ch_id)
+    count = stats[ch_id]['total']
+    unparsed = stats[ch_id]['unparsed']
     channels_data.append({
       'id': ch_id,
       'name': config['name'],
@@ -196,60 +252,103 @@ def get_dashboard():
   })
 
 
+# /api/search 返回的资源字段（fields 参数可以只选择其中一部分）
+SEARCH_FIELDS = ('channel_id', 'channel_name', 'channel_username', 'message_id', 'title', 'tags',
+                 'pan_url', 'description', 'raw_html', 'created_at')
+
+
+def _parse_fields():
+  """fields=title,pan_url,... -> 字段列表（没有该参数时为全部字段），包含未知字段时抛出 ValueError"""
+  value = request.args.get('fields', '').strip()
+  if not value:
+    return list(SEARCH_FIELDS)
+  fields = [f.strip() for f in value.split(',') if f.strip()]
+  unknown = [f for f in fields if f not in SEARCH_FIELDS]
+  if unknown:
+    raise ValueError(f"未知字段: {', '.join(unknown)}")
+  return fields
+
+
+def _page_size(name: str, default: int) -> int:
+  """每页条数参数，限制在 1 到 100 之间"""
+  return max(1, min(request.args.get(name, default, type=int), 100))
+
+
+def _db_fields(fields: list) -> list:
+  """需要从数据库读取的字段（频道名称等由频道 ID 得到）"""
+  return [f for f in fields if f not in ('channel_name', 'channel_username')]
+
+
+def _resource_dict(ch_id: str, r, fields: list) -> dict:
+  values = {
+    'channel_id': lambda: ch_id,
+    'channel_name': lambda: CHANNELS[ch_id]['name'],
+    'channel_username': lambda: CHANNELS[ch_id]['url'].split('/')[-1],
+  }
+  return {f: values[f]() if f in values else getattr(r, f) for f in fields}
+
+
 @api_bp.route('/search', methods=['GET'])
 @login_required
 def search():
   keyword = request.args.get('q', '').strip()
-  channel_id = request.args.get('channel', None)
+  channel_id = request.args.get('channel', None) or None
   page = request.args.get('page', 1, type=int)
-  per_page = min(request.args.get('per_page', 20, type=int), 100)
+  per_page = _page_size('per_page', 20)
+  cursor = request.args.get('cursor') or None
 
   db = Database()
-  
+  try:
+    fields = _parse_fields()
+    if keyword:
+      # 搜索模式：按相关度分页（limit 条，下一页带上 next_cursor），总数最多统计到 SEARCH_COUNT_CAP
+      limit = _page_size('limit', SEARCH_PAGE_SIZE)
+      results, next_cursor = db.search_page(keyword, channel_id, limit, cursor=cursor, fields=_db_fields(fields))
+      total, exact = db.count_matches(keyword, channel_id)
+    else:
+      # 浏览模式：显示所有资源（分页）。传入上一页返回的 cursor 时按游标翻页，否则按 page
+      results, next_cursor = db.browse(channel_id, per_page, cursor=cursor,
+                                       offset=(max(page, 1) - 1) * per_page, fields=_db_fields(fields))
+      total = db.count_browsable(channel_id)
+  except ValueError as e:
+    return jsonify({'error': str(e)}), 400
+
+  resources = [_resource_dict(ch_id, r, fields) for ch_id, r in results]
   if keyword:
-    # 搜索模式
-    results = db.search(keyword, channel_id if channel_id else None)
-    resources = [{
-      'channel_id': ch_id,
-      'channel_name': CHANNELS[ch_id]['name'],
-      'channel_username': CHANNELS[ch_id]['url'].split('/')[-1],
-      'message_id': r.message_id,
-      'title': r.title,
-      'tags': r.tags,
-      'pan_url': r.pan_url,
-      'description': r.description,
-      'raw_html': r.raw_html,
-      'created_at': r.created_at
-    } for ch_id, r in results]
     return jsonify({
       'mode': 'search',
       'count': len(resources),
-      'resources': resources
-    })
-  else:
-    # 浏览模式：显示所有资源（分页）
-    results, total = db.list_all_channels(channel_id, page, per_page)
-    resources = [{
-      'channel_id': ch_id,
-      'channel_name': CHANNELS[ch_id]['name'],
-      'channel_username': CHANNELS[ch_id]['url'].split('/')[-1],
-      'message_id': r.message_id,
-      'title': r.title,
-      'tags': r.tags,
-      'pan_url': r.pan_url,
-      'description': r.description,
-      'raw_html': r.raw_html,
-      'created_at': r.created_at
-    } for ch_id, r in results]
-    return jsonify({
-      'mode': 'browse',
-      'page': page,
-      'per_page': per_page,
       'total': total,
-      'total_pages': max(1, (total + per_page - 1) // per_page),
-      'count': len(resources),
+      'total_exact': exact,
+      'next_cursor': next_cursor,
       'resources': resources
     })
+  return jsonify({
+    'mode': 'browse',
+    'page': page,
+    'per_page': per_page,
+    'total': total,
+    'total_pages': max(1, (total + per_page - 1) // per_page),
+    'count': len(resources),
+    'next_cursor': next_cursor,
+    'resources': resources
+  })
+
+
+@api_bp.route('/resources/<channel_id>/<int:message_id>', methods=['GET'])
+@login_required
+def get_resource(channel_id, message_id):
+  """单条资源（列表只取了部分字段时，按需读取 raw_html 等）"""
+  if channel_id not in CHANNELS:
+    return jsonify({'error': '未知频道'}), 400
+  try:
+    fields = _parse_fields()
+  except ValueError as e:
+    return jsonify({'error': str(e)}), 400
+  r = Database().get_resource(channel_id, message_id, _db_fields(fields))
+  if r is None:
+    return jsonify({'error': '资源不存在'}), 404
+  return jsonify(_resource_dict(channel_id, r, fields))
 
 
 @api_bp.route('/resources', methods=['GET'])
@@ -257,17 +356,18 @@ def search():
 def list_resources():
   channel_id = request.args.get('channel', 'lsp115')
   page = request.args.get('page', 1, type=int)
-  per_page = min(request.args.get('per_page', 20, type=int), 100)
+  per_page = _page_size('per_page', 20)
 
   if channel_id not in CHANNELS:
     return jsonify({'error': '未知频道'}), 400
 
+  cursor = request.args.get('cursor') or None
   db = Database()
+  try:
+    page_resources, next_cursor = db.list_page(channel_id, per_page, cursor=cursor, offset=(max(page, 1) - 1) * per_page)
+  except ValueError as e:
+    return jsonify({'error': str(e)}), 400
   total = db.count(channel_id)
-  all_resources = db.list_all(channel_id, limit=per_page * page)
-
-  start = (page - 1) * per_page
-  page_resources = all_resources[start:start + per_page]
 
   resources = [{
     'message_id': r.message_id,
@@ -283,11 +383,12 @@ def list_resources():
     'per_page': per_page,
     'total': total,
     'total_pages': max(1, (total + per_page - 1) // per_page),
+    'next_cursor': next_cursor,
     'resources': resources
   })
 
 
-def do_sync(channel_id: str, mode: str):
+def do_sync(channel_id: str, mode: str, stream_parse: Optional[bool] = None):
   global sync_status
   channel_name = CHANNELS[channel_id]['name']
   add_log('sync', channel_id, f'手动同步开始: {channel_name} ({mode})', 'info')
@@ -295,19 +396,22 @@ def do_sync(channel_id: str, mode: str):
     sync_status = {'running': True, 'channel': channel_id, 'message': f'正在同步 {channel_name}...'}
     db = Database()
     state_manager = StateManager()
-    crawler = ChannelCrawler(channel_id)
+    crawler = ChannelCrawler(channel_id, stream_parse=stream_parse, cancel=sync_cancel)
+    if crawler.stream_parse:
+      sync_status['message'] = f'正在同步 {channel_name}（边爬边解析链接）...'
 
     if mode == 'full':
       new_count = crawler.crawl_all(db, state_manager)
     else:
       new_count = crawler.crawl_incremental(db)
 
-    if CHANNELS[channel_id]['parse_mode'] == 'telegraph':
-      sync_status['message'] = f'正在解析链接...'
+    # 边爬边解析时只剩爬取期间没有解析完的资源
+    if CHANNELS[channel_id]['parse_mode'] == 'telegraph' and not sync_cancel.is_set():
+      unparsed = db.count_to_resolve(channel_id)
+      sync_status['message'] = f'正在解析链接（{unparsed} 条）...'
       parser = TelegraphParser()
-      unparsed = db.count_unparsed(channel_id)
       if unparsed > 0:
-        parser.parse_batch(db, channel_id, limit=unparsed)
+        parser.parse_batch(db, channel_id, limit=unparsed, cancel=sync_cancel)
 
     sync_status = {'running': False, 'channel': None, 'message': f'{channel_name} 同步完成，新增 {new_count} 条'}
     add_log('sync', channel_id, f'手动同步完成: {channel_name}，新增 {new_count} 条资源', 'success')
@@ -325,11 +429,13 @@ def sync():
   data = request.get_json() or {}
   channel_id = data.get('channel', 'lsp115')
   mode = data.get('mode', 'incremental')
+  stream_parse = _stream_parse_option(data)
 
   if channel_id not in CHANNELS:
     return jsonify({'error': '未知频道'}), 400
 
-  thread = threading.Thread(target=do_sync, args=(channel_id, mode))
+  sync_cancel.clear()
+  thread = threading.Thread(target=do_sync, args=(channel_id, mode, stream_parse))
   thread.daemon = True
   thread.start()
 
@@ -344,13 +450,29 @@ def sync_all():
 
   data = request.get_json() or {}
   mode = 'full' if data.get('full') else 'incremental'
+  concurrent = bool(data.get('concurrent'))
+  stream_parse = _stream_parse_option(data)
 
   def sync_all_channels():
     global sync_status
-    for ch_id in CHANNELS.keys():
-      do_sync(ch_id, mode)
+    if concurrent:
+      add_log('sync', 'all', f'手动并发同步开始: 全部频道 ({mode})', 'info')
+      sync_status = {'running': True, 'channel': 'all', 'message': '正在并发同步所有频道...'}
+      try:
+        counts = sync_channels_concurrently(mode, stream_parse)
+      except Exception as e:
+        sync_status = {'running': False, 'channel': None, 'message': f'同步失败: {str(e)}'}
+        add_log('sync', 'all', f'手动并发同步失败: {str(e)}', 'error')
+        return
+      add_log('sync', 'all', f'手动并发同步完成: 新增 {sum(counts.values())} 条资源', 'success')
+    else:
+      for ch_id in CHANNELS.keys():
+        if sync_cancel.is_set():
+          break
+        do_sync(ch_id, mode, stream_parse)
     sync_status = {'running': False, 'channel': None, 'message': '所有频道同步完成'}
 
+  sync_cancel.clear()
   thread = threading.Thread(target=sync_all_channels)
   thread.daemon = True
   thread.start()
@@ -358,6 +480,16 @@ def sync_all():
   return jsonify({'message': '已启动同步所有频道'})
 
 
+@api_bp.route('/sync/cancel', methods=['POST'])
+@login_required
+def cancel_sync():
+  """停止正在进行的链接解析（已解析的结果已保存，下次同步继续）"""
+  if not sync_status['running']:
+    return jsonify({'error': '没有正在运行的同步任务'}), 400
+  sync_cancel.set()
+  return jsonify({'message': '正在停止同步，进行中的请求完成后结束'})
+
+
 @api_bp.route('/sync/status', methods=['GET'])
 @login_required
 def get_sync_status():
@@ -386,6 +518,8 @@ def list_tasks():
       jobs.append({
         'id': job.id,
         'name': job.name,
+        'concurrent': _job_concurrent(job),
+        'stream_parse': _job_stream_parse(job),
         'next_run': next_run.isoformat() if next_run else None
       })
   return jsonify({'tasks': jobs})
@@ -401,12 +535,14 @@ def create_task():
   channel_id = data.get('channel', 'all')
   mode = data.get('mode', 'incremental')
   interval_hours = data.get('interval_hours', 6)
+  concurrent = bool(data.get('concurrent'))
+  stream_parse = _stream_parse_option(data)
 
   if channel_id != 'all' and channel_id not in CHANNELS:
     return jsonify({'error': f'未知频道: {channel_id}'}), 400
 
   try:
-    job_id = add_scheduled_job(channel_id, mode, interval_hours)
+    job_id = add_scheduled_job(channel_id, mode, interval_hours, concurrent=concurrent, stream_parse=stream_parse)
     return jsonify({'message': '任务已创建', 'job_id': job_id})
   except Exception as e:
     return jsonify({'error': str(e)}), 400
@@ -1,13 +1,17 @@
 # -*- coding: utf-8 -*-
 """Flask 应用"""
 
+import hmac
 import os
-from flask import Flask, send_from_directory
+import time
+from flask import Flask, Response, g, request, send_from_directory
 from flask_cors import CORS
 
 from .auth import auth_bp, init_auth_db
 from .api import api_bp
 
+from src.utils.metrics import API_REQUEST_SECONDS, CONTENT_TYPE, REGISTRY
+
 
 def create_app():
   """创建 Flask 应用"""
@@ -23,6 +27,27 @@ def create_app():
   app.register_blueprint(auth_bp, url_prefix='/api/auth')
   app.register_blueprint(api_bp, url_prefix='/api')
 
+  @app.before_request
+  def start_timer():
+    g.request_start = time.perf_counter()
+
+  @app.after_request
+  def record_latency(response):
+    # 只统计 API 请求，按路由模板（而不是实际路径）分组
+    rule = request.url_rule.rule if request.url_rule else None
+    if rule and rule.startswith('/api/') and 'request_start' in g:
+      API_REQUEST_SECONDS.observe(time.perf_counter() - g.request_start,
+                                  route=rule, method=request.method, status=response.status_code)
+    return response
+
+  @app.route('/metrics')
+  def metrics():
+    # 设置了 METRICS_TOKEN 时需要 Authorization: Bearer <token>
+    token = os.environ.get('METRICS_TOKEN', '')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+      return Response('未授权\n', status=401, mimetype='text/plain')
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
   @app.route('/')
   @app.route('/<path:path>')
   def serve_frontend(path='index.html'):
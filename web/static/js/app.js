@@ -4,6 +4,9 @@
 
 const { createApp, ref, computed, onMounted, watch } = Vue;
 
+// 资源列表只读取需要显示的字段，消息卡片（raw_html）在预览时再读取
+const LIST_FIELDS = 'channel_id,channel_name,channel_username,message_id,title,tags,pan_url,created_at';
+
 createApp({
     setup() {
         // 状态
@@ -30,8 +33,11 @@ createApp({
         const searchPerformed = ref(false);
         const searchHistory = ref(JSON.parse(localStorage.getItem('searchHistory') || '[]'));
         const searchPage = ref(1);
+        const searchCursors = ref([null]); // 浏览模式各页的游标，第 n 页为 searchCursors[n - 1]
         const searchTotalPages = ref(1);
         const searchTotal = ref(0);
+        const searchTotalExact = ref(true); // 搜索结果很多时总数只统计到上限
+        const searchNextCursor = ref(null); // 搜索模式下一页的游标
         const searchMode = ref('browse'); // 'browse' or 'search'
         const syncChannel = ref('all');
         const syncStatus = ref({ running: false, message: '' });
@@ -87,6 +93,12 @@ createApp({
             localStorage.setItem('sidebarCollapsed', val);
         });
 
+        // 切换频道后浏览从第一页开始（游标只对原来的频道有效）
+        watch(searchChannel, () => {
+            searchPage.value = 1;
+            searchCursors.value = [null];
+        });
+
         // 主题切换
         function toggleTheme() {
             isDark.value = !isDark.value;
@@ -171,34 +183,42 @@ createApp({
             }
         }
 
-        async function doSearch(query = null) {
+        async function doSearch(query = null, more = false) {
             const q = query || searchQuery.value.trim();
             loading.value = true;
             searchPerformed.value = true;
             try {
-                let url = '/search?';
+                let url = `/search?fields=${LIST_FIELDS}&`;
                 if (q) {
-                    // 搜索模式
+                    // 搜索模式：按相关度排序，"加载更多" 时带上游标追加下一页
                     searchMode.value = 'search';
                     searchQuery.value = q;
-                    url += `q=${encodeURIComponent(q)}`;
+                    url += `q=${encodeURIComponent(q)}&limit=50`;
+                    if (more && searchNextCursor.value) url += `&cursor=${encodeURIComponent(searchNextCursor.value)}`;
                     if (searchChannel.value) url += `&channel=${searchChannel.value}`;
                     const data = await api(url);
-                    searchResults.value = data.resources;
-                    searchTotal.value = data.count;
-                    searchTotalPages.value = 1; // 搜索模式不分页
+                    searchResults.value = more ? searchResults.value.concat(data.resources) : data.resources;
+                    searchTotal.value = data.total;
+                    searchTotalExact.value = data.total_exact;
+                    searchNextCursor.value = data.next_cursor;
+                    searchTotalPages.value = 1;
                     searchPage.value = 1;
                     // 保存到历史记录
-                    addToHistory(q);
+                    if (!more) addToHistory(q);
                 } else {
                     // 浏览模式
                     searchMode.value = 'browse';
-                    url += `page=${searchPage.value}&per_page=20`;
+                    searchTotalExact.value = true;
+                    url += 'per_page=20';
+                    const cursor = searchCursors.value[searchPage.value - 1];
+                    url += cursor ? `&cursor=${encodeURIComponent(cursor)}` : `&page=${searchPage.value}`;
                     if (searchChannel.value) url += `&channel=${searchChannel.value}`;
                     const data = await api(url);
                     searchResults.value = data.resources;
                     searchTotal.value = data.total;
                     searchTotalPages.value = data.total_pages;
+                    // 记录下一页的游标，翻页时直接从游标处读取
+                    searchCursors.value[searchPage.value] = data.next_cursor;
                 }
             } catch (e) {
                 searchResults.value = [];
@@ -208,8 +228,31 @@ createApp({
             }
         }
 
+        function loadMoreResults() {
+            doSearch(searchQuery.value.trim(), true);
+        }
+
+        async function openCardPreview(item) {
+            if (item.raw_html === undefined) {
+                try {
+                    const data = await api(`/resources/${item.channel_id}/${item.message_id}?fields=raw_html`);
+                    item.raw_html = data.raw_html;
+                } catch (e) {
+                    showToast('读取消息卡片失败', 'error');
+                    return;
+                }
+            }
+            if (!item.raw_html) {
+                showToast('该资源没有消息卡片', 'error');
+                return;
+            }
+            cardModalHtml.value = item.raw_html;
+            showCardModal.value = true;
+        }
+
         function loadDefaultResources(page = 1) {
             searchPage.value = page;
+            searchCursors.value = [null];
             searchQuery.value = '';
             doSearch();
         }
@@ -415,16 +458,16 @@ createApp({
             sidebarOpen, sidebarCollapsed,
             dashboard, channels, searchQuery, searchChannel, searchResults, searchPerformed,
             searchHistory, removeFromHistory, clearHistory,
-            searchPage, searchTotalPages, searchTotal, searchMode,
+            searchPage, searchTotalPages, searchTotal, searchTotalExact, searchNextCursor, searchMode,
             syncChannel, syncStatus, syncRunning,
             tasks, newTask,
             logs, logFilter, loadLogs, clearLogs,
             transferHistory, loadTransferHistory, clearTransferHistory,
             showCardModal, cardModalHtml,
             toasts, confirmDialog, showToast, removeToast, handleConfirm,
-            toggleTheme, login, logout, loadDashboard, doSearch, loadDefaultResources, changePage, copyLink, syncNow,
+            toggleTheme, login, logout, loadDashboard, doSearch, loadMoreResults, loadDefaultResources, changePage, copyLink, syncNow,
             loadTasks, addTask, deleteTask, formatDate,
-            openCardPreview: (html) => { cardModalHtml.value = html; showCardModal.value = true; },
+            openCardPreview,
             closeCardPreview: () => { showCardModal.value = false; cardModalHtml.value = ''; },
             transferToCms
         };